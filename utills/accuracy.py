@@ -0,0 +1,272 @@
+"""실시간 예측 오차 추적 (구간당 O(1) 스트리밍 MAE / MAPE / 편향 / 이동 창 오차)
+
+실측 전기요금이 들어올 때마다 누적 합만 갱신하므로 이력을 다시 계산하지 않는다.
+    - 전체 / 시간(0~23)별 / 작업유형별 누적 지표
+    - 같은 그룹의 최근 window 구간 이동 창 지표 (창에서 빠지는 구간은 합에서 빼서 O(1))
+구간별 (예측, 실측) 은 reports/accuracy/errors.sqlite 에 한 행씩 남겨 나중에 드리프트 분석에 쓴다.
+대시보드 예측 구간에는 계량 실적이 없으므로, 기록은 out-of-sample 백테스트(폴드별 재학습) 예측을 --replay 로
+흘려 넣어 만든다 (실행 이름 backtest-<폴더 이름>, 다시 넣으면 같은 실행 기록을 교체). insample 백테스트는
+지표만 보여 주고 기록하지 않는다.
+MAPE 는 실측 요금이 0 인 구간을 제외한다 (backtest.error_metrics 와 같은 기준).
+
+사용 예:
+    python -m utills.accuracy --replay ./reports/backtest      # 백테스트 예측을 스트리밍으로 흘려 일괄 지표와 비교 + 기록
+    python -m utills.accuracy --freq M                         # 저장된 오차 기록의 월별 MAE/편향 (드리프트 확인)
+    python -m utills.accuracy --freq W --run backtest-backtest
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utills.data import WORKTYPES
+
+ACCURACY_DIR = "./reports/accuracy"
+# 이동 창 크기 (구간 수, 96 = 하루)
+DEFAULT_WINDOW = 96
+ACCURACY_GROUPS = {"hour": "시간", "worktype": "작업유형"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS errors (
+    run TEXT NOT NULL, model TEXT, timestamp TEXT NOT NULL, hour INTEGER NOT NULL, worktype TEXT,
+    predicted REAL NOT NULL, actual REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS errors_run_time ON errors (run, timestamp);
+"""
+
+
+# ========== 1. 누적 지표 ==========
+class ErrorStats:
+    """오차 합계 (추가/제거 모두 O(1))"""
+
+    __slots__ = ("count", "abs_sum", "signed_sum", "sq_sum", "ape_sum", "ape_count")
+
+    def __init__(self):
+        self.count = 0
+        self.abs_sum = self.signed_sum = self.sq_sum = self.ape_sum = 0.0
+        self.ape_count = 0
+
+    def add(self, error, actual, sign=1):
+        self.count += sign
+        self.abs_sum += sign * abs(error)
+        self.signed_sum += sign * error
+        self.sq_sum += sign * error * error
+        if actual > 0:
+            self.ape_sum += sign * abs(error) / actual
+            self.ape_count += sign
+
+    def remove(self, error, actual):
+        self.add(error, actual, sign=-1)
+
+    def summary(self):
+        """MAE / MAPE(%) / 편향(예측 - 실측 평균) / RMSE / 구간 수"""
+        if self.count <= 0:
+            return {"MAE": np.nan, "MAPE(%)": np.nan, "편향": np.nan, "RMSE": np.nan, "구간 수": 0}
+        # 창에서 빼는 과정의 부동소수 오차로 0 아래가 되지 않게
+        return {
+            "MAE": max(self.abs_sum, 0.0) / self.count,
+            "MAPE(%)": max(self.ape_sum, 0.0) / self.ape_count * 100 if self.ape_count > 0 else np.nan,
+            "편향": self.signed_sum / self.count,
+            "RMSE": np.sqrt(max(self.sq_sum, 0.0) / self.count),
+            "구간 수": self.count,
+        }
+
+
+class WindowedErrorStats:
+    """누적 지표 + 최근 window 구간 이동 창 지표"""
+
+    __slots__ = ("total", "rolling", "window", "_recent")
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.total = ErrorStats()
+        self.rolling = ErrorStats()
+        self.window = window
+        self._recent = deque()
+
+    def add(self, error, actual):
+        self.total.add(error, actual)
+        self.rolling.add(error, actual)
+        self._recent.append((error, actual))
+        if len(self._recent) > self.window:
+            self.rolling.remove(*self._recent.popleft())
+
+    def summary(self):
+        total, rolling = self.total.summary(), self.rolling.summary()
+        return {**total, **{f"최근 {key}": rolling[key] for key in ("MAE", "MAPE(%)", "편향")}}
+
+
+class StreamingErrorTracker:
+    """실측 구간 1건마다 전체/시간별/작업유형별 지표 갱신 (구간당 O(1))"""
+
+    def __init__(self, window=DEFAULT_WINDOW, log=None, run=None, model=None):
+        self.window = window
+        self.overall = WindowedErrorStats(window)
+        self.groups = {"hour": {}, "worktype": {}}
+        self.log = log
+        self.run = run or pd.Timestamp.now().strftime("%Y%m%d-%H%M%S")
+        self.model = model
+        self.last = None
+
+    def update(self, timestamp, worktype, predicted, actual):
+        """(예측, 실측) 1건 반영 -> 전체 지표 (예측이나 실측이 없으면 반영하지 않음)"""
+        if predicted is None or actual is None or not (np.isfinite(predicted) and np.isfinite(actual)):
+            return self.state()
+        timestamp = pd.Timestamp(timestamp)
+        predicted, actual = float(predicted), float(actual)
+        error = predicted - actual
+        self.overall.add(error, actual)
+        for level, key in (("hour", timestamp.hour), ("worktype", worktype)):
+            stats = self.groups[level].get(key)
+            if stats is None:
+                stats = self.groups[level][key] = WindowedErrorStats(self.window)
+            stats.add(error, actual)
+        self.last = {"측정일시": timestamp, "작업유형": worktype, "예측": predicted, "실측": actual, "오차": error}
+        if self.log is not None:
+            self.log.record(self.run, self.model, timestamp, worktype, predicted, actual)
+        return self.state()
+
+    def state(self):
+        return {**self.overall.summary(), "last": self.last}
+
+    def table(self, level):
+        """시간/작업유형별 지표 표 (그룹 수만큼만 계산)"""
+        order = range(24) if level == "hour" else WORKTYPES
+        rows = [{ACCURACY_GROUPS[level]: key, **self.groups[level][key].summary()}
+                for key in order if key in self.groups[level]]
+        return pd.DataFrame(rows)
+
+
+# ========== 2. 저장 (드리프트 분석용) ==========
+class ErrorLog:
+    """구간별 (예측, 실측) 기록 SQLite (reports/accuracy/errors.sqlite)"""
+
+    def __init__(self, directory=ACCURACY_DIR):
+        self.path = os.path.join(directory, "errors.sqlite")
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self):
+        # 프로세스마다 따로 연결 (fork 로 넘어온 연결은 쓰지 않음)
+        if self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._connection
+
+    def record(self, run, model, timestamp, worktype, predicted, actual):
+        with self.connection:
+            self.connection.execute("INSERT INTO errors VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (run, model, pd.Timestamp(timestamp).isoformat(), pd.Timestamp(timestamp).hour,
+                                     worktype, predicted, actual))
+
+    def replace_run(self, run, model, records):
+        """실행 하나의 기록을 표(측정일시, 작업유형, 예측, 실측)로 통째로 교체 (트랜잭션 한 번)"""
+        timestamps = pd.to_datetime(records["측정일시"])
+        rows = zip([run] * len(records), [model] * len(records), timestamps.map(pd.Timestamp.isoformat),
+                   timestamps.dt.hour.tolist(), records["작업유형"], records["예측"].astype(float),
+                   records["실측"].astype(float))
+        with self.connection:
+            self.connection.execute("DELETE FROM errors WHERE run = ?", (run,))
+            self.connection.executemany("INSERT INTO errors VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(records)
+
+    def load(self, run=None):
+        """기록 표 (측정일시, 작업유형, 예측, 실측, 오차)"""
+        query = "SELECT run, model, timestamp, worktype, predicted, actual FROM errors"
+        params = ()
+        if run:
+            query += " WHERE run = ?"
+            params = (run,)
+        frame = pd.read_sql_query(query + " ORDER BY run, timestamp", self.connection, params=params,
+                                  parse_dates=["timestamp"])
+        frame = frame.rename(columns={"timestamp": "측정일시", "worktype": "작업유형", "predicted": "예측",
+                                      "actual": "실측"})
+        frame["오차"] = frame["예측"] - frame["실측"]
+        return frame
+
+
+def drift_table(records, freq="D"):
+    """기록 표 -> 실행 x 기간별 MAE / MAPE / 편향 (기간마다 오차가 커지는지 확인)"""
+    actual = records["실측"].to_numpy(dtype=float)
+    errors = records.assign(abs=records["오차"].abs(),
+                            ape=np.where(actual > 0, records["오차"].abs() / np.where(actual > 0, actual, 1), np.nan))
+    grouped = errors.groupby(["run", errors["측정일시"].dt.to_period(freq).rename("기간")])
+    table = pd.DataFrame({"MAE": grouped["abs"].mean(), "MAPE(%)": grouped["ape"].mean() * 100,
+                          "편향": grouped["오차"].mean(), "구간 수": grouped["오차"].count()})
+    return table.reset_index()
+
+
+# ========== 3. 실행 ==========
+def replay(predictions, model, window=DEFAULT_WINDOW):
+    """백테스트 예측 표를 시간순으로 흘려 넣음 -> (추적기, 구간당 평균 갱신 시간 초)"""
+    ordered = predictions.sort_values("측정일시", kind="stable")
+    tracker = StreamingErrorTracker(window, model=model)
+    rows = zip(ordered["측정일시"], ordered["작업유형"], ordered[model].to_numpy(dtype=float),
+               ordered["실측 전기요금(원)"].to_numpy(dtype=float))
+    started = time.perf_counter()
+    for timestamp, worktype, predicted, actual in rows:
+        tracker.update(timestamp, worktype, predicted, actual)
+    return tracker, (time.perf_counter() - started) / max(len(ordered), 1)
+
+
+def record_backtest(folder, predictions, model, directory=ACCURACY_DIR):
+    """out-of-sample 백테스트 예측 -> 오차 기록 (실행 이름 backtest-<폴더 이름>). 기록한 실행 이름 또는 None"""
+    from utills.ensemble import load_backtest
+
+    try:
+        load_backtest(folder)
+    except ValueError:
+        print(f"기록하지 않음: {folder} 는 in-sample 백테스트(저장된 모델이 학습한 구간)라 오차 기록에 남기지 않습니다")
+        return None
+    run = f"backtest-{os.path.basename(os.path.normpath(folder))}"
+    records = predictions[["측정일시", "작업유형"]].assign(예측=predictions[model],
+                                                      실측=predictions["실측 전기요금(원)"]).dropna()
+    count = ErrorLog(directory).replace_run(run, model, records)
+    print(f"오차 기록: {run} {count:,}구간 -> {os.path.join(directory, 'errors.sqlite')}")
+    return run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="실시간 예측 오차 기록 조회 / 스트리밍 지표 확인")
+    parser.add_argument("--dir", default=ACCURACY_DIR, help="오차 기록 폴더")
+    parser.add_argument("--run", help="실행(대시보드 세션) 이름 (기본: 전체)")
+    parser.add_argument("--freq", default="D", help="드리프트 집계 기간 (D: 일, W: 주, M: 월)")
+    parser.add_argument("--replay", help="utills.backtest 출력 폴더: 예측을 스트리밍으로 흘려 일괄 지표와 비교")
+    parser.add_argument("--model", default="xgboost", help="--replay 에서 볼 모델 열")
+    parser.add_argument("--no-record", action="store_true", help="--replay 결과를 오차 기록에 남기지 않음")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="이동 창 구간 수")
+    args = parser.parse_args(argv)
+
+    fmt = lambda v: f"{v:,.2f}"
+    if args.replay:
+        from utills.backtest import error_metrics
+
+        predictions = pd.read_csv(os.path.join(args.replay, "predictions.csv"), parse_dates=["측정일시"])
+        tracker, seconds = replay(predictions, args.model, args.window)
+        print(pd.DataFrame([tracker.state()]).drop(columns="last").to_string(index=False, float_format=fmt))
+        print(tracker.table("worktype").to_string(index=False, float_format=fmt))
+        batch = error_metrics(predictions.assign(전체="전체"), [args.model], ["전체"]).iloc[0]
+        print(f"일괄 계산: MAE {batch['MAE']:,.4f}, MAPE {batch['MAPE(%)']:.4f}% / "
+              f"구간당 갱신 {seconds * 1e6:.1f}µs")
+        if not args.no_record:
+            record_backtest(args.replay, predictions, args.model, args.dir)
+        return 0
+
+    records = ErrorLog(args.dir).load(args.run)
+    if records.empty:
+        print(f"{args.dir} 에 오차 기록이 없습니다")
+        return 0
+    print(drift_table(records, args.freq).to_string(index=False, float_format=fmt))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""요금 모델 롤링 오리진(rolling-origin) 백테스트
+
+폴드(월 또는 주)마다 그 이전 데이터만 학습/이력으로 쓰고 폴드 구간을 예측해
+MAE / MAPE / RMSE 를 폴드, 시간, 작업유형별로 집계한다.
+    - actual: 폴드 시작 전 데이터로 요금 모델을 다시 학습하고, 측정값으로 만든 특성으로 평가
+    - forecast: actual 처럼 요금 모델을 다시 학습하고, 측정값도 폴드 시작 전 데이터로 학습한 모델로
+      매일 0시 기준 다음 96구간(하루 전 예측)을 예측해 평가
+    - insample: models/ (또는 레지스트리) 에 저장된 모델을 그대로 측정값 특성으로 평가.
+      저장된 모델은 train.csv 전체로 학습했으므로 학습 구간 안의 점수(in-sample)이고 일반화 성능이 아니다.
+
+폴드별 특성 행렬과 폴드별로 다시 학습한 요금 모델은 .cache/backtest 에 저장하므로, 같은 설정으로 다시 돌리면
+학습/특성 계산을 건너뛴다. 예측값도 모델 버전 + 입력 해시로 .cache/predictions 에 남긴다.
+기본 평가 모델은 XGBoost 이다. LSTM 을 폴드마다 다시 학습하려면 TensorFlow(Keras) 가 필요하다
+(pip install -r requirements-train.txt).
+
+사용 예:
+    python -m utills.backtest --by month
+    python -m utills.backtest --by month --models xgboost lstm   # LSTM 포함 (requirements-train.txt)
+    python -m utills.backtest --by week --mode forecast --strategy recursive --workers 8
+    python -m utills.backtest --by month --models xgboost --out ./reports/backtest_xgb
+    python -m utills.backtest --by month --mode insample --model-version current   # 레지스트리 현재 버전 (in-sample)
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import importlib.util
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, WORKTYPES, load_train_data, data_version
+from utills.features import TARGET_COLUMN, build_features, feature_matrix
+from utills.forecast import (HORIZON, FORECAST_STRATEGIES, DEFAULT_ORIGIN_STRIDE, DEFAULT_PARAMS,
+                             MeasurementForecaster, forecast_features)
+from utills.model import (COST_MODELS, DEFAULT_TRAIN_MODELS, MODEL_PATHS, MAX_CONTEXT, XGBoostCostModel, LSTMCostModel,
+                          load_cost_model)
+from utills.prediction_cache import PredictionCache, CachedCostModel
+from utills.train import DEFAULT_SEED, XGBOOST_PARAMS, LSTM_PARAMS, config_hash, cached, train_xgboost, train_lstm
+
+BACKTEST_CACHE_DIR = "./.cache/backtest"
+BACKTEST_MODES = ["actual", "forecast", "insample"]
+# 폴드마다 요금 모델을 다시 학습하는 방식 (insample 은 저장된 모델을 그대로 점수화)
+REFIT_MODES = ["actual", "forecast"]
+# 폴드별 LSTM 재학습 시 조기 종료에 쓰는 이력 끝 구간 (일)
+REFIT_VALID_DAYS = 7
+FOLD_FREQ = {"month": "M", "week": "W-SUN"}
+
+# 첫 폴드 앞에 필요한 최소 이력 (forecast 모드 측정값 모델 학습용)
+DEFAULT_MIN_TRAIN_DAYS = 28
+
+# 워커가 공유하는 데이터셋/모델 (fork 시 부모 메모리를 그대로 공유) / 워커별 예측 캐시
+_DATASET = {}
+_MODELS = {}
+_PREDICTION_CACHE = {}
+
+
+# ========== 1. 폴드 ==========
+def make_folds(timestamps, by="month", min_train_days=DEFAULT_MIN_TRAIN_DAYS):
+    """월/주 단위 폴드 목록 (시작 전 이력이 min_train_days 미만인 폴드는 제외)"""
+    if by not in FOLD_FREQ:
+        raise ValueError(f"알 수 없는 폴드 단위: {by} (가능: {', '.join(FOLD_FREQ)})")
+    first = timestamps.min()
+    folds = []
+    for period in sorted(timestamps.dt.to_period(FOLD_FREQ[by]).unique()):
+        start = period.start_time
+        if start - first < pd.Timedelta(days=min_train_days):
+            continue
+        folds.append({"fold": len(folds) + 1, "label": str(period), "start": start,
+                      "end": period.end_time})
+    return folds
+
+
+def load_dataset(path):
+    """백테스트 데이터 (시간순 정렬 + 전체 측정값 특성은 한 번만 계산)"""
+    df = load_train_data(path).sort_values("측정일시").reset_index(drop=True)
+    return {"path": path, "df": df, "features": build_features(df), "version": data_version(path)}
+
+
+def _init_worker(path):
+    # spawn 환경이면 워커마다 한 번만 로드
+    if _DATASET.get("path") != path:
+        _DATASET.update(load_dataset(path))
+
+
+# ========== 2. 폴드 특성 (캐시) ==========
+def feature_cache_key(version, fold, mode, options):
+    """요금 모델과 무관한 값만으로 캐시 키 생성 (모델을 바꿔도 특성은 재사용)"""
+    raw = {"version": version, "mode": mode, "start": str(fold["start"]), "end": str(fold["end"]),
+           "context": MAX_CONTEXT}
+    if mode == "forecast":
+        raw.update({"strategy": options["strategy"], "horizon": options["horizon"],
+                    "origin_stride": options["origin_stride"], "params": options["params"]})
+    return hashlib.sha1(json.dumps(raw, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def compute_fold_features(dataset, fold, mode, options):
+    """폴드의 (평가 구간 표, 특성 표, 특성 표에서 평가 구간 행 위치)"""
+    df = dataset["df"]
+    timestamps = df["측정일시"]
+    lo = int(timestamps.searchsorted(fold["start"], side="left"))
+    hi = int(timestamps.searchsorted(fold["end"], side="right"))
+
+    if mode in ("actual", "insample"):
+        begin = max(lo - MAX_CONTEXT, 0)
+        frame = df.iloc[lo:hi][["측정일시", "작업유형"]].reset_index(drop=True)
+        return frame, dataset["features"].iloc[begin:hi].reset_index(drop=True), np.arange(lo - begin, hi - begin)
+
+    # 폴드 시작 전 데이터로만 측정값 모델 학습, 폴드 안 매일 0시 기준 하루 전 예측
+    history = df.iloc[:lo]
+    forecaster = MeasurementForecaster(options["strategy"], horizon=options["horizon"],
+                                       params=options["params"], origin_stride=options["origin_stride"])
+    forecaster.fit(history)
+    days = pd.date_range(fold["start"].normalize(), fold["end"], freq="D")
+    frame, features, rows = forecast_features(df, days, forecaster, horizon=options["horizon"],
+                                              context=MAX_CONTEXT)
+    # 데이터 범위를 벗어난 예측 구간은 평가에서 제외
+    keep = frame["측정일시"].isin(timestamps.iloc[lo:hi]).to_numpy()
+    return (frame.loc[keep, ["측정일시", "작업유형", "기준시각", "예측거리"]].reset_index(drop=True),
+            features, rows[keep])
+
+
+def fold_features(dataset, fold, mode, options, cache_dir=BACKTEST_CACHE_DIR):
+    """캐시가 있으면 읽고, 없으면 계산 후 저장. (결과, 캐시 적중 여부) 반환"""
+    key = feature_cache_key(dataset["version"], fold, mode, options)
+    path = os.path.join(cache_dir, f"{key}.pkl") if cache_dir else None
+    if path and os.path.exists(path):
+        return pd.read_pickle(path), True
+    result = compute_fold_features(dataset, fold, mode, options)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pd.to_pickle(result, tmp_path)
+        os.replace(tmp_path, path)
+    return result, False
+
+
+# ========== 3. 폴드별 재학습 ==========
+class FittedXGBoostModel(XGBoostCostModel):
+    """메모리에서 학습한 XGBRegressor (버전은 학습 설정 해시, 예측 캐시 키로 사용)"""
+
+    def __init__(self, model, version):
+        self.path = None
+        self.model = model
+        self._version = version
+
+    @property
+    def version(self):
+        return self._version
+
+
+def refit_params(name):
+    return dict(XGBOOST_PARAMS if name == "xgboost" else LSTM_PARAMS)
+
+
+def check_refit_models(models):
+    """폴드별 재학습이 가능한지 미리 확인 (LSTM 은 TensorFlow 필요)"""
+    if "lstm" in models and importlib.util.find_spec("tensorflow") is None:
+        raise ValueError("LSTM 을 폴드마다 다시 학습하려면 TensorFlow 가 필요합니다 "
+                         "(--models xgboost 로 실행하거나 pip install -r requirements-train.txt)")
+
+
+def fit_fold_model(name, dataset, fold, threads, seed=DEFAULT_SEED, cache_dir=BACKTEST_CACHE_DIR):
+    """폴드 시작 전 이력([:fold.start])만으로 요금 모델 학습 (데이터 버전/폴드/설정 해시로 캐시)"""
+    df = dataset["df"]
+    lo = int(df["측정일시"].searchsorted(fold["start"], side="left"))
+    features = dataset["features"].iloc[:lo].reset_index(drop=True)
+    y = df[TARGET_COLUMN].to_numpy(dtype=float)[:lo]
+    params = refit_params(name)
+    key = {"stage": "fold_model", "model": name, "version": dataset["version"], "start": str(fold["start"]),
+           "params": params, "seed": seed}
+    version = f"fold-{config_hash(key)[:16]}"
+
+    if name == "xgboost":
+        no_valid = np.zeros(lo, dtype=bool)
+        model, _ = cached(cache_dir, key,
+                          lambda: train_xgboost(feature_matrix(features), y, no_valid, params, threads, seed)[0])
+        return FittedXGBoostModel(model, version)
+
+    # LSTM 은 h5 + 표준화 JSON 산출물로 저장 (조기 종료는 이력 마지막 REFIT_VALID_DAYS 일)
+    model_dir = os.path.join(cache_dir, "fold_models", version) if cache_dir else tempfile.mkdtemp()
+    model_path, scaler_path = os.path.join(model_dir, "lstm.h5"), os.path.join(model_dir, "lstm_scaler.json")
+    if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
+        os.makedirs(model_dir, exist_ok=True)
+        timestamps = df["측정일시"].iloc[:lo]
+        valid = (timestamps >= timestamps.iloc[-1] - pd.Timedelta(days=REFIT_VALID_DAYS)).to_numpy()
+        train_lstm(features, y, valid, params, threads, seed, model_path, scaler_path)
+    return LSTMCostModel(model_path, scaler_path=scaler_path)
+
+
+# ========== 4. 폴드 실행 ==========
+def _cost_model(name, version=None, prediction_cache=False, fold=None, threads=1, cache_dir=BACKTEST_CACHE_DIR):
+    """fold 를 주면 그 폴드 이전 이력으로 다시 학습한 모델, 아니면 저장된 모델 (insample)"""
+    if fold is not None:
+        model = fit_fold_model(name, _DATASET, fold, threads, cache_dir=cache_dir)
+    else:
+        if (name, version) not in _MODELS:
+            _MODELS[name, version] = load_cost_model(name, version=version)
+        model = _MODELS[name, version]
+    if not prediction_cache:
+        return model
+    if "cache" not in _PREDICTION_CACHE:
+        _PREDICTION_CACHE["cache"] = PredictionCache()
+    return CachedCostModel(model, _PREDICTION_CACHE["cache"])
+
+
+def run_fold(fold, mode, models, options, cache_dir=BACKTEST_CACHE_DIR, model_version=None,
+             prediction_cache=False):
+    """폴드 1개 평가 -> (구간별 실측/예측 표, 소요 시간 정보)"""
+    started = time.perf_counter()
+    # insample 은 actual 과 같은 특성 (캐시 공유)
+    feature_mode = "forecast" if mode == "forecast" else "actual"
+    (frame, features, rows), cache_hit = fold_features(_DATASET, fold, feature_mode, options, cache_dir)
+    feature_seconds = time.perf_counter() - started
+
+    actual = _DATASET["df"].set_index("측정일시")[TARGET_COLUMN]
+    predictions = frame.copy()
+    predictions.insert(0, "폴드", fold["label"])
+    predictions["시간"] = predictions["측정일시"].dt.hour
+    predictions["실측 전기요금(원)"] = actual.reindex(predictions["측정일시"]).to_numpy()
+
+    fit_started = time.perf_counter()
+    refit_fold = fold if mode in REFIT_MODES else None
+    cost_models = {name: _cost_model(name, model_version, prediction_cache, refit_fold, options["params"]["n_jobs"],
+                                     cache_dir)
+                   for name in models}
+    fit_seconds = time.perf_counter() - fit_started
+
+    predict_started = time.perf_counter()
+    before = dict(_PREDICTION_CACHE["cache"].counts) if "cache" in _PREDICTION_CACHE else None
+    for name, model in cost_models.items():
+        predictions[name] = model.predict(features, rows)
+    info = {"fold": fold["label"], "cache_hit": cache_hit, "rows": len(predictions),
+            "feature_seconds": round(feature_seconds, 3), "fit_seconds": round(fit_seconds, 3),
+            "predict_seconds": round(time.perf_counter() - predict_started, 3),
+            "model_versions": {name: model.version for name, model in cost_models.items()}}
+    if prediction_cache:
+        counts = _PREDICTION_CACHE["cache"].counts
+        before = before or {key: 0 for key in counts}
+        info["prediction_hits"] = sum(counts[key] - before[key] for key in ("memory_hits", "disk_hits"))
+        info["prediction_misses"] = counts["misses"] - before["misses"]
+    return predictions, info
+
+
+# ========== 5. 지표 ==========
+def error_metrics(predictions, models, by):
+    """모델 x by 그룹별 MAE / MAPE / RMSE (MAPE 는 실측 요금이 0인 구간 제외)"""
+    actual = predictions["실측 전기요금(원)"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        inverse = np.where(actual > 0, 1 / actual, np.nan)
+    tables = []
+    for name in models:
+        error = predictions[name].to_numpy(dtype=float) - actual
+        errors = pd.DataFrame({"abs": np.abs(error), "sq": error ** 2, "ape": np.abs(error) * inverse})
+        grouped = errors.groupby([predictions[column] for column in by], sort=True, observed=True)
+        table = pd.DataFrame({
+            "MAE": grouped["abs"].mean(),
+            "MAPE(%)": grouped["ape"].mean() * 100,
+            "RMSE": np.sqrt(grouped["sq"].mean()),
+            "구간 수": grouped["abs"].count(),
+        })
+        table = table.reset_index()
+        table.insert(0, "모델", name)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def summarize(predictions, models, folds):
+    """폴드/시간/작업유형별 및 전체 지표 표"""
+    # 폴드/작업유형은 시간 순서, 부하 순서로 정렬되도록 범주형으로 묶음
+    ordered = predictions.assign(
+        폴드=pd.Categorical(predictions["폴드"], categories=[fold["label"] for fold in folds]),
+        작업유형=pd.Categorical(predictions["작업유형"], categories=WORKTYPES),
+        전체="전체",
+    )
+    return {
+        "fold": error_metrics(ordered, models, ["폴드"]),
+        "hour": error_metrics(ordered, models, ["시간"]),
+        "worktype": error_metrics(ordered, models, ["작업유형"]),
+        "overall": error_metrics(ordered, models, ["전체"]).drop(columns="전체"),
+    }
+
+
+def backtest(path=TRAIN_PATH, by="month", mode="actual", models=None, strategy="direct", horizon=HORIZON,
+             params=None, origin_stride=DEFAULT_ORIGIN_STRIDE, min_train_days=DEFAULT_MIN_TRAIN_DAYS,
+             workers=1, cache_dir=BACKTEST_CACHE_DIR, model_version=None, prediction_cache=True):
+    """롤링 오리진 백테스트 실행 -> (구간별 예측 표, 지표 표 dict, 폴드별 실행 정보)"""
+    if mode not in BACKTEST_MODES:
+        raise ValueError(f"알 수 없는 평가 방식: {mode} (가능: {', '.join(BACKTEST_MODES)})")
+    models = list(models or DEFAULT_TRAIN_MODELS)
+    if mode in REFIT_MODES:
+        if model_version is not None:
+            raise ValueError("저장된 모델 버전은 insample 모드에서만 평가할 수 있습니다 (다른 모드는 폴드마다 다시 학습)")
+        check_refit_models(models)
+    _init_worker(path)
+    folds = make_folds(_DATASET["df"]["측정일시"], by, min_train_days)
+    if not folds:
+        raise ValueError("평가할 폴드가 없습니다 (이력이 min_train_days 보다 짧음)")
+
+    # 프로세스 병렬일 때 측정값 모델 학습 스레드를 워커 수로 나눔
+    n_jobs = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    options = {"strategy": strategy, "horizon": horizon, "origin_stride": origin_stride,
+               "params": {**DEFAULT_PARAMS, "n_jobs": n_jobs, **(params or {})}}
+
+    if workers > 1 and len(folds) > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(path,)) as executor:
+            futures = [executor.submit(run_fold, fold, mode, models, options, cache_dir, model_version,
+                                       prediction_cache) for fold in folds]
+            results = [future.result() for future in as_completed(futures)]
+    else:
+        results = [run_fold(fold, mode, models, options, cache_dir, model_version, prediction_cache)
+                   for fold in folds]
+
+    fold_order = {fold["label"]: fold["fold"] for fold in folds}
+    results.sort(key=lambda r: fold_order[r[1]["fold"]])
+    predictions = pd.concat([r[0] for r in results], ignore_index=True)
+    return predictions, summarize(predictions, models, folds), [r[1] for r in results]
+
+
+# ========== 6. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="요금 모델 롤링 오리진 백테스트")
+    parser.add_argument("--data", default=TRAIN_PATH, help="15분 데이터 CSV")
+    parser.add_argument("--by", choices=list(FOLD_FREQ), default="month", help="폴드 단위")
+    parser.add_argument("--mode", choices=BACKTEST_MODES, default="actual", help="평가 방식")
+    parser.add_argument("--models", nargs="+", choices=list(COST_MODELS), default=list(DEFAULT_TRAIN_MODELS),
+                        help="평가할 요금 모델 (lstm 재학습은 requirements-train.txt 필요)")
+    parser.add_argument("--strategy", choices=FORECAST_STRATEGIES, default="direct", help="forecast 모드 예측 방식")
+    parser.add_argument("--min-train-days", type=int, default=DEFAULT_MIN_TRAIN_DAYS, help="첫 폴드 앞 최소 이력 일수")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 프로세스 수")
+    parser.add_argument("--model-version",
+                        help="insample 모드에서 평가할 모델 레지스트리 버전 ('current' 또는 버전 이름, 기본: models/ 파일)")
+    parser.add_argument("--no-cache", action="store_true", help="특성/예측 캐시 사용 안 함")
+    parser.add_argument("--out", default="./reports/backtest", help="출력 폴더")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    predictions, metrics, fold_info = backtest(
+        args.data, by=args.by, mode=args.mode, models=args.models, strategy=args.strategy,
+        min_train_days=args.min_train_days, workers=args.workers,
+        cache_dir=None if args.no_cache else BACKTEST_CACHE_DIR, model_version=args.model_version,
+        prediction_cache=not args.no_cache)
+    total_seconds = time.perf_counter() - started
+
+    os.makedirs(args.out, exist_ok=True)
+    predictions.to_csv(os.path.join(args.out, "predictions.csv"), index=False, encoding="utf-8-sig")
+    for name in ("fold", "hour", "worktype", "overall"):
+        metrics[name].to_csv(os.path.join(args.out, f"metrics_{name}.csv"), index=False, encoding="utf-8-sig")
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "data": args.data,
+            "data_version": data_version(args.data),
+            "by": args.by,
+            "mode": args.mode,
+            "strategy": args.strategy if args.mode == "forecast" else None,
+            "models": args.models,
+            # 재학습 모드는 폴드마다 모델이 다르므로 folds[].model_versions 에 기록
+            "model_versions": None if args.mode in REFIT_MODES else {
+                name: _cost_model(name, args.model_version).version if args.model_version
+                else data_version(MODEL_PATHS[name]) for name in args.models},
+            "in_sample": args.mode not in REFIT_MODES,
+            "workers": args.workers,
+            "total_seconds": round(total_seconds, 3),
+            "folds": fold_info,
+        }, f, ensure_ascii=False, indent=2)
+
+    print(metrics["fold"].to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+    print(metrics["overall"].to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+    if args.mode not in REFIT_MODES:
+        print("※ insample: 저장된 모델이 학습한 구간을 평가한 값이므로 일반화 성능이 아닙니다")
+    hits = sum(info["cache_hit"] for info in fold_info)
+    if not args.no_cache:
+        predicted = sum(info["prediction_hits"] + info["prediction_misses"] for info in fold_info)
+        cached_rows = sum(info["prediction_hits"] for info in fold_info)
+        print(f"예측 캐시: {cached_rows:,} / {predicted:,} 구간 적중")
+    print(f"완료: 폴드 {len(fold_info)}개 (캐시 {hits}개), {total_seconds:.1f}초 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""월/주/사용자 지정 기간별 보고서(DOCX/PDF) 일괄 생성
+
+사용 예:
+    python -m utills.batch_report --by month --out ./reports
+    python -m utills.batch_report --by week --workers 8
+    python -m utills.batch_report --by month --format pdf
+    python -m utills.batch_report --by month --appendix
+    python -m utills.batch_report --by range --ranges 2024-01-01:2024-01-07 2024-02-01:2024-02-29
+    python -m utills.batch_report --data ./data/plant_a.csv ./data/plant_b.csv --by month
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime, date
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utills.data import TRAIN_PATH, load_train_data, data_version
+from utills.charts import CHART_PRESETS, DEFAULT_PRESET, configure_chart_renderer
+from utills.report import compute_report_rollups
+from utills.report_jobs import REPORT_BUILDERS
+
+# 워커가 공유하는 데이터셋/집계 (fork 시 부모 메모리를 그대로 공유)
+_DATASETS = {}
+
+
+# ========== 1. 작업 목록 생성 ==========
+def plant_name(path):
+    """데이터 파일명을 사업장 이름으로 사용"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def month_jobs(df):
+    """데이터에 존재하는 모든 월"""
+    jobs = []
+    for period in sorted(df["년월"].unique()):
+        jobs.append({"view_type": "월별", "month": period.month,
+                     "start": period.start_time.date(), "end": period.end_time.date(),
+                     "label": f"{period.year}년 {period.month}월", "slug": f"{period.year}-{period.month:02d}"})
+    return jobs
+
+
+def range_job(start_day, end_day):
+    return {"view_type": "일별", "start": start_day, "end": end_day,
+            "label": f"{start_day} ~ {end_day} 기간", "slug": f"{start_day}_{end_day}"}
+
+
+def week_jobs(df):
+    """데이터에 존재하는 모든 주 (월~일)"""
+    weeks = df["측정일시"].dt.to_period("W-SUN").unique()
+    jobs = []
+    for week in sorted(weeks):
+        jobs.append(range_job(week.start_time.date(), week.end_time.date()))
+    return jobs
+
+
+def parse_ranges(values):
+    """'YYYY-MM-DD:YYYY-MM-DD' 목록을 기간 작업으로 변환"""
+    jobs = []
+    for value in values:
+        start_str, end_str = value.split(":")
+        start_day, end_day = date.fromisoformat(start_str), date.fromisoformat(end_str)
+        if start_day > end_day:
+            raise ValueError(f"시작 날짜가 종료 날짜보다 이후입니다: {value}")
+        jobs.append(range_job(start_day, end_day))
+    return jobs
+
+
+# ========== 2. 워커 ==========
+def load_dataset(path):
+    """데이터 로드 + 모든 작업이 공유할 집계"""
+    df = load_train_data(path)
+    # 날짜 정렬 후 날짜별 행 범위를 만들어 두면 기간 추출이 위치 슬라이싱이 됨
+    df = df.sort_values("측정일시").reset_index(drop=True)
+    dates = df["날짜"].to_numpy()
+    return {
+        "df": df,
+        "dates": dates,
+        "rollups": compute_report_rollups(df),
+        "version": data_version(path),
+    }
+
+
+def _init_worker(paths):
+    # spawn 환경이면 워커마다 한 번만 로드
+    for path in paths:
+        if path not in _DATASETS:
+            _DATASETS[path] = load_dataset(path)
+    # 이미 작업 단위로 병렬이므로 차트는 워커 안에서 직접 렌더링
+    configure_chart_renderer(max_workers=0)
+
+
+def _slice_days(dataset, start_day, end_day):
+    dates = dataset["dates"]
+    lo = dates.searchsorted(start_day, side="left")
+    hi = dates.searchsorted(end_day, side="right")
+    return dataset["df"].iloc[lo:hi]
+
+
+def run_job(path, job, out_dir, preset, report_format="docx", include_interval_appendix=False):
+    """보고서 1건 생성 후 파일 저장, 소요 시간 반환"""
+    started = time.perf_counter()
+    dataset = _DATASETS[path]
+    df = dataset["df"]
+
+    current_data = _slice_days(dataset, job["start"], job["end"])
+    selected_month = job.get("month")
+
+    # 기간 마지막 날을 특정일 분석 대상으로 사용
+    latest_date = current_data["날짜"].iloc[-1] if not current_data.empty else dataset["dates"][-1]
+    daily_data = _slice_days(dataset, latest_date, latest_date)
+
+    report = REPORT_BUILDERS[report_format](df, current_data, daily_data, latest_date, job["view_type"],
+                                     selected_month, job["label"], chart_preset=preset,
+                                     rollups=dataset["rollups"],
+                                     include_interval_appendix=include_interval_appendix)
+
+    plant = plant_name(path)
+    os.makedirs(os.path.join(out_dir, plant), exist_ok=True)
+    filename = os.path.join(out_dir, plant, f"전기요금_분석보고서_{job['slug']}.{report_format}")
+    with open(filename, "wb") as f:
+        f.write(report)
+    return {"file": filename, "bytes": len(report), "seconds": round(time.perf_counter() - started, 3)}
+
+
+# ========== 3. 실행 ==========
+def build_jobs(args, dataset):
+    if args.by == "month":
+        return month_jobs(dataset["df"])
+    if args.by == "week":
+        return week_jobs(dataset["df"])
+    return parse_ranges(args.ranges)
+
+
+def _manifest_job(path, job):
+    return {"plant": plant_name(path), "data": path, "view_type": job["view_type"], "label": job["label"],
+            "start": str(job["start"]), "end": str(job["end"])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="전기요금 분석 보고서 일괄 생성")
+    parser.add_argument("--data", nargs="+", default=[TRAIN_PATH], help="사업장별 데이터 CSV (여러 개 가능)")
+    parser.add_argument("--by", choices=["month", "week", "range"], default="month", help="보고서 단위")
+    parser.add_argument("--ranges", nargs="*", default=[], help="--by range 일 때 'YYYY-MM-DD:YYYY-MM-DD' 목록")
+    parser.add_argument("--out", default="./reports", help="출력 폴더")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 프로세스 수")
+    parser.add_argument("--format", choices=list(REPORT_BUILDERS), default="docx", help="보고서 형식")
+    parser.add_argument("--appendix", action="store_true", help="15분 단위 상세 부록 포함")
+    parser.add_argument("--preset", choices=list(CHART_PRESETS), default=DEFAULT_PRESET, help="차트 해상도 프리셋")
+    args = parser.parse_args(argv)
+
+    if args.by == "range" and not args.ranges:
+        parser.error("--by range 에는 --ranges 가 필요합니다")
+
+    total_started = time.perf_counter()
+
+    # 부모 프로세스에서 한 번만 로드 (fork 워커는 그대로 공유)
+    load_started = time.perf_counter()
+    for path in args.data:
+        _DATASETS[path] = load_dataset(path)
+    load_seconds = time.perf_counter() - load_started
+
+    tasks = []
+    for path in args.data:
+        for job in build_jobs(args, _DATASETS[path]):
+            tasks.append((path, job))
+    print(f"보고서 {len(tasks)}건 생성 시작 (워커 {args.workers}개)")
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                             initializer=_init_worker, initargs=(args.data,)) as executor:
+        futures = {executor.submit(run_job, path, job, args.out, args.preset, args.format, args.appendix): (path, job)
+                   for path, job in tasks}
+        for future in as_completed(futures):
+            path, job = futures[future]
+            entry = _manifest_job(path, job)
+            try:
+                entry.update(future.result())
+                entry["status"] = "ok"
+            except Exception as e:
+                entry["status"] = "error"
+                entry["error"] = str(e)
+            results.append(entry)
+            print(f"[{len(results)}/{len(tasks)}] {entry['plant']} {entry['label']}: {entry['status']}"
+                  f" ({entry.get('seconds', 0):.1f}초)")
+
+    results.sort(key=lambda e: (e["plant"], e["start"], e["end"]))
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "by": args.by,
+        "workers": args.workers,
+        "format": args.format,
+        "preset": args.preset,
+        "appendix": args.appendix,
+        "datasets": {path: _DATASETS[path]["version"] for path in args.data},
+        "load_seconds": round(load_seconds, 3),
+        "total_seconds": round(time.perf_counter() - total_started, 3),
+        "jobs": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    manifest_path = os.path.join(args.out, "manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    failed = sum(1 for e in results if e["status"] != "ok")
+    print(f"완료: {len(results) - failed}건 성공, {failed}건 실패, {manifest['total_seconds']:.1f}초 -> {manifest_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
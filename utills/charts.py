@@ -0,0 +1,409 @@
+import os
+import json
+import hashlib
+import multiprocessing
+import threading
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib
+from matplotlib.figure import Figure
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# matplotlib 한글 폰트 설정
+matplotlib.rcParams['font.family'] = ['Malgun Gothic', 'DejaVu Sans']
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+# 해상도/크기 프리셋 (figsize 배율, dpi)
+CHART_PRESETS = {
+    "draft": {"dpi": 100, "scale": 0.8},
+    "screen": {"dpi": 150, "scale": 1.0},
+    "print": {"dpi": 300, "scale": 1.0},
+}
+DEFAULT_PRESET = "print"
+CHART_CACHE_DIR = "./.cache/charts"
+# 디스크 PNG 캐시 상한 (넘으면 오래 안 쓴 파일부터 삭제)
+CHART_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# kaleido 상주 서버는 요청/응답 큐 하나를 공유하므로 한 프로세스 안에서는 한 번에 하나씩 내보냄
+_export_lock = threading.Lock()
+
+
+# ========== 1. Plotly 차트 생성 함수들 ==========
+def create_dual_axis_chart(df, x_col, y1_col, y2_col, title, x_title, y1_title, y2_title, add_time_zones=False):
+    """듀얼 축 차트 생성"""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+    if add_time_zones and x_title == "시간":
+        fig.add_vrect(x0=-0.5, x1=5.5, fillcolor="rgba(25, 25, 112, 0.1)", layer="below", line_width=0,
+                     annotation_text="야간 (00-05시)", annotation_position="top left")
+        fig.add_vrect(x0=5.5, x1=17.5, fillcolor="rgba(255, 255, 0, 0.05)", layer="below", line_width=0,
+                     annotation_text="주간 (06-17시)", annotation_position="top")
+        fig.add_vrect(x0=17.5, x1=21.5, fillcolor="rgba(128, 0, 128, 0.08)", layer="below", line_width=0,
+                     annotation_text="저녁 (18-21시)", annotation_position="top right")
+        fig.add_vrect(x0=21.5, x1=23.5, fillcolor="rgba(25, 25, 112, 0.1)", layer="below", line_width=0,
+                     annotation_text="야간 (22-23시)", annotation_position="top right")
+
+    fig.add_trace(go.Scatter(x=df[x_col], y=df[y1_col], name=y1_title, line=dict(color="#1f77b4", width=3),
+                           mode="lines+markers", marker=dict(size=6)), secondary_y=False)
+    fig.add_trace(go.Scatter(x=df[x_col], y=df[y2_col], name=y2_title, line=dict(color="#ff7f0e", width=3),
+                           mode="lines+markers", marker=dict(size=6)), secondary_y=True)
+
+    fig.update_xaxes(title_text=x_title)
+    fig.update_yaxes(title_text=y1_title, secondary_y=False, title_font_color="#1f77b4")
+    fig.update_yaxes(title_text=y2_title, secondary_y=True, title_font_color="#ff7f0e")
+    fig.update_layout(title=title, hovermode="x unified", template="plotly_white", height=500,
+                     font=dict(family="맑은 고딕"))
+    return fig
+
+def add_interval_band(fig, x, lower, upper, name="예측 구간", color="rgba(26, 115, 232, 0.15)"):
+    """기존 선 차트 뒤에 예측 구간 밴드 추가 (하한~상한 채움, 구간 값이 없는 점은 끊김)"""
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    if not np.isfinite(lower).any():
+        return fig
+    fig.add_trace(go.Scatter(x=x, y=upper, mode="lines", line=dict(width=0), showlegend=False,
+                             hoverinfo="skip", name=f"{name} 상한"))
+    fig.add_trace(go.Scatter(x=x, y=lower, mode="lines", line=dict(width=0), fill="tonexty", fillcolor=color,
+                             name=name, customdata=upper,
+                             hovertemplate="%{y:,.0f} ~ %{customdata:,.0f}원<extra>" + name + "</extra>"))
+    # 밴드를 선 아래에 그리도록 맨 앞으로
+    fig.data = fig.data[-2:] + fig.data[:-2]
+    return fig
+
+def create_hourly_stack_chart(df):
+    """시간별 스택 차트 생성"""
+    hourly_worktype = df.groupby(["시간", "작업유형"])["전기요금(원)"].sum().unstack(fill_value=0)
+    colors = {"Light_Load": "rgba(76, 175, 80, 0.7)", "Medium_Load": "rgba(255, 152, 0, 0.7)", "Maximum_Load": "rgba(244, 67, 54, 0.7)"}
+
+    fig = go.Figure()
+    for work_type in ["Light_Load", "Medium_Load", "Maximum_Load"]:
+        if work_type in hourly_worktype.columns:
+            fig.add_trace(go.Bar(name=work_type, x=hourly_worktype.index, y=hourly_worktype[work_type],
+                               marker_color=colors.get(work_type)))
+
+    fig.update_layout(barmode="stack", title="시간대별 작업유형별 전기요금 현황", xaxis_title="시간 (Hour)",
+                     yaxis_title="전기요금 (원)", height=500, plot_bgcolor="white", paper_bgcolor="white",
+                     font=dict(family="맑은 고딕"))
+    return fig
+
+def create_load_shift_chart(before, after, title="부하 이전 전/후 시간대별 사용량"):
+    """부하 이전 전/후 시간 x 작업유형 사용량 스택 비교 (before/after: 시간 인덱스, 작업유형 컬럼)"""
+    colors = {"Light_Load": "rgba(76, 175, 80, 0.7)", "Medium_Load": "rgba(255, 152, 0, 0.7)", "Maximum_Load": "rgba(244, 67, 54, 0.7)"}
+    names = {"Light_Load": "경부하", "Medium_Load": "중간부하", "Maximum_Load": "최대부하"}
+
+    fig = make_subplots(rows=1, cols=2, shared_yaxes=True, subplot_titles=("이전 전", "이전 후"))
+    for col, table in enumerate((before, after), start=1):
+        for work_type in ["Light_Load", "Medium_Load", "Maximum_Load"]:
+            if work_type in table.columns:
+                fig.add_trace(go.Bar(name=names[work_type], x=table.index, y=table[work_type],
+                                     marker_color=colors[work_type], legendgroup=work_type, showlegend=(col == 1)),
+                              row=1, col=col)
+
+    fig.update_xaxes(title_text="시간 (Hour)", tickmode="linear", tick0=0, dtick=2)
+    fig.update_yaxes(title_text="전력사용량 (kWh)", row=1, col=1)
+    fig.update_layout(barmode="stack", title=title, height=450, plot_bgcolor="white", paper_bgcolor="white",
+                      font=dict(family="맑은 고딕"))
+    return fig
+
+def create_concentric_donut_chart(df):
+    """도넛 차트 생성"""
+    worktype_mwh = df.groupby("작업유형")["전력사용량(kWh)"].sum() / 1000
+    total_mwh = worktype_mwh.sum()
+
+    chart_data_map = {"Light_Load": {"name": "경부하", "color": "#4CAF50"},
+                     "Medium_Load": {"name": "중간부하", "color": "#FF9800"},
+                     "Maximum_Load": {"name": "최대부하", "color": "#F44336"}}
+
+    labels, values, colors = [], [], []
+    for work_type, data in chart_data_map.items():
+        if work_type in worktype_mwh.index:
+            labels.append(data["name"])
+            values.append(worktype_mwh[work_type])
+            colors.append(data["color"])
+
+    fig = go.Figure(data=[go.Pie(labels=labels, values=values, hole=0.55, marker=dict(colors=colors))])
+    fig.update_layout(title="부하대별 에너지 사용량 분포", height=500,
+                     annotations=[dict(text=f"총 {total_mwh:,.1f} MWh", x=0.5, y=0.5, showarrow=False)],
+                     font=dict(family="맑은 고딕"))
+    return fig
+
+
+# ========== 2. matplotlib 차트 생성 함수 ==========
+def create_matplotlib_chart(data, chart_type="line", title="Chart", xlabel="X", ylabel="Y", figsize=(10, 6), dpi=300):
+    """matplotlib로 간단한 차트 생성"""
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    fig.patch.set_facecolor('white')
+    
+    if chart_type == "line" and len(data.columns) >= 2:
+        x_data = data.iloc[:, 0]
+        y_data = data.iloc[:, 1]
+        ax.plot(x_data, y_data, marker='o', linewidth=2, markersize=6, color='#1f77b4')
+    
+    elif chart_type == "bar" and len(data.columns) >= 2:
+        x_data = data.iloc[:, 0]
+        y_data = data.iloc[:, 1]
+        bars = ax.bar(x_data, y_data, color=['#1f77b4', '#ff7f0e', '#2ca02c'])
+        
+        # 막대 위에 값 표시
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height,
+                   f'{height:,.0f}', ha='center', va='bottom')
+    
+    elif chart_type == "pie" and len(data.columns) >= 2:
+        labels = data.iloc[:, 0]
+        sizes = data.iloc[:, 1]
+        colors = ['#ff9999', '#66b3ff', '#99ff99', '#ffcc99']
+        wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%', 
+                                         colors=colors, startangle=90)
+        ax.axis('equal')
+    
+    elif chart_type == "stack" and len(data.columns) >= 2:
+        # 첫 컬럼은 x축, 나머지 컬럼을 순서대로 쌓음
+        x_data = data.iloc[:, 0]
+        stack_colors = ['#4CAF50', '#FF9800', '#F44336']
+        bottom = np.zeros(len(data))
+        for i, col in enumerate(data.columns[1:]):
+            ax.bar(x_data, data[col], bottom=bottom, label=col, color=stack_colors[i % len(stack_colors)])
+            bottom += data[col].to_numpy(dtype=float)
+        ax.legend()
+    
+    ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.grid(True, alpha=0.3)
+    
+    fig.tight_layout()
+    
+    # 이미지로 변환 (pyplot 전역 상태를 쓰지 않으므로 백그라운드 스레드에서도 안전)
+    img_buffer = BytesIO()
+    fig.savefig(img_buffer, format='png', dpi=dpi, bbox_inches='tight', 
+                facecolor='white', edgecolor='none')
+    img_buffer.seek(0)
+    
+    return img_buffer
+
+
+# ========== 3. 차트 스펙 ==========
+def matplotlib_spec(data, chart_type="line", title="Chart", xlabel="X", ylabel="Y", figsize=(10, 6)):
+    """프로세스 풀로 보낼 수 있는 matplotlib 차트 스펙 생성"""
+    return {
+        "engine": "matplotlib",
+        "chart_type": chart_type,
+        "data": {str(col): data[col].astype(object).tolist() for col in data.columns},
+        "title": title,
+        "xlabel": xlabel,
+        "ylabel": ylabel,
+        "figsize": list(figsize),
+    }
+
+
+def plotly_spec(fig, figsize=(10, 5)):
+    """Plotly Figure를 JSON 스펙으로 변환"""
+    return {"engine": "plotly", "figure": fig.to_json(), "figsize": list(figsize)}
+
+
+def chart_hash(spec, preset=DEFAULT_PRESET):
+    """스펙 + 프리셋 내용 해시 (PNG 캐시 키)"""
+    raw = json.dumps({"spec": spec, "preset": CHART_PRESETS[preset]}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def render_chart_spec(spec, preset=DEFAULT_PRESET):
+    """스펙 1개를 PNG 바이트로 렌더링"""
+    settings = CHART_PRESETS[preset]
+    figsize = [v * settings["scale"] for v in spec["figsize"]]
+
+    if spec["engine"] == "matplotlib":
+        data = pd.DataFrame(spec["data"])
+        img_buffer = create_matplotlib_chart(data, spec["chart_type"], spec["title"], spec["xlabel"],
+                                             spec["ylabel"], figsize=figsize, dpi=settings["dpi"])
+        return img_buffer.getvalue()
+
+    if spec["engine"] == "plotly":
+        import plotly.io as pio
+        fig = pio.from_json(spec["figure"])
+        # figsize(inch) * 100px 기준, dpi 비율만큼 scale
+        with _export_lock:
+            return fig.to_image(format="png", width=int(figsize[0] * 100), height=int(figsize[1] * 100),
+                                scale=settings["dpi"] / 100)
+
+    raise ValueError(f"지원하지 않는 차트 엔진: {spec['engine']}")
+
+
+# ========== 4. 렌더러 풀 ==========
+def _warm_up_worker():
+    """워커 시작 시 matplotlib 백엔드를 고정하고 Plotly 정적 내보내기 서버를 띄워 둠
+
+    kaleido 1.x 는 to_image 마다 Chrome 을 새로 띄우므로 상주 서버(start_sync_server)를 연다.
+    서버 스레드는 Chrome 이 없으면 조용히 죽어 요청이 멈추므로, 한 번 내보내기가 성공한 뒤에만 연다.
+    """
+    matplotlib.use("Agg")
+    try:
+        import kaleido
+        import plotly.io as pio
+        pio.to_image(go.Figure(), format="png", width=10, height=10)
+        if hasattr(kaleido, "start_sync_server"):
+            kaleido.start_sync_server(silence_warnings=True)
+    except Exception:
+        # kaleido/Chrome 이 없으면 Plotly 차트만 실패로 보고됨
+        pass
+
+
+class ChartRenderer:
+    """프로세스 풀에서 차트를 병렬 렌더링하고 PNG를 내용 해시로 캐시
+
+    max_workers=0 이면 풀 없이 현재 프로세스에서 렌더링한다.
+    """
+
+    def __init__(self, max_workers=None, cache_dir=CHART_CACHE_DIR, max_memory_items=256,
+                 max_cache_bytes=CHART_CACHE_MAX_BYTES):
+        if max_workers is None:
+            max_workers = max(1, min(4, (os.cpu_count() or 1) - 1))
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self._memory = {}
+        self._max_memory_items = max_memory_items
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and self.max_workers > 0:
+                # 스트림릿 스레드가 살아 있는 프로세스에서 fork 하지 않도록 spawn 사용
+                context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                                     initializer=_warm_up_worker)
+            return self._executor
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def _load_cached(self, digest):
+        with self._lock:
+            if digest in self._memory:
+                return self._memory[digest]
+        if self.cache_dir and os.path.exists(self._cache_path(digest)):
+            with open(self._cache_path(digest), "rb") as f:
+                png = f.read()
+            # 최근 사용 시각 갱신 (정리 시 오래 안 쓴 파일부터 삭제)
+            os.utime(self._cache_path(digest))
+            self._remember(digest, png)
+            return png
+        return None
+
+    def _remember(self, digest, png):
+        with self._lock:
+            if len(self._memory) >= self._max_memory_items:
+                self._memory.pop(next(iter(self._memory)))
+            self._memory[digest] = png
+
+    def _store(self, digest, png):
+        self._remember(digest, png)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._cache_path(digest) + f".{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, self._cache_path(digest))
+
+    def _prune_disk_cache(self):
+        """디스크 캐시가 상한을 넘으면 수정 시각이 오래된 PNG 부터 삭제"""
+        if not self.cache_dir or not self.max_cache_bytes or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".png"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # 다른 프로세스가 먼저 삭제
+                pass
+            total -= size
+
+    def render_many(self, specs, preset=DEFAULT_PRESET):
+        """{이름: 스펙} -> {이름: PNG 바이트 또는 Exception}"""
+        digests = {name: chart_hash(spec, preset) for name, spec in specs.items()}
+        results = {}
+        pending = {}
+        for name, digest in digests.items():
+            png = self._load_cached(digest)
+            if png is not None:
+                results[name] = png
+            elif digest not in pending:
+                pending[digest] = specs[name]
+
+        executor = self._get_executor() if len(pending) > 0 else None
+        if executor is not None:
+            futures = {digest: executor.submit(render_chart_spec, spec, preset) for digest, spec in pending.items()}
+            rendered = {}
+            for digest, future in futures.items():
+                try:
+                    rendered[digest] = future.result()
+                except Exception as e:
+                    rendered[digest] = e
+        else:
+            rendered = {}
+            for digest, spec in pending.items():
+                try:
+                    rendered[digest] = render_chart_spec(spec, preset)
+                except Exception as e:
+                    rendered[digest] = e
+
+        for digest, png in rendered.items():
+            if not isinstance(png, Exception):
+                self._store(digest, png)
+        if any(not isinstance(png, Exception) for png in rendered.values()):
+            self._prune_disk_cache()
+        for name, digest in digests.items():
+            if name not in results:
+                results[name] = rendered[digest]
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_chart_renderer():
+    """프로세스 전역에서 재사용하는 렌더러 (풀은 첫 사용 시 생성되어 유지)"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ChartRenderer()
+        return _renderer
+
+
+def configure_chart_renderer(max_workers=None, cache_dir=CHART_CACHE_DIR, max_cache_bytes=CHART_CACHE_MAX_BYTES):
+    """전역 렌더러 설정 교체 (배치 워커처럼 이미 병렬인 곳에서는 max_workers=0)"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is not None:
+            _renderer.shutdown()
+        _renderer = ChartRenderer(max_workers=max_workers, cache_dir=cache_dir, max_cache_bytes=max_cache_bytes)
+        if max_workers == 0:
+            # 현재 프로세스에서 렌더링하므로 여기서 내보내기 서버를 띄워 둠
+            _warm_up_worker()
+        return _renderer
+
+
+def render_charts(specs, preset=DEFAULT_PRESET):
+    """전역 렌더러로 여러 차트를 한 번에 렌더링"""
+    return get_chart_renderer().render_many(specs, preset)
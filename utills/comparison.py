@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from utills.data import NUMERIC_COLUMNS, RATIO_COLUMNS
+
+# 비교표 측정값 (현재, 이전, 변화량, 변화율)
+COMPARISON_MEASURES = ["현재", "이전", "변화량", "변화율(%)"]
+
+
+# ========== 1. 기간별 비교 집계 ==========
+def period_rollup(df, by):
+    """기간(by: "년월" 또는 "날짜")별 합계/평균을 한 번의 groupby로 계산 (역률은 평균)"""
+    agg = {col: ("mean" if col in RATIO_COLUMNS else "sum") for col in NUMERIC_COLUMNS}
+    return df.groupby(by)[NUMERIC_COLUMNS].agg(agg).sort_index()
+
+
+def build_comparison_frame(df, by="년월"):
+    """모든 기간의 현재/이전/변화량/변화율을 한 번에 계산한 숫자 프레임
+
+    인덱스는 기간, 컬럼은 (측정값, 항목) MultiIndex.
+    월별은 달력상 전월과 비교하도록 빈 달을 채운 뒤 shift 하고 (빈 달은 NaN),
+    일별은 데이터가 있는 직전 날짜와 비교한다.
+    """
+    current = period_rollup(df, by)
+    if by == "년월" and not current.empty:
+        full_range = pd.period_range(current.index.min(), current.index.max(), freq="M")
+        current = current.reindex(full_range)
+        current.index.name = by
+
+    previous = current.shift(1)
+    change = current - previous
+    prev_values = previous.to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(prev_values != 0, change.to_numpy() / prev_values * 100, 0.0)
+    pct = pd.DataFrame(np.where(np.isnan(prev_values), np.nan, pct), index=current.index, columns=current.columns)
+
+    frame = pd.concat([current, previous, change, pct], axis=1, keys=COMPARISON_MEASURES)
+    return frame.dropna(how="all", subset=[("현재", col) for col in NUMERIC_COLUMNS])
+
+
+def build_comparisons(df):
+    """월별/일별 비교 프레임 (페이지에서 한 번 계산해 두고 조회)"""
+    return {
+        "월": build_comparison_frame(df, "년월"),
+        "일": build_comparison_frame(df, "날짜"),
+    }
+
+
+# ========== 2. 조회 ==========
+def has_previous(frame, period):
+    """이전 기간 데이터가 있는지"""
+    return period in frame.index and not frame.loc[period, "이전"].isna().all()
+
+
+def comparison_table(frame, period, period_type="일"):
+    """특정 기간의 비교표 (항목 x 현재/이전/변화량/변화율, 숫자 그대로)"""
+    row = frame.loc[period]
+    table = row.unstack(level=0).reindex(index=NUMERIC_COLUMNS, columns=COMPARISON_MEASURES)
+    table = table.rename(columns={"현재": f"현재{period_type}", "이전": f"이전{period_type}"})
+    table.index.name = "항목"
+    return table.reset_index()
+
+
+def format_comparison_table(table):
+    """표시용 Styler (숫자는 유지하고 표시 형식만 지정)"""
+    value_columns = [col for col in table.columns if col not in ("항목", "변화량", "변화율(%)")]
+    formats = {col: "{:.2f}" for col in value_columns}
+    formats["변화량"] = "{:+.2f}"
+    formats["변화율(%)"] = "{:+.1f}%"
+    return table.style.format(formats, na_rep="-")
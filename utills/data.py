@@ -0,0 +1,34 @@
+import os
+import hashlib
+
+import pandas as pd
+
+# ========== 공통 상수 ==========
+TRAIN_PATH = "./data/train.csv"
+
+NUMERIC_COLUMNS = ["전력사용량(kWh)", "지상무효전력량(kVarh)", "진상무효전력량(kVarh)", "탄소배출량(tCO2)",
+                   "지상역률(%)", "진상역률(%)", "전기요금(원)"]
+RATIO_COLUMNS = ["지상역률(%)", "진상역률(%)"]
+
+WORKTYPES = ["Light_Load", "Medium_Load", "Maximum_Load"]
+WORKTYPE_NAMES = {"Light_Load": "경부하", "Medium_Load": "중간부하", "Maximum_Load": "최대부하"}
+
+
+# ========== 데이터 로드 ==========
+def load_train_data(path=TRAIN_PATH):
+    """train.csv 로드 및 전처리 (streamlit 없이 사용 가능)"""
+    df = pd.read_csv(path)
+    df["측정일시"] = pd.to_datetime(df["측정일시"])
+    df["날짜"] = df["측정일시"].dt.date
+    df["시간"] = df["측정일시"].dt.hour
+    df["월"] = df["측정일시"].dt.month
+    df["일"] = df["측정일시"].dt.day
+    df["년월"] = df["측정일시"].dt.to_period("M")
+    return df
+
+
+def data_version(path=TRAIN_PATH):
+    """파일 크기/수정시각 기반 데이터 버전 (캐시 키용)"""
+    stat = os.stat(path)
+    raw = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
@@ -0,0 +1,179 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# 15분 전력량(kWh) -> 평균 수요전력(kW)
+INTERVALS_PER_HOUR = 4
+
+# 요금적용전력 산정 시 직전 12개월 중 반영하는 달 (겨울철/여름철)
+RATCHET_MONTHS = (1, 2, 7, 8, 9, 12)
+RATCHET_WINDOW_MONTHS = 12
+
+# 구간별 이동 최대값 창 (최근 30일)
+ROLLING_WINDOW = pd.Timedelta(days=30)
+
+
+# ========== 1. 이동 최대값 ==========
+class SlidingWindowMax:
+    """시간 창 안의 최대값과 발생 시각 (단조 감소 deque, 갱신은 분할상환 O(1))
+
+    window 는 Timedelta(시각 기준) 또는 int(최근 n개)이며, 시각은 단조 증가해야 한다.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._items = deque()  # (순번, 시각, 값), 값은 앞에서부터 감소
+        self._count = 0
+
+    def push(self, timestamp, value):
+        items = self._items
+        while items and items[-1][2] <= value:
+            items.pop()
+        items.append((self._count, timestamp, value))
+        self._count += 1
+        self._expire(timestamp)
+        return self.peak
+
+    def _expire(self, now):
+        items = self._items
+        if isinstance(self.window, int):
+            oldest = self._count - self.window
+            while items and items[0][0] < oldest:
+                items.popleft()
+        else:
+            while items and now - items[0][1] >= self.window:
+                items.popleft()
+
+    @property
+    def peak(self):
+        """(최대값, 발생 시각), 비어 있으면 (nan, None)"""
+        if not self._items:
+            return np.nan, None
+        _, timestamp, value = self._items[0]
+        return value, timestamp
+
+    def clear(self):
+        self._items.clear()
+
+
+# ========== 2. 이력 일괄 계산 ==========
+def interval_demand(df):
+    """15분 구간별 수요전력(kW) 시계열 (측정일시 인덱스, 시간순)"""
+    series = df.set_index("측정일시")["전력사용량(kWh)"].sort_index()
+    return series * INTERVALS_PER_HOUR
+
+
+def rolling_peak_demand(df, window=ROLLING_WINDOW):
+    """구간마다 직전 window 동안의 최대 수요전력과 발생 시각"""
+    demand = interval_demand(df)
+    tracker = SlidingWindowMax(window)
+    peaks = np.empty(len(demand))
+    peak_times = []
+    for i, (timestamp, value) in enumerate(zip(demand.index, demand.to_numpy())):
+        peaks[i], peak_time = tracker.push(timestamp, value)
+        peak_times.append(peak_time)
+    return pd.DataFrame({"수요전력(kW)": demand.to_numpy(), "최대수요전력(kW)": peaks,
+                         "최대수요 발생시각": peak_times}, index=demand.index)
+
+
+def ratchet_demand(monthly_peaks, months, ratchet_months=RATCHET_MONTHS, window=RATCHET_WINDOW_MONTHS):
+    """월별 최대수요 배열 -> 당월 포함 직전 window 개월 중 ratchet_months 의 최대값 (없으면 0)
+
+    months 는 PeriodIndex (월 단위, 빠진 달이 있어도 달력 기준으로 창을 계산).
+    """
+    month_numbers = months.year.to_numpy() * 12 + months.month.to_numpy()
+    tracker = deque()  # (월 번호, 값), 값은 앞에서부터 감소
+    result = np.zeros(len(monthly_peaks))
+    for i, (number, month, peak) in enumerate(zip(month_numbers, months.month, monthly_peaks)):
+        if month in ratchet_months:
+            while tracker and tracker[-1][1] <= peak:
+                tracker.pop()
+            tracker.append((number, peak))
+        while tracker and tracker[0][0] <= number - window:
+            tracker.popleft()
+        result[i] = tracker[0][1] if tracker else 0.0
+    return result
+
+
+def monthly_peak_demand(df, ratchet_months=RATCHET_MONTHS):
+    """월별 최대수요전력, 발생 시각, 12개월 요금적용전력"""
+    demand = interval_demand(df)
+    months = demand.index.to_period("M")
+    frame = pd.DataFrame({"kW": demand.to_numpy(), "년월": months, "시각": demand.index})
+    peak_rows = frame.loc[frame.groupby("년월", sort=True)["kW"].idxmax()]
+    table = pd.DataFrame({
+        "최대수요전력(kW)": peak_rows["kW"].to_numpy(),
+        "최대수요 발생시각": peak_rows["시각"].to_numpy(),
+    }, index=pd.PeriodIndex(peak_rows["년월"], name="년월"))
+    ratchet = ratchet_demand(table["최대수요전력(kW)"].to_numpy(), table.index, ratchet_months)
+    table["12개월 반영전력(kW)"] = ratchet
+    table["요금적용전력(kW)"] = np.maximum(table["최대수요전력(kW)"], ratchet)
+    return table
+
+
+# ========== 3. 실시간 추적 ==========
+class DemandTracker:
+    """실시간 구간이 들어올 때마다 당월/최근 30일/12개월 최대수요를 갱신 (구간당 O(1))"""
+
+    def __init__(self, window=ROLLING_WINDOW, ratchet_months=RATCHET_MONTHS):
+        self.ratchet_months = ratchet_months
+        self._rolling = SlidingWindowMax(window)
+        self._closed_months = {}  # 월 번호 -> (최대수요, 발생 시각), 창 밖의 달은 정리
+        self._month = None
+        self._month_peak = (np.nan, None)
+        self.last_timestamp = None
+
+    @classmethod
+    def from_history(cls, df, **kwargs):
+        """과거 이력으로 상태를 채운 추적기 (12개월 요금적용전력 계산용)"""
+        tracker = cls(**kwargs)
+        demand = interval_demand(df)
+        for timestamp, value in zip(demand.index, demand.to_numpy()):
+            tracker._push_demand(timestamp, value)
+        return tracker
+
+    def update(self, timestamp, kwh):
+        """15분 전력량 1건 반영 후 현재 상태 반환"""
+        self._push_demand(pd.Timestamp(timestamp), float(kwh) * INTERVALS_PER_HOUR)
+        return self.state()
+
+    def _push_demand(self, timestamp, kw):
+        month = timestamp.year * 12 + timestamp.month
+        if month != self._month:
+            if self._month is not None:
+                self._closed_months[self._month] = self._month_peak
+            self._closed_months = {m: peak for m, peak in self._closed_months.items()
+                                   if m > month - RATCHET_WINDOW_MONTHS}
+            self._month = month
+            self._month_peak = (np.nan, None)
+        if not kw <= self._month_peak[0]:
+            self._month_peak = (kw, timestamp)
+        self._rolling.push(timestamp, kw)
+        self.last_timestamp = timestamp
+
+    def _ratchet_peak(self):
+        # 지난 달 수는 최대 11개라 상수 시간
+        best = (0.0, None)
+        for month, (kw, timestamp) in self._closed_months.items():
+            if (month - 1) % 12 + 1 in self.ratchet_months and kw > best[0]:
+                best = (kw, timestamp)
+        current_month = (self._month - 1) % 12 + 1 if self._month is not None else None
+        if current_month in self.ratchet_months and self._month_peak[0] > best[0]:
+            best = self._month_peak
+        return best
+
+    def state(self):
+        month_kw, month_time = self._month_peak
+        rolling_kw, rolling_time = self._rolling.peak
+        ratchet_kw, ratchet_time = self._ratchet_peak()
+        billing_kw = np.nanmax([month_kw, ratchet_kw]) if self._month is not None else np.nan
+        return {
+            "당월 최대수요전력(kW)": month_kw,
+            "당월 최대수요 발생시각": month_time,
+            "최근 30일 최대수요전력(kW)": rolling_kw,
+            "최근 30일 최대수요 발생시각": rolling_time,
+            "12개월 반영전력(kW)": ratchet_kw,
+            "12개월 반영 발생시각": ratchet_time,
+            "요금적용전력(kW)": billing_kw,
+        }
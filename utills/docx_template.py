@@ -0,0 +1,129 @@
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.shared import Cm
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+PAGE_BORDERS_XML = '''
+<w:pgBorders %s w:offsetFrom="page">
+    <w:top w:val="single" w:sz="12" w:space="24" w:color="auto"/>
+    <w:left w:val="single" w:sz="12" w:space="24" w:color="auto"/>
+    <w:bottom w:val="single" w:sz="12" w:space="24" w:color="auto"/>
+    <w:right w:val="single" w:sz="12" w:space="24" w:color="auto"/>
+</w:pgBorders>
+''' % nsdecls("w")
+
+# 헤더 표 기본값. "{...}" 자리는 보고서마다 new_report_document 에서 채움
+DEFAULT_HEADER_ROWS = (
+    ("보고처", "에너지관리팀", "보고서명", "전력 분석 보고서 ({period_label})"),
+    ("장소", "본사", "취급분류", "○기밀 ●보통"),
+    ("작성일자", "{created_date}", "작성자", "홍Zoo형"),
+    ("참가자", "에너지관리팀, 시설관리팀, 경영진", "", ""),
+    ("자료출처", "전력량계 실시간 데이터, 한국전력공사 요금체계", "", ""),
+)
+
+
+# ========== 1. 기본 템플릿 ==========
+@lru_cache(maxsize=8)
+def build_base_template(title="보 고 서", header_rows=DEFAULT_HEADER_ROWS, content_title="보고내용"):
+    """페이지 테두리 + 6x4 헤더 표 + 본문 제목까지 만든 템플릿 문서 (프로세스당 1회 생성)"""
+    doc = Document()
+
+    # 전체 문서에 테두리 추가
+    for section in doc.sections:
+        sectPr = section._sectPr
+        if not sectPr.xpath('.//w:pgBorders'):
+            sectPr.append(parse_xml(PAGE_BORDERS_XML))
+
+    # 보고서 헤더 테이블
+    header_table = doc.add_table(rows=len(header_rows) + 1, cols=4)
+    header_table.style = 'Table Grid'
+
+    # 제목 행
+    title_cell = header_table.rows[0].cells[0]
+    title_cell.merge(header_table.rows[0].cells[3])
+    title_cell.text = title
+    title_cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title_para = title_cell.paragraphs[0]
+    title_para.runs[0].font.size = Cm(0.8)
+    title_para.runs[0].bold = True
+
+    # 헤더 정보 입력
+    for i, (col1, val1, col2, val2) in enumerate(header_rows, 1):
+        header_table.rows[i].cells[0].text = col1
+        header_table.rows[i].cells[1].text = val1
+        if col2:
+            header_table.rows[i].cells[2].text = col2
+            header_table.rows[i].cells[3].text = val2
+        else:
+            header_table.rows[i].cells[1].merge(header_table.rows[i].cells[3])
+
+    doc.add_paragraph()
+
+    if content_title:
+        heading = doc.add_heading(content_title, level=1)
+        heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def new_report_document(period_label, created_date=None, **template_options):
+    """템플릿을 복제해 헤더 자리값만 채운 새 문서"""
+    doc = Document(BytesIO(build_base_template(**template_options)))
+    values = {
+        "{period_label}": period_label,
+        "{created_date}": created_date or datetime.now().strftime("%Y년 %m월 %d일"),
+    }
+    header_tbl = doc.tables[0]._tbl
+    for t in header_tbl.iter(qn("w:t")):
+        if t.text and "{" in t.text:
+            for placeholder, value in values.items():
+                t.text = t.text.replace(placeholder, str(value))
+    return doc
+
+
+# ========== 2. 표 일괄 작성 ==========
+def add_bulk_table(doc, header, rows, style='Table Grid', bold_header=False):
+    """헤더 + 데이터 행을 한 번에 작성한 표 추가
+
+    행마다 add_row().cells / cell.text 를 호출하면 python-docx가 매번 표 격자를 다시 훑어
+    행 수가 많을수록 급격히 느려진다. 여기서는 헤더 셀 속성(tcPr)을 복사한 행 XML을
+    한 번에 만들어 파싱하므로 수천 행도 한 번의 패스로 끝난다.
+    rows: 셀 문자열(또는 str 변환 가능한 값) 시퀀스의 iterable
+    """
+    table = doc.add_table(rows=1, cols=len(header))
+    if style:
+        table.style = style
+
+    hdr_cells = table.rows[0].cells
+    for i, column in enumerate(header):
+        hdr_cells[i].text = str(column)
+        if bold_header:
+            hdr_cells[i].paragraphs[0].runs[0].bold = True
+
+    # 헤더 셀의 너비 등 셀 속성을 데이터 행에 그대로 사용
+    cell_props = []
+    for tc in table.rows[0]._tr.tc_lst:
+        tcPr = tc.tcPr
+        cell_props.append(tcPr.xml.replace(f" {nsdecls('w')}", "") if tcPr is not None else "")
+
+    row_xml = []
+    for row in rows:
+        cells = []
+        for props, value in zip(cell_props, row):
+            cells.append(f'<w:tc>{props}<w:p><w:r><w:t xml:space="preserve">{escape(str(value))}</w:t></w:r></w:p></w:tc>')
+        row_xml.append("<w:tr>" + "".join(cells) + "</w:tr>")
+
+    if row_xml:
+        parsed = parse_xml(f"<w:tbl {nsdecls('w')}>" + "".join(row_xml) + "</w:tbl>")
+        tbl = table._tbl
+        for tr in list(parsed):
+            tbl.append(tr)
+    return table
@@ -0,0 +1,310 @@
+"""XGBoost + LSTM 예측 블렌딩 (백테스트 예측으로 가중치 학습, 서빙 시 벡터 연산으로 적용)
+
+가중치는 모델별 0 이상, 합 1 (실측 전기요금에 대한 제곱오차 최소) 이며 단위를 고를 수 있다.
+    - global: 전체 구간 가중치 1개
+    - hour: 시간(0~23)별 가중치
+    - worktype: 작업유형별 가중치
+그룹 구간이 min_rows 보다 적으면 전체 가중치를 쓴다.
+적용할 때 어떤 모델 예측이 NaN 이거나 없으면 그 모델 가중치를 0 으로 두고 나머지를 다시 합 1 로 맞춘다
+(예: 시퀀스 이력이 모자란 앞부분 LSTM 예측은 XGBoost 로 채움). 모든 모델이 없을 때만 NaN.
+
+fit 은 폴드 하나씩 빼고 나머지 폴드로 학습한 교차 검증 MAE 를 단위별로 비교한 뒤,
+고른 단위(기본: 교차 검증 MAE 가 가장 낮은 단위)로 전체 폴드에 다시 맞춰 models/ensemble_weights.json 에 저장한다.
+백테스트 예측은 폴드마다 다시 학습한 out-of-sample 예측(utills.backtest actual/forecast 모드)이어야 한다.
+insample 모드(저장된 모델이 이미 학습한 구간) 예측은 학습 데이터를 외운 모델 쪽으로 가중치가 쏠리므로 쓰지 않는다.
+
+사용 예:
+    python -m utills.backtest --by month --mode actual --out ./reports/backtest
+    python -m utills.ensemble --backtest ./reports/backtest
+    python -m utills.ensemble --backtest ./reports/backtest --level hour --min-rows 200
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utills.data import WORKTYPES
+from utills.features import WORKTYPE_CODES
+from utills.model import COST_MODELS
+from utills.train import MODELS_DIR, PREDICTION_FILES
+
+ENSEMBLE_WEIGHTS_PATH = "./models/ensemble_weights.json"
+BLEND_LEVELS = ["global", "hour", "worktype"]
+# 그룹별 가중치를 따로 맞추는 최소 구간 수
+DEFAULT_MIN_ROWS = 96
+# 가중치 파일이 없을 때: 기존 대시보드처럼 LSTM 을 쓰고 없는 구간만 XGBoost
+DEFAULT_WEIGHTS = {"lstm": 1.0, "xgboost": 0.0}
+
+ACTUAL_COLUMN = "실측 전기요금(원)"
+CODE_WORKTYPES = {code: worktype for worktype, code in WORKTYPE_CODES.items()}
+
+
+# ========== 1. 가중치 학습 ==========
+def simplex_weights(P, y):
+    """예측 행렬 (n, 모델 수), 실측 (n,) -> 0 이상 합 1 인 제곱오차 최소 가중치
+
+    합 1 제약 최소제곱을 풀고 음수 가중치가 있으면 가장 작은 모델을 빼고 다시 푼다.
+    """
+    n_models = P.shape[1]
+    active = list(range(n_models))
+    # 요금 단위(수천 원)의 제곱합은 합 1 제약과 크기 차이가 커서 평균 실측값과 구간 수로 나눠 풂
+    scale = max(float(np.abs(y).mean()), 1e-12)
+    P, y = P / scale, y / scale
+    while True:
+        A = P[:, active]
+        k = len(active)
+        # KKT: [2A'A/n 1; 1' 0] [w; λ] = [2A'y/n; 1]
+        system = np.zeros((k + 1, k + 1))
+        system[:k, :k] = 2 * A.T @ A / len(y)
+        system[:k, k] = system[k, :k] = 1
+        rhs = np.append(2 * A.T @ y / len(y), 1.0)
+        solution = np.linalg.lstsq(system, rhs, rcond=None)[0][:k]
+        if k == 1 or solution.min() >= 0:
+            weights = np.zeros(n_models)
+            weights[active] = solution
+            return weights
+        active.pop(int(np.argmin(solution)))
+
+
+def group_keys(level, hours, worktypes):
+    """가중치 단위별 그룹 키 (문자열, JSON 키와 같은 형식)"""
+    if level == "global":
+        return np.full(len(hours), "전체", dtype=object)
+    if level == "hour":
+        return np.asarray(hours).astype(int).astype(str).astype(object)
+    if level == "worktype":
+        return np.asarray(worktypes, dtype=object)
+    raise ValueError(f"알 수 없는 가중치 단위: {level} (가능: {', '.join(BLEND_LEVELS)})")
+
+
+def frame_groups(frame):
+    """백테스트/예측 표 -> (시간, 작업유형) 배열"""
+    return frame["측정일시"].dt.hour.to_numpy(), frame["작업유형"].to_numpy()
+
+
+def fit_blend(predictions, models, level="global", min_rows=DEFAULT_MIN_ROWS):
+    """백테스트 예측 표(측정일시, 작업유형, 실측 전기요금, 모델별 예측) -> Blender
+
+    모든 모델 예측과 실측이 있는 구간만 학습에 쓴다.
+    """
+    P = predictions[models].to_numpy(dtype=float)
+    y = predictions[ACTUAL_COLUMN].to_numpy(dtype=float)
+    usable = np.isfinite(P).all(axis=1) & np.isfinite(y)
+    if not usable.any():
+        raise ValueError("모든 모델 예측과 실측이 있는 구간이 없습니다")
+    P, y = P[usable], y[usable]
+    hours, worktypes = frame_groups(predictions.loc[usable])
+
+    overall = dict(zip(models, simplex_weights(P, y).tolist()))
+    groups = {}
+    if level != "global":
+        keys = group_keys(level, hours, worktypes)
+        for key in pd.unique(keys):
+            mask = keys == key
+            if mask.sum() >= min_rows:
+                groups[key] = dict(zip(models, simplex_weights(P[mask], y[mask]).tolist()))
+    return Blender(models, level, overall, groups)
+
+
+# ========== 2. 적용 ==========
+class Blender:
+    """학습된 블렌딩 가중치 (전체 + 그룹별), blend 는 행 단위 벡터 연산"""
+
+    def __init__(self, models, level="global", overall=None, groups=None, info=None):
+        self.models = list(models)
+        self.level = level
+        self.overall = overall or {name: 1 / len(self.models) for name in self.models}
+        self.groups = groups or {}
+        self.info = info or {}
+
+    @classmethod
+    def default(cls, models=None):
+        models = list(models or COST_MODELS)
+        return cls(models, "global", {name: DEFAULT_WEIGHTS.get(name, 0.0) for name in models})
+
+    @classmethod
+    def load(cls, path=ENSEMBLE_WEIGHTS_PATH):
+        """가중치 파일이 없으면 기본 가중치 (LSTM, 없으면 XGBoost)"""
+        if not os.path.exists(path):
+            return cls.default()
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        return cls(saved["models"], saved["level"], saved["global"], saved["groups"], saved.get("info"))
+
+    def save(self, path=ENSEMBLE_WEIGHTS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"models": self.models, "level": self.level, "global": self.overall, "groups": self.groups,
+                       "info": self.info}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def weight_matrix(self, hours, worktypes):
+        """행별 모델 가중치 (n, 모델 수) (그룹 가중치가 없으면 전체 가중치)"""
+        overall = np.array([self.overall[name] for name in self.models])
+        if not self.groups:
+            return np.broadcast_to(overall, (len(hours), len(self.models)))
+        table = pd.DataFrame.from_dict(self.groups, orient="index")[self.models]
+        keys = group_keys(self.level, hours, worktypes)
+        weights = np.array(table.reindex(keys), dtype=float)
+        missing = np.isnan(weights).any(axis=1)
+        weights[missing] = overall
+        return weights
+
+    def blend(self, P, hours, worktypes):
+        """모델별 예측 (n, 모델 수) -> 블렌딩 예측 (n,) (NaN 예측 모델은 빼고 나머지 가중치를 다시 합 1 로)"""
+        P = np.asarray(P, dtype=float)
+        available = np.isfinite(P)
+        weights = np.where(available, self.weight_matrix(hours, worktypes), 0.0)
+        total = weights.sum(axis=1)
+        # 남은 모델 가중치가 모두 0 이면 남은 모델 평균
+        fallback = total <= 0
+        weights[fallback] = available[fallback]
+        total[fallback] = available[fallback].sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, (np.where(available, P, 0.0) * weights).sum(axis=1) / total, np.nan)
+
+    def blend_frame(self, frame):
+        """표(측정일시, 작업유형, 모델별 예측 열) -> 블렌딩 예측 (없는 모델 열은 NaN 으로 취급)"""
+        P = np.column_stack([frame[name].to_numpy(dtype=float) if name in frame else np.full(len(frame), np.nan)
+                             for name in self.models])
+        return self.blend(P, *frame_groups(frame))
+
+
+class EnsembleCostModel:
+    """요금 예측 모델 여러 개를 묶어 블렌딩 예측 (요금 모델과 같은 predict 인터페이스)"""
+
+    name = "ensemble"
+
+    def __init__(self, models, blender=None):
+        self.models = models
+        self.blender = blender or Blender.load()
+        self.context = max(model.context for model in models.values())
+        self.input_window = max(model.input_window for model in models.values())
+
+    @property
+    def version(self):
+        return "+".join(f"{name}:{model.version}" for name, model in self.models.items())
+
+    def predict(self, features, rows=None):
+        rows = np.arange(len(features)) if rows is None else np.asarray(rows)
+        P = np.column_stack([self.models[name].predict(features, rows) if name in self.models
+                             else np.full(len(rows), np.nan) for name in self.blender.models])
+        hours = features["hour"].to_numpy()[rows]
+        worktypes = features["작업유형_encoded"].map(CODE_WORKTYPES).to_numpy()[rows]
+        return self.blender.blend(P, hours, worktypes)
+
+
+def load_blended_targets(models_dir=MODELS_DIR, weights_path=ENSEMBLE_WEIGHTS_PATH):
+    """대시보드용 예측 파일(xgb_target.csv, lstm_target.csv)을 블렌딩 -> (id, target, 측정일시) 표
+
+    final_lstm_target.csv 와 같은 열 구성. 예측 파일이 없는 모델은 빠진 것으로 보고 나머지로 채운다.
+    """
+    blender = Blender.load(weights_path)
+    frame = None
+    for name in blender.models:
+        files = PREDICTION_FILES[name]
+        feature_path = os.path.join(models_dir, files["features"])
+        if not os.path.exists(feature_path):
+            continue
+        table = pd.read_csv(feature_path, usecols=["id", "측정일시", "작업유형_encoded", "target"],
+                            parse_dates=["측정일시"]).rename(columns={"target": name})
+        if frame is None:
+            frame = table
+        else:
+            frame = frame.merge(table[["id", name]], on="id", how="outer")
+    if frame is None:
+        raise FileNotFoundError(f"{models_dir} 에 예측 파일이 없습니다")
+    frame = frame.sort_values("측정일시", kind="stable").reset_index(drop=True)
+    frame["작업유형"] = frame["작업유형_encoded"].map(CODE_WORKTYPES)
+    frame["target"] = blender.blend_frame(frame)
+    return frame[["id", "target", "측정일시"]]
+
+
+# ========== 3. 교차 검증 ==========
+def load_backtest(folder):
+    """백테스트 출력 폴더 -> (예측 표, manifest). out-of-sample(폴드별 재학습) 예측이 아니면 ValueError"""
+    manifest_path = os.path.join(folder, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    # in_sample 기록이 없는 예전 백테스트는 저장된 모델로 평가한 것
+    if manifest.get("in_sample", True):
+        raise ValueError(f"{folder}: in-sample 백테스트 예측으로는 가중치를 학습할 수 없습니다 "
+                         "(python -m utills.backtest --mode actual 또는 forecast 로 다시 실행)")
+    predictions = pd.read_csv(os.path.join(folder, "predictions.csv"), parse_dates=["측정일시"])
+    return predictions, manifest
+
+
+def cross_validate(predictions, models, levels=BLEND_LEVELS, min_rows=DEFAULT_MIN_ROWS):
+    """폴드 하나씩 빼고 학습 -> 뺀 폴드 예측 MAE 표 (단일 모델, 단순 평균 포함)"""
+    actual = predictions[ACTUAL_COLUMN].to_numpy(dtype=float)
+    candidates = {name: predictions[name].to_numpy(dtype=float) for name in models}
+    candidates["평균"] = Blender(models).blend_frame(predictions)
+    for level in levels:
+        blended = np.full(len(predictions), np.nan)
+        for fold in predictions["폴드"].unique():
+            held = (predictions["폴드"] == fold).to_numpy()
+            blender = fit_blend(predictions.loc[~held], models, level, min_rows)
+            blended[held] = blender.blend_frame(predictions.loc[held])
+        candidates[level] = blended
+    rows = []
+    for name, predicted in candidates.items():
+        error = np.abs(predicted - actual)
+        rows.append({"방식": name, "MAE": np.nanmean(error), "RMSE": np.sqrt(np.nanmean(error ** 2)),
+                     "예측 없는 구간": int(np.isnan(predicted).sum())})
+    return pd.DataFrame(rows)
+
+
+# ========== 4. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="XGBoost + LSTM 블렌딩 가중치 학습")
+    parser.add_argument("--backtest", default="./reports/backtest", help="utills.backtest 출력 폴더 (predictions.csv)")
+    parser.add_argument("--models", nargs="+", choices=list(COST_MODELS), default=list(COST_MODELS),
+                        help="블렌딩할 모델")
+    parser.add_argument("--level", choices=BLEND_LEVELS, help="가중치 단위 (기본: 교차 검증 MAE 최소)")
+    parser.add_argument("--min-rows", type=int, default=DEFAULT_MIN_ROWS, help="그룹별 가중치 최소 구간 수")
+    parser.add_argument("--out", default=ENSEMBLE_WEIGHTS_PATH, help="가중치 JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        predictions, backtest = load_backtest(args.backtest)
+    except ValueError as error:
+        parser.error(str(error))
+    missing = [name for name in args.models if name not in predictions]
+    if missing:
+        hint = " (LSTM 폴드별 재학습에는 requirements-train.txt 의 TensorFlow 필요)" if "lstm" in missing else ""
+        parser.error(f"백테스트 예측에 없는 모델: {', '.join(missing)}{hint}")
+
+    scores = cross_validate(predictions, args.models, min_rows=args.min_rows)
+    print(scores.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+    level_scores = scores[scores["방식"].isin(BLEND_LEVELS)].set_index("방식")["MAE"]
+    level = args.level or level_scores.idxmin()
+
+    blender = fit_blend(predictions, args.models, level, args.min_rows)
+    blender.info = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "backtest": args.backtest,
+        "backtest_mode": backtest.get("mode"),
+        "rows": len(predictions),
+        "min_rows": args.min_rows,
+        "cv_mae": {row["방식"]: round(float(row["MAE"]), 4) for _, row in scores.iterrows()},
+    }
+    blender.save(args.out)
+
+    print(f"전체 가중치: " + ", ".join(f"{name} {weight:.3f}" for name, weight in blender.overall.items()))
+    order = [str(hour) for hour in range(24)] if level == "hour" else WORKTYPES
+    for key in order:
+        if key in blender.groups:
+            print(f"  {key:>12}: " + ", ".join(f"{name} {w:.3f}" for name, w in blender.groups[key].items()))
+    print(f"완료: 단위 {level} (교차 검증 MAE {level_scores[level]:,.2f}) -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
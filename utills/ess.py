@@ -0,0 +1,241 @@
+"""ESS(배터리) 충방전 시뮬레이션 및 용량/전략 일괄 비교
+
+사용 예:
+    python -m utills.ess --capacity 250 500 1000 2000 --power 100 250 500 --strategy tou peak_shaving hybrid
+    python -m utills.ess --capacity 500 --power 250 --strategy peak_shaving --threshold-ratio 0.7 0.8 0.9
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, WORKTYPES, load_train_data, data_version
+from utills.demand import INTERVALS_PER_HOUR, ratchet_demand
+from utills.tariff import TARIFF_PLANS, DEFAULT_PLAN, load_arrays, monthly_statistics, bill_components
+
+# 충방전 전략
+#   tou          : 경부하 충전, 최대부하 방전 (시간대별 단가 차익)
+#   peak_shaving : 경부하 충전, 수요전력이 목표치를 넘는 만큼만 방전
+#   hybrid       : 최대부하 방전 + 그 외 시간 목표치 초과분 방전
+ESS_STRATEGIES = ["tou", "peak_shaving", "hybrid"]
+
+LIGHT_LOAD = WORKTYPES.index("Light_Load")
+MAXIMUM_LOAD = WORKTYPES.index("Maximum_Load")
+
+DEFAULT_EFFICIENCY = 0.9     # 왕복 효율
+DEFAULT_SOC_RANGE = (0.1, 0.9)
+
+# 한 번에 시뮬레이션할 최대 설정 수 (순 부하 배열: 설정 x 구간 x 8바이트)
+MAX_CHUNK_SIZE = 256
+
+
+# ========== 1. 설정 목록 ==========
+def config_grid(capacities, powers, strategies=("tou",), threshold_ratios=(0.9,), peak_kw=None,
+                efficiency=DEFAULT_EFFICIENCY, soc_range=DEFAULT_SOC_RANGE):
+    """용량(kWh) x 출력(kW) x 전략 x 목표 수요 비율 조합 -> 설정 표
+
+    threshold_ratios 는 과거 최대수요전력(peak_kw) 대비 방전 목표치 비율 (tou 전략은 사용하지 않음).
+    """
+    rows = []
+    for capacity, power, strategy in itertools.product(capacities, powers, strategies):
+        if strategy not in ESS_STRATEGIES:
+            raise ValueError(f"알 수 없는 전략: {strategy} (가능: {ESS_STRATEGIES})")
+        for ratio in ([None] if strategy == "tou" else threshold_ratios):
+            rows.append({
+                "capacity_kwh": float(capacity),
+                "power_kw": float(power),
+                "strategy": strategy,
+                "threshold_kw": np.nan if ratio is None or peak_kw is None else float(peak_kw) * ratio,
+                "efficiency": efficiency,
+                "soc_min": soc_range[0],
+                "soc_max": soc_range[1],
+            })
+    return pd.DataFrame(rows)
+
+
+# ========== 2. 충방전 시뮬레이션 ==========
+def simulate_dispatch(kwh, load_idx, configs):
+    """모든 설정을 한꺼번에 구간 순서대로 시뮬레이션 (상태는 설정 축 벡터)
+
+    kwh, load_idx: 구간별 전력량/작업유형 인덱스 (시간순)
+    반환: 순 부하 kWh (설정 x 구간), 설정별 방전량 합계
+    """
+    n_configs, n_steps = len(configs), len(kwh)
+    capacity = configs["capacity_kwh"].to_numpy(dtype=float)
+    step_energy = configs["power_kw"].to_numpy(dtype=float) / INTERVALS_PER_HOUR
+    leg_eff = np.sqrt(configs["efficiency"].to_numpy(dtype=float))
+    soc_min = capacity * configs["soc_min"].to_numpy(dtype=float)
+    soc_max = capacity * configs["soc_max"].to_numpy(dtype=float)
+    strategy = configs["strategy"].map(ESS_STRATEGIES.index).to_numpy()
+    # 목표치 없는 설정은 무한대 (peak 방전 없음, 충전 제한 없음)
+    threshold = configs["threshold_kw"].fillna(np.inf).to_numpy(dtype=float) / INTERVALS_PER_HOUR
+
+    shave = strategy != ESS_STRATEGIES.index("tou")
+    tou_discharge = strategy != ESS_STRATEGIES.index("peak_shaving")
+
+    soc = soc_min.copy()
+    net = np.empty((n_configs, n_steps))
+    discharged_total = np.zeros(n_configs)
+    charge = np.empty(n_configs)
+    discharge = np.empty(n_configs)
+    want = np.empty(n_configs)
+
+    for t in range(n_steps):
+        load = kwh[t]
+        load_class = load_idx[t]
+        if load_class == LIGHT_LOAD:
+            # 충전: 출력, 남은 용량, (peak 전략은) 목표치 이내
+            np.subtract(soc_max, soc, out=charge)
+            np.divide(charge, leg_eff, out=charge)
+            np.minimum(charge, step_energy, out=charge)
+            np.minimum(charge, np.maximum(threshold - load, 0.0), out=charge)
+            np.maximum(charge, 0.0, out=charge)
+            soc += charge * leg_eff
+            net[:, t] = load + charge
+            continue
+
+        # 방전 희망량: 최대부하(tou/hybrid)는 부하 전체, 목표치 초과분(peak/hybrid)
+        np.subtract(load, threshold, out=want)
+        np.maximum(want, 0.0, out=want)
+        want *= shave
+        if load_class == MAXIMUM_LOAD:
+            np.maximum(want, tou_discharge * load, out=want)
+        np.subtract(soc, soc_min, out=discharge)
+        discharge *= leg_eff
+        np.minimum(discharge, step_energy, out=discharge)
+        np.minimum(discharge, want, out=discharge)
+        np.maximum(discharge, 0.0, out=discharge)
+        soc -= discharge / leg_eff
+        discharged_total += discharge
+        net[:, t] = load - discharge
+
+    return net, discharged_total
+
+
+# ========== 3. 요금 평가 ==========
+def batched_statistics(base_stats, arrays, net):
+    """설정별 순 부하로 월별 요금 통계 재계산 (역률 등 부하와 무관한 값은 그대로)"""
+    n_months = len(base_stats["months"])
+    n_loads = len(WORKTYPES)
+    group = arrays["month_idx"] * n_loads + arrays["load_idx"]
+
+    # 그룹 순으로 한 번 정렬해 두고 reduceat 으로 설정 축 전체를 한 번에 합산
+    order = np.argsort(group, kind="stable")
+    sorted_group = group[order]
+    starts = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+    sums = np.add.reduceat(net[:, order], starts, axis=1)
+    kwh_by_load = np.zeros((len(net), n_months * n_loads))
+    kwh_by_load[:, sorted_group[starts]] = sums
+
+    month_starts = np.flatnonzero(np.r_[True, arrays["month_idx"][1:] != arrays["month_idx"][:-1]])
+    peak_kw = np.maximum.reduceat(net, month_starts, axis=1) * INTERVALS_PER_HOUR
+
+    stats = dict(base_stats)
+    stats["kwh_by_load"] = kwh_by_load.reshape(len(net), n_months, n_loads)
+    stats["peak_kw"] = peak_kw
+    stats["ratchet_kw"] = np.array([ratchet_demand(row, base_stats["months"]) for row in peak_kw])
+    return stats
+
+
+def evaluate_chunk(arrays, base_stats, tariff, configs):
+    """설정 묶음 1개 시뮬레이션 + 월별 청구금액"""
+    net, discharged = simulate_dispatch(arrays["kwh"], arrays["load_idx"], configs)
+    stats = batched_statistics(base_stats, arrays, net)
+    components = bill_components(stats, tariff)
+    return components["total"], stats["peak_kw"].max(axis=1), discharged
+
+
+def evaluate_configs(df, configs, tariff=None, workers=1, chunk_size=None):
+    """전체 이력에 대해 설정별 연간 요금/절감액 계산
+
+    반환: (설정별 요약 표, 설정별 월 절감액 표)
+    """
+    tariff = tariff or TARIFF_PLANS[DEFAULT_PLAN]
+    df = df.sort_values("측정일시")
+    arrays = load_arrays(df)
+    base_stats = monthly_statistics(arrays)
+    baseline = bill_components(base_stats, tariff)["total"]
+
+    configs = configs.reset_index(drop=True)
+    # 구간 루프 횟수가 비용을 좌우하므로 워커마다 한 묶음씩 되도록 나눔
+    chunk_size = chunk_size or min(MAX_CHUNK_SIZE, -(-len(configs) // max(workers, 1)))
+    chunks = [configs.iloc[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(evaluate_chunk, itertools.repeat(arrays), itertools.repeat(base_stats),
+                                      itertools.repeat(tariff), chunks))
+    else:
+        parts = [evaluate_chunk(arrays, base_stats, tariff, chunk) for chunk in chunks]
+
+    monthly_total = np.concatenate([p[0] for p in parts])
+    peak_kw = np.concatenate([p[1] for p in parts])
+    discharged = np.concatenate([p[2] for p in parts])
+
+    monthly_savings = baseline - monthly_total
+    summary = configs.copy()
+    summary["기존 청구금액(원)"] = baseline.sum()
+    summary["ESS 적용 청구금액(원)"] = monthly_total.sum(axis=1)
+    summary["연간 절감액(원)"] = monthly_savings.sum(axis=1) * 12 / len(base_stats["months"])
+    summary["최대수요전력(kW)"] = peak_kw
+    summary["방전량(kWh)"] = discharged
+    usable = configs["capacity_kwh"] * (configs["soc_max"] - configs["soc_min"])
+    summary["등가 사이클"] = discharged / usable.to_numpy()
+    summary = summary.sort_values("연간 절감액(원)", ascending=False)
+
+    months = base_stats["months"].astype(str)
+    breakdown = pd.DataFrame(monthly_savings, columns=months, index=configs.index).loc[summary.index]
+    return summary, breakdown
+
+
+# ========== 4. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ESS 용량/전략별 절감액 비교")
+    parser.add_argument("--data", default=TRAIN_PATH, help="15분 데이터 CSV")
+    parser.add_argument("--capacity", type=float, nargs="+", required=True, help="배터리 용량 후보 (kWh)")
+    parser.add_argument("--power", type=float, nargs="+", required=True, help="PCS 출력 후보 (kW)")
+    parser.add_argument("--strategy", nargs="+", choices=ESS_STRATEGIES, default=ESS_STRATEGIES, help="충방전 전략")
+    parser.add_argument("--threshold-ratio", type=float, nargs="+", default=[0.9],
+                        help="과거 최대수요 대비 방전 목표치 비율 (peak_shaving/hybrid)")
+    parser.add_argument("--efficiency", type=float, default=DEFAULT_EFFICIENCY, help="왕복 효율")
+    parser.add_argument("--plan", choices=list(TARIFF_PLANS), default=DEFAULT_PLAN, help="요금제")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 프로세스 수")
+    parser.add_argument("--chunk-size", type=int, default=None, help="한 번에 계산할 설정 수 (기본: 워커 수로 균등 분할)")
+    parser.add_argument("--out", default="./reports/ess", help="출력 폴더")
+    args = parser.parse_args(argv)
+
+    df = load_train_data(args.data)
+    peak_kw = df["전력사용량(kWh)"].max() * INTERVALS_PER_HOUR
+    configs = config_grid(args.capacity, args.power, args.strategy, args.threshold_ratio, peak_kw=peak_kw,
+                          efficiency=args.efficiency)
+    print(f"ESS 설정 {len(configs)}개 시뮬레이션 시작 (워커 {args.workers}개)")
+
+    started = time.perf_counter()
+    summary, breakdown = evaluate_configs(df, configs, TARIFF_PLANS[args.plan], workers=args.workers,
+                                          chunk_size=args.chunk_size)
+    seconds = time.perf_counter() - started
+
+    os.makedirs(args.out, exist_ok=True)
+    summary.to_csv(os.path.join(args.out, "summary.csv"), index_label="설정", encoding="utf-8-sig")
+    breakdown.to_csv(os.path.join(args.out, "monthly_savings.csv"), index_label="설정", encoding="utf-8-sig")
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "data": args.data,
+            "data_version": data_version(args.data),
+            "plan": args.plan,
+            "configs": len(configs),
+            "seconds": round(seconds, 3),
+        }, f, ensure_ascii=False, indent=2)
+
+    print(summary.head(10).to_string())
+    print(f"완료: {seconds:.2f}초 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
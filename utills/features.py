@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# ========== 공통 상수 ==========
+MEASUREMENT_COLUMNS = ["전력사용량(kWh)", "지상무효전력량(kVarh)", "진상무효전력량(kVarh)", "탄소배출량(tCO2)"]
+TARGET_COLUMN = "전기요금(원)"
+
+# 모델 입력 특성 (xgboost.pkl / lstm.h5 학습 시 순서 그대로)
+FEATURE_COLUMNS = MEASUREMENT_COLUMNS + [
+    "year", "month", "day", "hour", "minute", "dayofweek", "is_weekend",
+    "hour_sin", "hour_cos", "month_sin", "month_cos", "dow_sin", "dow_cos",
+    "작업유형_encoded", "진상역률_이진", "지상역률_이진",
+    "total_power", "active_power_ratio", "power_efficiency",
+    "전력사용량_lag_2", "전력사용량_lag_3", "전력사용량_lag_6",
+    "전력사용량_log", "power_interaction", "hour_month",
+]
+
+# 작업유형 인코딩 (LabelEncoder 알파벳 순)
+WORKTYPE_CODES = {"Light_Load": 0, "Maximum_Load": 1, "Medium_Load": 2}
+
+# 역률 이진 특성 기준 (%): 지상은 역률 하한, 진상은 진상 무효전력이 없는 구간
+LAG_PF_THRESHOLD = 60.0
+LEAD_PF_THRESHOLD = 100.0
+
+KWH_LAGS = (2, 3, 6)
+
+# 모델 입력 특성 자료형 (xgboost 도 내부에서 float32 로 비교하므로 예측 결과는 같고 메모리/대역폭은 절반)
+FEATURE_DTYPE = np.float32
+
+
+def power_factor(kwh, kvarh):
+    """유효/무효 전력량 -> 역률(%) (둘 다 0이면 100)"""
+    kwh = np.asarray(kwh, dtype=float)
+    apparent = np.hypot(kwh, np.asarray(kvarh, dtype=float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(apparent > 0, 100 * kwh / apparent, 100.0)
+
+
+def build_features(df):
+    """15분 데이터(측정일시, 측정값 4종, 작업유형[, 역률]) -> 모델 입력 특성 표
+
+    행 순서는 입력 그대로 두고, kWh 시차 특성은 입력 순서 기준으로 계산한다(앞부분은 0).
+    역률 열이 없으면 무효전력량으로 계산한다(예측된 측정값으로 특성을 만들 때).
+    파생 특성은 float64 로 계산한 뒤 FEATURE_DTYPE(float32) 로 바꿔 돌려준다.
+    """
+    timestamps = pd.to_datetime(df["측정일시"])
+    kwh = df["전력사용량(kWh)"].to_numpy(dtype=float)
+    lag_kvarh = df["지상무효전력량(kVarh)"].to_numpy(dtype=float)
+    lead_kvarh = df["진상무효전력량(kVarh)"].to_numpy(dtype=float)
+    co2 = df["탄소배출량(tCO2)"].to_numpy(dtype=float)
+    lag_pf = df["지상역률(%)"].to_numpy(dtype=float) if "지상역률(%)" in df else power_factor(kwh, lag_kvarh)
+    lead_pf = df["진상역률(%)"].to_numpy(dtype=float) if "진상역률(%)" in df else power_factor(kwh, lead_kvarh)
+
+    hour = timestamps.dt.hour.to_numpy()
+    month = timestamps.dt.month.to_numpy()
+    dow = timestamps.dt.dayofweek.to_numpy()
+    total = kwh + lag_kvarh + lead_kvarh
+
+    features = pd.DataFrame(index=df.index)
+    for column, values in zip(MEASUREMENT_COLUMNS, (kwh, lag_kvarh, lead_kvarh, co2)):
+        features[column] = values
+    features["year"] = timestamps.dt.year.to_numpy()
+    features["month"] = month
+    features["day"] = timestamps.dt.day.to_numpy()
+    features["hour"] = hour
+    features["minute"] = timestamps.dt.minute.to_numpy()
+    features["dayofweek"] = dow
+    features["is_weekend"] = (dow >= 5).astype(int)
+    features["hour_sin"] = np.sin(2 * np.pi * hour / 24)
+    features["hour_cos"] = np.cos(2 * np.pi * hour / 24)
+    features["month_sin"] = np.sin(2 * np.pi * month / 12)
+    features["month_cos"] = np.cos(2 * np.pi * month / 12)
+    features["dow_sin"] = np.sin(2 * np.pi * dow / 7)
+    features["dow_cos"] = np.cos(2 * np.pi * dow / 7)
+    features["작업유형_encoded"] = df["작업유형"].map(WORKTYPE_CODES).to_numpy()
+    features["진상역률_이진"] = (lead_pf >= LEAD_PF_THRESHOLD).astype(int)
+    features["지상역률_이진"] = (lag_pf >= LAG_PF_THRESHOLD).astype(int)
+    features["total_power"] = total
+    with np.errstate(invalid="ignore", divide="ignore"):
+        features["active_power_ratio"] = np.where(total > 0, kwh / total, 0.0)
+    features["power_efficiency"] = kwh / (co2 + 1e-8)
+    for lag in KWH_LAGS:
+        shifted = np.zeros_like(kwh)
+        shifted[lag:] = kwh[:-lag]
+        features[f"전력사용량_lag_{lag}"] = shifted
+    features["전력사용량_log"] = np.log1p(kwh)
+    features["power_interaction"] = kwh * lag_kvarh
+    features["hour_month"] = hour * month
+    return features[FEATURE_COLUMNS].astype(FEATURE_DTYPE)
+
+
+def feature_matrix(features, rows=None):
+    """특성 표 -> 모델 입력 행렬 (FEATURE_COLUMNS 순서, float32, rows 를 주면 해당 행만)"""
+    matrix = features[FEATURE_COLUMNS].to_numpy(dtype=FEATURE_DTYPE)
+    return matrix if rows is None else matrix[rows]
@@ -0,0 +1,327 @@
+"""여러 계량기 x 여러 기준시각의 다음 N구간(기본 96 = 하루) 전기요금 일괄 예측
+
+1단계: 측정값 4종(kWh, 지상/진상 무효전력량, 탄소배출량)을 XGBoost(hist)로 예측
+    - recursive: 1구간 앞 모델을 N번 반복 (매 단계 전체 배치를 한 번에 예측)
+    - direct: 예측 거리(h)를 특성으로 넣은 모델 하나로 N구간을 한 번에 예측
+2단계: 이력 + 예측 측정값으로 모델 특성을 만들어 요금 모델(xgboost.pkl / lstm.h5)로 전기요금 예측
+
+사용 예:
+    python -m utills.forecast --origins 2024-11-01 2024-11-15 --model xgboost --strategy direct
+    python -m utills.forecast --origins 2024-11-01 --model lstm --strategy recursive --horizon 192
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, load_train_data
+from utills.features import MEASUREMENT_COLUMNS, WORKTYPE_CODES, build_features, power_factor
+from utills.model import COST_MODELS, load_cost_model
+
+# ========== 공통 상수 ==========
+HORIZON = 96                       # 하루 = 15분 x 96
+FORECAST_STRATEGIES = ["recursive", "direct"]
+RECENT_LAGS = (1, 2, 3, 4)         # 기준시각 직전 구간
+SEASONAL_LAGS = (96, 672)          # 전일/전주 같은 시각
+HISTORY_LENGTH = max(SEASONAL_LAGS)
+LEVEL_FLOOR = 1e-6                 # 규모 정규화 하한 (값이 전부 0인 측정값)
+WORKTYPE_PROFILE_DAYS = 28         # 미래 작업유형 추정에 쓰는 최근 이력 (요일 x 시각 최빈값)
+WEEK_SLOTS = 7 * 96
+
+# direct 학습 시 기준시각 간격 (구간 수, 학습 행 = 기준시각 수 x N)
+DEFAULT_ORIGIN_STRIDE = 16
+
+DEFAULT_PARAMS = {
+    "n_estimators": 300,
+    "max_depth": 6,
+    "learning_rate": 0.08,
+    "subsample": 0.9,
+    "colsample_bytree": 0.9,
+    "tree_method": "hist",
+    "n_jobs": -1,
+    "random_state": 42,
+}
+
+CODE_WORKTYPES = {code: name for name, code in WORKTYPE_CODES.items()}
+PF_COLUMNS = {"지상역률(%)": "지상무효전력량(kVarh)", "진상역률(%)": "진상무효전력량(kVarh)"}
+
+
+# ========== 1. 이력 -> 배열 ==========
+def as_histories(data):
+    """DataFrame(계량기 1개) 또는 {계량기: DataFrame} -> {계량기: 시간순 DataFrame}"""
+    if isinstance(data, pd.DataFrame):
+        data = {"meter": data}
+    return {meter: df.sort_values("측정일시").reset_index(drop=True) for meter, df in data.items()}
+
+
+def calendar_matrix(timestamps, worktype_codes):
+    """예측 대상 시각의 달력 특성 (..., 7)"""
+    timestamps = pd.DatetimeIndex(np.ravel(timestamps))
+    hour = timestamps.hour.to_numpy() + timestamps.minute.to_numpy() / 60
+    dow = timestamps.dayofweek.to_numpy()
+    month = timestamps.month.to_numpy()
+    columns = [
+        np.sin(2 * np.pi * hour / 24), np.cos(2 * np.pi * hour / 24),
+        dow, (dow >= 5).astype(float),
+        np.sin(2 * np.pi * month / 12), np.cos(2 * np.pi * month / 12),
+        np.ravel(worktype_codes).astype(float),
+    ]
+    return np.stack(columns, axis=-1).reshape(np.shape(worktype_codes) + (len(columns),))
+
+
+def design_matrix(values, target_pos, origin_pos, calendar, level):
+    """예측 대상(target_pos)별 입력 특성
+
+    values: (B, T, 4) 측정값 버퍼, target_pos/origin_pos: (B, K) 버퍼 위치, calendar: (B, K, 7),
+    level: (B, K, 4) 기준시각 직전 1주 평균 (값을 나눠 계량기 규모와 무관하게 만듦)
+    특성 = [예측 거리, 달력, 대상 시각의 전일/전주 값, 기준시각 직전 1~4구간 값]
+    recursive 는 origin_pos == target_pos (거리 1), direct 는 기준시각 고정.
+    """
+    batch = np.arange(values.shape[0])[:, None]
+    blocks = [(target_pos - origin_pos + 1)[..., None].astype(float), calendar]
+    for lag in SEASONAL_LAGS:
+        blocks.append(values[batch, target_pos - lag] / level)
+    for lag in RECENT_LAGS:
+        blocks.append(values[batch, origin_pos - lag] / level)
+    matrix = np.concatenate(blocks, axis=-1)
+    return matrix.reshape(-1, matrix.shape[-1])
+
+
+def trailing_level(values, positions):
+    """positions 직전 HISTORY_LENGTH 구간의 측정값별 평균 (0 나눗셈 방지용 하한 포함), (B, K, 4)"""
+    cumulative = np.concatenate([np.zeros_like(values[:, :1]), np.cumsum(values, axis=1)], axis=1)
+    batch = np.arange(values.shape[0])[:, None]
+    level = (cumulative[batch, positions] - cumulative[batch, positions - HISTORY_LENGTH]) / HISTORY_LENGTH
+    return np.maximum(level, LEVEL_FLOOR)
+
+
+def future_worktypes(history, timestamps, days=WORKTYPE_PROFILE_DAYS):
+    """최근 이력의 (요일, 시각)별 최빈 작업유형으로 미래 작업유형 코드 추정"""
+    recent = history[history["측정일시"] > history["측정일시"].iloc[-1] - pd.Timedelta(days=days)]
+    codes = recent["작업유형"].map(WORKTYPE_CODES).to_numpy(dtype=int)
+    n_codes = len(WORKTYPE_CODES)
+    # (요일 x 시각 슬롯, 작업유형) 빈도표 -> 슬롯별 최빈값, 이력이 없는 슬롯은 전체 최빈값
+    counts = np.bincount(_week_slot(recent["측정일시"]) * n_codes + codes,
+                         minlength=WEEK_SLOTS * n_codes).reshape(WEEK_SLOTS, n_codes)
+    fallback = np.bincount(codes, minlength=n_codes).argmax()
+    profile = np.where(counts.any(axis=1), counts.argmax(axis=1), fallback)
+    return profile[_week_slot(pd.Series(pd.DatetimeIndex(timestamps)))]
+
+
+def _week_slot(timestamps):
+    """측정일시 -> 한 주 안의 15분 슬롯 번호 (0 ~ 671)"""
+    return (timestamps.dt.dayofweek * 96 + timestamps.dt.hour * 4 + timestamps.dt.minute // 15).to_numpy()
+
+
+# ========== 2. 측정값 예측 모델 ==========
+class MeasurementForecaster:
+    """측정값 4종 다구간 예측 (strategy: recursive / direct)"""
+
+    def __init__(self, strategy="direct", horizon=HORIZON, params=None, origin_stride=DEFAULT_ORIGIN_STRIDE):
+        if strategy not in FORECAST_STRATEGIES:
+            raise ValueError(f"알 수 없는 예측 방식: {strategy} (가능: {', '.join(FORECAST_STRATEGIES)})")
+        if strategy == "direct" and horizon > min(SEASONAL_LAGS):
+            raise ValueError(f"direct 방식은 최대 {min(SEASONAL_LAGS)}구간까지 예측할 수 있습니다")
+        self.strategy = strategy
+        self.horizon = horizon
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.origin_stride = origin_stride
+        self.model = None
+
+    def training_rows(self, history):
+        """이력 1개 -> (입력 특성, 목표값) 학습 행"""
+        values = history[MEASUREMENT_COLUMNS].to_numpy(dtype=float)[None]
+        codes = history["작업유형"].map(WORKTYPE_CODES).to_numpy()
+        timestamps = history["측정일시"].to_numpy()
+        n = values.shape[1]
+        if self.strategy == "recursive":
+            target_pos = np.arange(HISTORY_LENGTH, n)[None]
+            origin_pos = target_pos
+        else:
+            origins = np.arange(HISTORY_LENGTH, n - self.horizon + 1, self.origin_stride)
+            origin_pos = np.repeat(origins[:, None], self.horizon, axis=1)
+            target_pos = origin_pos + np.arange(self.horizon)
+            origin_pos, target_pos = origin_pos.reshape(1, -1), target_pos.reshape(1, -1)
+        calendar = calendar_matrix(timestamps[target_pos], codes[target_pos])
+        level = trailing_level(values, origin_pos)
+        X = design_matrix(values, target_pos, origin_pos, calendar, level)
+        return X, (values[0, target_pos[0]] / level[0])
+
+    def fit(self, histories):
+        """이력(들)로 학습 (계량기 여러 개면 학습 행을 합쳐 한 모델로 학습)"""
+        from xgboost import XGBRegressor
+
+        rows = [self.training_rows(history) for history in as_histories(histories).values()
+                if len(history) > HISTORY_LENGTH + self.horizon]
+        if not rows:
+            raise ValueError(f"학습에 필요한 이력이 부족합니다 (최소 {HISTORY_LENGTH + self.horizon + 1}구간)")
+        X = np.concatenate([r[0] for r in rows])
+        y = np.concatenate([r[1] for r in rows])
+        self.model = XGBRegressor(**self.params)
+        self.model.fit(X, y)
+        return self
+
+    def predict(self, values, future_calendar):
+        """values: (B, 672, 4) 기준시각 직전 이력, future_calendar: (B, N, 7) -> (B, N, 4)"""
+        if self.model is None:
+            raise RuntimeError("fit() 으로 먼저 학습해야 합니다")
+        n_batch, n_history = values.shape[:2]
+        horizon = future_calendar.shape[1]
+        buffer = np.concatenate([values, np.zeros((n_batch, horizon, values.shape[2]))], axis=1)
+        steps = n_history + np.arange(horizon)
+
+        if self.strategy == "direct":
+            target_pos = np.broadcast_to(steps, (n_batch, horizon))
+            origin_pos = np.full((n_batch, horizon), n_history)
+            level = trailing_level(buffer, origin_pos)
+            predicted = self.model.predict(design_matrix(buffer, target_pos, origin_pos, future_calendar, level))
+            buffer[:, n_history:] = np.maximum(predicted.reshape(level.shape) * level, 0)
+        else:
+            # 한 단계씩 배치 전체를 예측하고 결과를 다음 단계 입력으로 사용
+            # (규모는 기준시각 값으로 고정해야 예측값이 규모에 되먹임되어 발산하지 않음)
+            level = trailing_level(buffer, np.full((n_batch, 1), n_history))
+            for step, pos in enumerate(steps):
+                target_pos = np.full((n_batch, 1), pos)
+                predicted = self.model.predict(design_matrix(buffer, target_pos, target_pos,
+                                                             future_calendar[:, step:step + 1], level))
+                buffer[:, pos] = np.maximum(predicted.reshape(level[:, 0].shape) * level[:, 0], 0)
+        return buffer[:, n_history:]
+
+
+# ========== 3. 일괄 예측 API ==========
+def forecast_features(histories, origins, forecaster, horizon=HORIZON, context=1, worktypes=None):
+    """1단계(측정값 예측) + 요금 모델 입력 특성
+
+    histories: DataFrame 또는 {계량기: DataFrame} (측정일시, 측정값 4종, 작업유형[, 역률])
+    origins: 첫 예측 시각 목록 (모든 계량기에 적용) 또는 [(계량기, 시각), ...]
+    context: 요금 모델이 첫 예측 구간 앞에 필요로 하는 이력 구간 수
+    worktypes: 미래 작업유형 표(측정일시, 작업유형[, 계량기]), 없으면 최근 이력으로 추정
+    반환: (예측 측정값 표, 특성 표, 특성 표에서 예측 구간 행 위치)
+    """
+    histories = as_histories(histories)
+    pairs = []
+    for item in origins:
+        if isinstance(item, tuple):
+            pairs.append((item[0], pd.Timestamp(item[1])))
+        else:
+            pairs.extend((meter, pd.Timestamp(item)) for meter in histories)
+    if not pairs:
+        raise ValueError("기준시각이 없습니다")
+
+    n_batch = len(pairs)
+    values = np.empty((n_batch, HISTORY_LENGTH, len(MEASUREMENT_COLUMNS)))
+    codes = np.empty((n_batch, horizon), dtype=int)
+    future_times = np.empty((n_batch, horizon), dtype="datetime64[ns]")
+    contexts = []
+    for b, (meter, origin) in enumerate(pairs):
+        history = histories[meter]
+        end = int(history["측정일시"].searchsorted(origin))
+        if end < HISTORY_LENGTH:
+            raise ValueError(f"{meter} {origin}: 기준시각 이전 이력이 {HISTORY_LENGTH}구간 미만입니다")
+        past = history.iloc[:end]
+        values[b] = past[MEASUREMENT_COLUMNS].to_numpy(dtype=float)[-HISTORY_LENGTH:]
+        times = pd.date_range(origin, periods=horizon, freq="15min")
+        future_times[b] = times.to_numpy()
+        codes[b] = _future_codes(past, times, worktypes, meter)
+        contexts.append(past.iloc[-max(context, 1):])
+
+    calendar = calendar_matrix(future_times, codes)
+    predicted = forecaster.predict(values, calendar)
+
+    # 요금 모델 입력: 계량기/기준시각마다 [이력 context 구간 + 예측 N구간] 을 이어 붙여 특성 한 번에 계산
+    frames, rows = [], []
+    offset = 0
+    for b, past_rows in enumerate(contexts):
+        future = pd.DataFrame(predicted[b], columns=MEASUREMENT_COLUMNS)
+        future["측정일시"] = future_times[b]
+        future["작업유형"] = [CODE_WORKTYPES[c] for c in codes[b]]
+        past = past_rows[["측정일시", "작업유형"] + MEASUREMENT_COLUMNS].copy()
+        # 이력은 측정 역률, 예측 구간은 예측 무효전력량으로 계산한 역률
+        for column, kvarh in PF_COLUMNS.items():
+            future[column] = power_factor(future["전력사용량(kWh)"], future[kvarh])
+            past[column] = (past_rows[column].to_numpy() if column in past_rows
+                            else power_factor(past["전력사용량(kWh)"], past[kvarh]))
+        frames.extend([past, future])
+        rows.append(offset + len(past) + np.arange(horizon))
+        offset += len(past) + horizon
+    features = build_features(pd.concat(frames, ignore_index=True))
+
+    result = pd.DataFrame({
+        "계량기": np.repeat([meter for meter, _ in pairs], horizon),
+        "기준시각": np.repeat([origin for _, origin in pairs], horizon),
+        "예측거리": np.tile(np.arange(1, horizon + 1), n_batch),
+        "측정일시": future_times.ravel(),
+        "작업유형": [CODE_WORKTYPES[c] for c in codes.ravel()],
+    })
+    for i, column in enumerate(MEASUREMENT_COLUMNS):
+        result[column] = predicted[..., i].ravel()
+    return result, features, np.concatenate(rows)
+
+
+def forecast_batch(histories, origins, forecaster, cost_model, horizon=HORIZON, worktypes=None):
+    """계량기 x 기준시각 다구간 전기요금 일괄 예측
+
+    반환: 계량기/기준시각/예측거리별 예측 측정값과 예측 전기요금 (long 형식)
+    """
+    result, features, rows = forecast_features(histories, origins, forecaster, horizon=horizon,
+                                               context=cost_model.context, worktypes=worktypes)
+    result["예측 전기요금(원)"] = cost_model.predict(features, rows)
+    return result
+
+
+def _future_codes(past, times, worktypes, meter):
+    if worktypes is not None:
+        known = worktypes if "계량기" not in worktypes else worktypes[worktypes["계량기"] == meter]
+        mapped = known.set_index("측정일시")["작업유형"].reindex(times).map(WORKTYPE_CODES)
+        if mapped.notna().all():
+            return mapped.to_numpy(dtype=int)
+        estimated = future_worktypes(past, times)
+        return np.where(mapped.isna(), estimated, mapped.fillna(0)).astype(int)
+    return future_worktypes(past, times)
+
+
+def forecast(histories, origins, model="xgboost", strategy="direct", horizon=HORIZON, forecaster=None,
+             worktypes=None, **model_kwargs):
+    """측정값 예측 모델 학습(또는 주어진 모델 사용) + 요금 모델 로드 후 일괄 예측"""
+    histories = as_histories(histories)
+    if forecaster is None:
+        forecaster = MeasurementForecaster(strategy, horizon=horizon).fit(histories)
+    cost_model = load_cost_model(model, **model_kwargs)
+    return forecast_batch(histories, origins, forecaster, cost_model, horizon=horizon, worktypes=worktypes)
+
+
+# ========== 4. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="다구간 전기요금 일괄 예측")
+    parser.add_argument("--data", default=TRAIN_PATH, help="15분 데이터 CSV")
+    parser.add_argument("--origins", nargs="+", required=True, help="첫 예측 시각 목록")
+    parser.add_argument("--model", choices=list(COST_MODELS), default="xgboost", help="요금 예측 모델")
+    parser.add_argument("--strategy", choices=FORECAST_STRATEGIES, default="direct", help="다구간 예측 방식")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="예측 구간 수")
+    parser.add_argument("--model-version", help="모델 레지스트리 버전 ('current' 또는 버전 이름, 기본: models/ 파일)")
+    parser.add_argument("--out", default="./reports/forecast.csv", help="출력 CSV")
+    args = parser.parse_args(argv)
+
+    history = load_train_data(args.data)
+    started = time.perf_counter()
+    forecaster = MeasurementForecaster(args.strategy, horizon=args.horizon).fit(history)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = forecast(history, args.origins, model=args.model, horizon=args.horizon, forecaster=forecaster,
+                      version=args.model_version)
+    predict_seconds = time.perf_counter() - started
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    result.to_csv(args.out, index=False, encoding="utf-8-sig")
+    daily = result.groupby("기준시각")["예측 전기요금(원)"].sum()
+    print(daily.to_string())
+    print(f"학습 {fit_seconds:.1f}초, 예측 {predict_seconds:.2f}초 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
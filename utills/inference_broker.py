@@ -0,0 +1,235 @@
+"""asyncio 마이크로 배치 추론 브로커
+
+여러 세션/계량기가 한 구간씩 요청하는 예측을 모아 (최대 max_batch_size 개, 첫 요청 후 최대 max_wait 초)
+요금 모델을 배치 한 번으로 호출하고, 결과를 요청마다 돌려준다. 모델 호출은 스레드 실행기에서 하므로
+배치 하나를 계산하는 동안에도 다음 배치 요청을 계속 받는다.
+    - InferenceBroker: asyncio 코드에서 await broker.predict(window)
+    - ThreadedBroker: 전용 이벤트 루프 스레드를 띄워 동기 코드(Streamlit 세션 등)에서 broker.predict(window)
+요청 1건은 모델 입력 구간(model.input_window 행)의 특성 표이며, 마지막 행의 전기요금을 예측한다.
+
+사용 예 (부하 시험):
+    python -m utills.inference_broker --model xgboost --clients 256 --requests 20
+    python -m utills.inference_broker --model lstm --clients 64 --max-batch 128 --max-wait-ms 10
+    python -m utills.inference_broker --model xgboost --compiled --max-batch 8
+"""
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, load_train_data
+from utills.features import FEATURE_COLUMNS, FEATURE_DTYPE, build_features, feature_matrix
+from utills.model import COST_MODELS, load_cost_model
+
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT = 0.005
+# 지연 시간 분위수 계산에 남기는 최근 요청 수
+LATENCY_WINDOW = 10_000
+
+
+# ========== 1. 브로커 ==========
+class InferenceBroker:
+    """요청을 마이크로 배치로 모아 model.predict 한 번으로 처리 (async with 또는 start()/stop())"""
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.window = model.input_window
+        self._queue = None
+        self._task = None
+        # 모델 호출 전용 스레드 (배치는 한 번에 하나씩 계산)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"requests": 0, "batches": 0, "predict_seconds": 0.0}
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        """남은 요청을 모두 처리한 뒤 종료"""
+        await self._queue.put(None)
+        await self._task
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def predict(self, window):
+        """특성 표(마지막 input_window 행 사용) -> 마지막 행 예측 전기요금 (특성 수가 다르면 ValueError)"""
+        matrix = window_matrix(window, self.window)
+        if matrix is None:
+            return float("nan")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((matrix, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # 이미 쌓인 요청은 기다리지 않고 바로 가져옴
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._safe_process(loop, batch)
+        # 종료 신호 뒤에 들어온 요청도 처리
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                await self._safe_process(loop, [item])
+
+    async def _safe_process(self, loop, batch):
+        # 배치 하나가 실패해도 그 배치 요청에만 오류를 돌려주고 브로커는 계속 돈다
+        try:
+            await self._process(loop, batch)
+        except Exception as error:
+            _fail(batch, error)
+
+    async def _process(self, loop, batch):
+        matrices, futures, submitted = zip(*batch)
+        started = time.perf_counter()
+        try:
+            frame = pd.DataFrame(np.concatenate(matrices), columns=FEATURE_COLUMNS)
+            rows = np.arange(1, len(batch) + 1) * self.window - 1
+            values = await loop.run_in_executor(self._executor, self.model.predict, frame, rows)
+        except Exception as error:
+            _fail(batch, error)
+            return
+        finished = time.perf_counter()
+        self.counts["predict_seconds"] += finished - started
+        self.counts["batches"] += 1
+        self.counts["requests"] += len(batch)
+        for future, value, at in zip(futures, values, submitted):
+            self.latencies.append(finished - at)
+            if not future.done():
+                future.set_result(float(value))
+
+    def stats(self):
+        """요청/배치 수, 평균 배치 크기, 지연 시간 p50/p99 (ms)"""
+        latencies = np.array(self.latencies) * 1000
+        return {
+            **self.counts,
+            "predict_seconds": round(self.counts["predict_seconds"], 3),
+            "mean_batch_size": self.counts["requests"] / self.counts["batches"] if self.counts["batches"] else None,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
+
+
+def _fail(batch, error):
+    """배치 요청 중 아직 끝나지 않은 것에 오류 전달"""
+    for _, future, _ in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+def window_matrix(window, size):
+    """요청 특성 표 -> 마지막 size 행 행렬 (행이 모자라면 None = 예측 불가, 열 수가 다르면 ValueError)"""
+    matrix = feature_matrix(window) if isinstance(window, pd.DataFrame) \
+        else np.atleast_2d(np.asarray(window, dtype=FEATURE_DTYPE))
+    if matrix.ndim != 2 or matrix.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(f"요청 특성 표는 (행 수, {len(FEATURE_COLUMNS)}) 이어야 합니다: {matrix.shape}")
+    if len(matrix) < size:
+        return None
+    return matrix[-size:]
+
+
+class ThreadedBroker:
+    """전용 이벤트 루프 스레드에서 도는 InferenceBroker (동기 코드에서 호출)"""
+
+    def __init__(self, model, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.broker = InferenceBroker(model, **kwargs)
+        self._thread = threading.Thread(target=self.loop.run_forever, name="inference-broker", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.broker.start(), self.loop).result()
+
+    def submit(self, window):
+        """concurrent.futures.Future 반환 (여러 요청을 먼저 보내고 나중에 결과를 모을 때)"""
+        return asyncio.run_coroutine_threadsafe(self.broker.predict(window), self.loop)
+
+    def predict(self, window, timeout=None):
+        return self.submit(window).result(timeout)
+
+    def stats(self):
+        return self.broker.stats()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.broker.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+# ========== 2. 부하 시험 ==========
+async def _client(broker, windows, n_requests, rng):
+    for _ in range(n_requests):
+        await broker.predict(windows[rng.integers(len(windows))])
+
+
+async def load_test(model, windows, clients, n_requests, max_batch_size, max_wait, seed=0):
+    """동시 클라이언트 clients 개가 n_requests 번씩 요청 -> (초당 처리 요청 수, 브로커 통계)"""
+    rng = np.random.default_rng(seed)
+    async with InferenceBroker(model, max_batch_size, max_wait) as broker:
+        started = time.perf_counter()
+        await asyncio.gather(*[_client(broker, windows, n_requests, np.random.default_rng(rng.integers(2 ** 31)))
+                               for _ in range(clients)])
+        seconds = time.perf_counter() - started
+    return clients * n_requests / seconds, broker.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="마이크로 배치 추론 브로커 부하 시험")
+    parser.add_argument("--data", default=TRAIN_PATH, help="요청 구간을 뽑을 15분 데이터 CSV")
+    parser.add_argument("--model", choices=list(COST_MODELS), default="xgboost", help="요금 예측 모델")
+    parser.add_argument("--clients", type=int, default=256, help="동시 요청 클라이언트 수")
+    parser.add_argument("--requests", type=int, default=20, help="클라이언트당 요청 수")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH_SIZE, help="최대 배치 크기")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000, help="배치 최대 대기 (ms)")
+    parser.add_argument("--compiled", action="store_true", help="xgboost 를 컴파일한 트리로 예측 (utills.tree_model)")
+    args = parser.parse_args(argv)
+
+    model = load_cost_model(args.model, compiled=args.compiled)
+    features = build_features(load_train_data(args.data).sort_values("측정일시").reset_index(drop=True))
+    matrix = feature_matrix(features)
+    window = model.input_window
+    windows = [matrix[row - window + 1:row + 1] for row in range(window - 1, len(matrix), 7)]
+
+    for label, max_batch in (("배치 없음", 1), ("마이크로 배치", args.max_batch)):
+        throughput, stats = asyncio.run(load_test(model, windows, args.clients, args.requests, max_batch,
+                                                  args.max_wait_ms / 1000))
+        print(f"{label:<8} 처리량 {throughput:,.0f}건/초, 평균 배치 {stats['mean_batch_size']:.1f}, "
+              f"p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""전기요금 예측 구간 (대시보드 불확실성 밴드)
+
+예측 기간 전체(대시보드 예측 파일의 모든 구간)를 한 번에 계산해 models/prediction_intervals.csv 에 저장하고,
+대시보드는 시작할 때 id 로 붙여 두므로 구간마다 추가 추론이 없다.
+대시보드 예측 구간의 측정값은 실측이 아니라 recursive 예측(utills.train.test_features)이므로
+구간은 그 예측 오차까지 포함하도록 맞춘다.
+    - quantile (기본): XGBoost 분위수 회귀(reg:quantileerror, 하한/상한 분위수를 모델 하나로) 를 train.csv 로 학습.
+      마지막 valid_days 일을 학습에서 빼고, 그 구간 측정값을 recursive 로 예측한 특성으로 구간을 낸 뒤
+      포함률이 모자란 만큼 폭을 넓힌다 (conformal 보정: 앞 절반으로 보정 폭을 구하고 뒤 절반으로 포함률 확인).
+    - residual: out-of-sample 백테스트 예측(블렌딩 점 예측)의 잔차를 그룹(기본: 시간)별로 부트스트랩 재표집해
+      분위수 평균을 점 예측에 더함. 폴드마다 다시 학습하고 측정값도 recursive 로 예측한 백테스트
+      (utills.backtest --mode forecast --strategy recursive) 만 받는다. 백테스트 예측 길이(하루)는 대시보드
+      예측 기간보다 짧으므로 뒤쪽 구간에서는 밴드가 좁을 수 있다.
+구간은 coverage(기본 90%) 중앙 구간이며 하한은 0 원 아래로 내려가지 않는다.
+residual 은 폴드 하나씩 뺀 교차 검증, quantile 은 마지막 valid_days 일의 뒤 절반으로 실제 포함률을 확인한다.
+
+사용 예:
+    python -m utills.intervals --coverage 0.8
+    python -m utills.backtest --mode forecast --strategy recursive --out ./reports/backtest_forecast
+    python -m utills.intervals --method residual --backtest ./reports/backtest_forecast
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, load_train_data, data_version
+from utills.features import TARGET_COLUMN, build_features, feature_matrix
+from utills.ensemble import (ACTUAL_COLUMN, BLEND_LEVELS, CODE_WORKTYPES, Blender, frame_groups, group_keys,
+                             load_backtest, load_blended_targets)
+from utills.train import MODELS_DIR, PREDICTION_FILES, XGBOOST_PARAMS, TEST_FORECAST_STRATEGY, test_features
+
+INTERVALS_PATH = "./models/prediction_intervals.csv"
+INTERVAL_METHODS = ["quantile", "residual"]
+DEFAULT_COVERAGE = 0.9
+DEFAULT_BOOTSTRAP = 100
+# 그룹별 잔차 분위수를 따로 구하는 최소 구간 수
+DEFAULT_MIN_ROWS = 96
+DEFAULT_VALID_DAYS = 14
+
+# 분위수 회귀: 점 예측 모델보다 작게 (구간 폭만 맞으면 됨)
+QUANTILE_PARAMS = {**XGBOOST_PARAMS, "n_estimators": 300, "objective": "reg:quantileerror"}
+
+
+def quantile_levels(coverage):
+    """중앙 구간 포함률 -> (하한 분위수, 상한 분위수)"""
+    if not 0 < coverage < 1:
+        raise ValueError(f"coverage 는 0 과 1 사이여야 합니다: {coverage}")
+    return (1 - coverage) / 2, (1 + coverage) / 2
+
+
+# ========== 1. 잔차 부트스트랩 ==========
+def bootstrap_quantiles(residuals, levels, n_boot=DEFAULT_BOOTSTRAP, rng=None):
+    """잔차 재표집 n_boot 번의 분위수 평균 -> (하한, 상한) 오프셋"""
+    rng = rng or np.random.default_rng()
+    samples = rng.choice(residuals, size=(n_boot, len(residuals)), replace=True)
+    return np.quantile(samples, levels, axis=1).mean(axis=1)
+
+
+class ResidualIntervals:
+    """그룹별 잔차 분위수 오프셋 (점 예측 + 오프셋 = 구간)"""
+
+    def __init__(self, level, overall, groups):
+        self.level = level
+        self.overall = overall
+        self.groups = groups
+
+    @classmethod
+    def fit(cls, frame, point, coverage=DEFAULT_COVERAGE, level="hour", min_rows=DEFAULT_MIN_ROWS,
+            n_boot=DEFAULT_BOOTSTRAP, seed=0):
+        """표(측정일시, 작업유형, 실측 전기요금) + 점 예측 -> ResidualIntervals"""
+        levels = quantile_levels(coverage)
+        rng = np.random.default_rng(seed)
+        residuals = frame[ACTUAL_COLUMN].to_numpy(dtype=float) - np.asarray(point, dtype=float)
+        usable = np.isfinite(residuals)
+        residuals = residuals[usable]
+        overall = bootstrap_quantiles(residuals, levels, n_boot, rng)
+        groups = {}
+        if level != "global":
+            keys = group_keys(level, *frame_groups(frame.loc[usable]))
+            for key in pd.unique(keys):
+                mask = keys == key
+                if mask.sum() >= min_rows:
+                    groups[key] = bootstrap_quantiles(residuals[mask], levels, n_boot, rng)
+        return cls(level, overall, groups)
+
+    def offsets(self, hours, worktypes):
+        """행별 (하한, 상한) 오프셋 (n, 2)"""
+        result = np.tile(self.overall, (len(hours), 1))
+        if self.groups:
+            keys = group_keys(self.level, hours, worktypes)
+            for key, value in self.groups.items():
+                result[keys == key] = value
+        return result
+
+    def predict(self, point, hours, worktypes):
+        bounds = np.asarray(point, dtype=float)[:, None] + self.offsets(hours, worktypes)
+        return np.maximum(bounds, 0.0)
+
+
+def backtest_point(predictions, blender=None):
+    """백테스트 예측 표 -> 대시보드와 같은 블렌딩 점 예측"""
+    return (blender or Blender.load()).blend_frame(predictions)
+
+
+def residual_coverage(predictions, point, coverage, level, min_rows, n_boot, seed=0):
+    """폴드 하나씩 빼고 오프셋 학습 -> 뺀 폴드 (포함률, 평균 폭)"""
+    bounds = np.full((len(predictions), 2), np.nan)
+    for fold in predictions["폴드"].unique():
+        held = (predictions["폴드"] == fold).to_numpy()
+        intervals = ResidualIntervals.fit(predictions.loc[~held], point[~held], coverage, level, min_rows,
+                                          n_boot, seed)
+        bounds[held] = intervals.predict(point[held], *frame_groups(predictions.loc[held]))
+    return interval_scores(predictions[ACTUAL_COLUMN].to_numpy(dtype=float), bounds)
+
+
+# ========== 2. 분위수 회귀 ==========
+def fit_quantile_model(X, y, coverage=DEFAULT_COVERAGE, params=None, threads=None, seed=0):
+    """하한/상한 분위수 XGBoost 모델 하나 (predict 결과 (n, 2))"""
+    from xgboost import XGBRegressor
+
+    params = {**QUANTILE_PARAMS, **(params or {})}
+    model = XGBRegressor(**params, quantile_alpha=np.array(quantile_levels(coverage)),
+                         n_jobs=threads or os.cpu_count() or 1, random_state=seed)
+    model.fit(X, y)
+    return model
+
+
+def quantile_bounds(model, X, margin=0.0):
+    # 분위수 교차 방지 + conformal 보정 폭 + 0 원 아래 제거
+    bounds = np.sort(model.predict(X).reshape(len(X), -1), axis=1) + np.array([-margin, margin])
+    return np.maximum(bounds, 0.0)
+
+
+def conformal_margin(actual, bounds, coverage=DEFAULT_COVERAGE):
+    """보정 구간 실측이 coverage 만큼 들어오도록 양쪽에 더할 폭 (음수면 좁힘)"""
+    scores = np.maximum(bounds[:, 0] - actual, actual - bounds[:, 1])
+    level = min(1.0, np.ceil((len(scores) + 1) * coverage) / len(scores))
+    return float(np.quantile(scores, level))
+
+
+def forecast_window_features(train, valid, seed=0):
+    """검증 구간 측정값을 그 앞 이력에서 recursive 로 예측한 특성 행렬 (대시보드 예측 파일과 같은 방식)"""
+    features, rows = test_features(train.loc[~valid].reset_index(drop=True),
+                                   train.loc[valid].reset_index(drop=True), {"n_jobs": os.cpu_count() or 1}, seed)
+    return feature_matrix(features, rows)
+
+
+# ========== 3. 평가 / 예측 기간 계산 ==========
+def interval_scores(actual, bounds):
+    """(포함률, 평균 폭) (실측 또는 구간이 없는 행 제외)"""
+    valid = np.isfinite(actual) & np.isfinite(bounds).all(axis=1)
+    actual, bounds = actual[valid], bounds[valid]
+    inside = (actual >= bounds[:, 0]) & (actual <= bounds[:, 1])
+    return float(inside.mean()), float((bounds[:, 1] - bounds[:, 0]).mean())
+
+
+def serving_frame(models_dir=MODELS_DIR):
+    """대시보드가 보여 줄 점 예측(블렌딩) + 시간/작업유형 + 모델 입력 특성"""
+    targets = load_blended_targets(models_dir)
+    features = pd.read_csv(os.path.join(models_dir, PREDICTION_FILES["xgboost"]["features"]),
+                           parse_dates=["측정일시"]).drop(columns=["target"])
+    frame = targets.merge(features, on=["id", "측정일시"], how="left")
+    frame["작업유형"] = frame["작업유형_encoded"].map(CODE_WORKTYPES)
+    return frame
+
+
+def write_intervals(frame, bounds, path=INTERVALS_PATH, meta=None):
+    """예측 기간 구간 저장 (id, 측정일시, 점 예측, 하한, 상한) + 같은 이름 .json 에 설정/검증 결과"""
+    table = pd.DataFrame({"id": frame["id"].to_numpy(), "측정일시": frame["측정일시"].to_numpy(),
+                          "target": frame["target"].to_numpy(), "lower": bounds[:, 0], "upper": bounds[:, 1]})
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    table.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta or {}, f, ensure_ascii=False, indent=2)
+    return table
+
+
+def attach_intervals(targets, path=INTERVALS_PATH):
+    """점 예측 표(id, target, ...) 에 lower/upper 열 추가 (구간 파일이 없으면 NaN)
+
+    구간을 계산한 뒤 점 예측이 바뀌었으면(모델/가중치 재배포) 밴드를 점 예측 차이만큼 옮긴다.
+    """
+    result = targets.copy()
+    if not os.path.exists(path):
+        result["lower"] = result["upper"] = np.nan
+        return result
+    saved = pd.read_csv(path, usecols=["id", "target", "lower", "upper"]).set_index("id").reindex(result["id"])
+    shift = result["target"].to_numpy(dtype=float) - saved["target"].to_numpy(dtype=float)
+    shift = np.where(np.isfinite(shift), shift, 0.0)
+    result["lower"] = np.maximum(saved["lower"].to_numpy() + shift, 0.0)
+    result["upper"] = saved["upper"].to_numpy() + shift
+    return result
+
+
+def interval_meta(path=INTERVALS_PATH):
+    """write_intervals 설정/검증 결과 (없으면 빈 dict)"""
+    meta_path = os.path.splitext(path)[0] + ".json"
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ========== 4. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="전기요금 예측 구간 계산")
+    parser.add_argument("--method", choices=INTERVAL_METHODS, default="quantile", help="구간 계산 방식")
+    parser.add_argument("--coverage", type=float, default=DEFAULT_COVERAGE, help="목표 포함률 (중앙 구간)")
+    parser.add_argument("--backtest", default="./reports/backtest_forecast",
+                        help="residual: utills.backtest --mode forecast --strategy recursive 출력 폴더")
+    parser.add_argument("--level", choices=BLEND_LEVELS, default="hour", help="residual: 잔차 그룹 단위")
+    parser.add_argument("--min-rows", type=int, default=DEFAULT_MIN_ROWS, help="residual: 그룹별 최소 구간 수")
+    parser.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAP, help="residual: 재표집 횟수")
+    parser.add_argument("--data", default=TRAIN_PATH, help="quantile: 학습 15분 데이터 CSV")
+    parser.add_argument("--valid-days", type=int, default=DEFAULT_VALID_DAYS, help="quantile: 검증 구간 일수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--models-dir", default=MODELS_DIR, help="대시보드 예측 파일 폴더")
+    parser.add_argument("--out", default=INTERVALS_PATH, help="구간 CSV")
+    args = parser.parse_args(argv)
+
+    frame = serving_frame(args.models_dir)
+    meta = {"created_at": datetime.now().isoformat(timespec="seconds"), "method": args.method,
+            "coverage": args.coverage}
+    if args.method == "residual":
+        try:
+            predictions, backtest = load_backtest(args.backtest)
+        except ValueError as error:
+            parser.error(str(error))
+        if backtest.get("mode") != "forecast" or backtest.get("strategy") != TEST_FORECAST_STRATEGY:
+            parser.error(f"{args.backtest}: residual 은 측정값 예측 오차가 들어간 백테스트가 필요합니다 "
+                         f"(--mode forecast --strategy {TEST_FORECAST_STRATEGY}, 현재 {backtest.get('mode')})")
+        point = backtest_point(predictions)
+        covered, width = residual_coverage(predictions, point, args.coverage, args.level, args.min_rows,
+                                           args.bootstrap, args.seed)
+        started = time.perf_counter()
+        intervals = ResidualIntervals.fit(predictions, point, args.coverage, args.level, args.min_rows,
+                                          args.bootstrap, args.seed)
+        bounds = intervals.predict(frame["target"].to_numpy(dtype=float), *frame_groups(frame))
+        meta.update({"backtest": args.backtest, "backtest_mode": backtest["mode"], "level": args.level,
+                     "bootstrap": args.bootstrap, "check": "교차 검증 (폴드 하나씩 제외)"})
+    else:
+        train = load_train_data(args.data).sort_values("측정일시").reset_index(drop=True)
+        X, y = feature_matrix(build_features(train)), train[TARGET_COLUMN].to_numpy(dtype=float)
+        valid = (train["측정일시"] > train["측정일시"].iloc[-1] - pd.Timedelta(days=args.valid_days)).to_numpy()
+        model = fit_quantile_model(X[~valid], y[~valid], args.coverage, seed=args.seed)
+        # 검증 구간은 실측 특성이 아니라 대시보드처럼 recursive 예측 특성으로 평가
+        raw = quantile_bounds(model, forecast_window_features(train, valid, args.seed))
+        actual = y[valid]
+        half = len(actual) // 2
+        covered, width = interval_scores(
+            actual[half:], np.maximum(raw[half:] + conformal_margin(actual[:half], raw[:half], args.coverage)
+                                      * np.array([-1, 1]), 0.0))
+        margin = conformal_margin(actual, raw, args.coverage)
+        started = time.perf_counter()
+        model = fit_quantile_model(X, y, args.coverage, seed=args.seed)
+        bounds = quantile_bounds(model, feature_matrix(frame), margin)
+        meta.update({"data": args.data, "data_version": data_version(args.data), "valid_days": args.valid_days,
+                     "uncalibrated_coverage": round(interval_scores(actual, raw)[0], 4),
+                     "conformal_margin": round(margin, 2),
+                     "check": f"마지막 {args.valid_days}일 뒤 절반 (recursive 예측 특성, 앞 절반으로 보정)"})
+    seconds = time.perf_counter() - started
+    meta.update({"measured_coverage": round(covered, 4), "mean_width": round(width, 2), "rows": len(frame),
+                 "seconds": round(seconds, 3)})
+    write_intervals(frame, bounds, args.out, meta)
+
+    print(f"{meta['check']}: 포함률 {covered:.1%} (목표 {args.coverage:.0%}), 평균 폭 {width:,.1f}원")
+    print(f"완료: {len(frame):,} 구간 {seconds:.2f}초 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""최대부하 시간대 사용량 이전(load shifting) 요금 절감 계산 (날짜별 선형계획)
+
+보고서 페이지는 한 프로세스에서 바로 풀고(전체 이력 약 1~2초), CLI 는 날짜를 나눠 spawn 프로세스로 병렬 계산한다.
+
+사용 예:
+    python -m utills.load_shift
+    python -m utills.load_shift --fraction 0.3 --max-shift-hours 2 --workers 4 --out ./reports/load_shift
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+from utills.data import TRAIN_PATH, WORKTYPES, load_train_data
+from utills.demand import INTERVALS_PER_HOUR
+from utills.tariff import TARIFF_PLANS, DEFAULT_PLAN, SEASON_OF_MONTH, energy_rate_matrix
+
+MAXIMUM_LOAD = WORKTYPES.index("Maximum_Load")
+
+# 기본 이전 조건: 최대부하 시간대 사용량의 20%를 앞뒤 4시간 이내로 이동, 하루 최대수요는 넘지 않음
+DEFAULT_FLEXIBLE_FRACTION = 0.2
+DEFAULT_MAX_SHIFT_HOURS = 4
+
+
+def hourly_fraction(fraction=DEFAULT_FLEXIBLE_FRACTION, hours=range(24)):
+    """시간(0~23)별 이전 가능 비율 배열 (hours 에 없는 시간은 0)"""
+    result = np.zeros(24)
+    result[list(hours)] = fraction
+    return result
+
+
+# ========== 1. 하루 최적화 ==========
+def solve_day(kwh, rates, load_idx, hours, flexible_fraction, max_shift_hours=DEFAULT_MAX_SHIFT_HOURS,
+              capacity_kwh=None):
+    """하루치 구간에 대해 요금 최소 이전 계획 계산 (선형계획)
+
+    최대부하 구간의 이전 가능량(flexible_fraction[시간] x 사용량)을 max_shift_hours 이내의
+    더 싼 구간으로 옮긴다. 이동 후 각 구간 사용량은 capacity_kwh(기본: 그날 최대 사용량)를 넘지 않는다.
+    반환: 이전 후 구간별 사용량
+    """
+    kwh = np.asarray(kwh, dtype=float)
+    flexible = kwh * flexible_fraction[hours] * (load_idx == MAXIMUM_LOAD)
+    cap = kwh.max() if capacity_kwh is None else capacity_kwh
+    headroom = np.maximum(cap - kwh, 0.0)
+
+    sources = np.flatnonzero(flexible > 0)
+    targets = np.flatnonzero((load_idx != MAXIMUM_LOAD) & (headroom > 0))
+    if len(sources) == 0 or len(targets) == 0:
+        return kwh.copy()
+
+    # 이동 거리 제한 + 단가가 내려가는 쌍만 변수로 사용
+    max_steps = int(max_shift_hours * INTERVALS_PER_HOUR)
+    src, dst = np.meshgrid(sources, targets, indexing="ij")
+    gain = rates[dst] - rates[src]
+    valid = (np.abs(dst - src) <= max_steps) & (gain < 0)
+    src, dst, gain = src[valid], dst[valid], gain[valid]
+    if len(src) == 0:
+        return kwh.copy()
+
+    n_vars = len(src)
+    src_row = np.searchsorted(sources, src)
+    dst_row = np.searchsorted(targets, dst)
+    A_ub = coo_matrix(
+        (np.ones(2 * n_vars), (np.r_[src_row, len(sources) + dst_row], np.r_[np.arange(n_vars), np.arange(n_vars)])),
+        shape=(len(sources) + len(targets), n_vars),
+    ).tocsr()
+    b_ub = np.r_[flexible[sources], headroom[targets]]
+    result = linprog(gain, A_ub=A_ub, b_ub=b_ub, bounds=(0, None), method="highs")
+    if result.status != 0:
+        return kwh.copy()
+
+    moved = result.x
+    shifted = kwh.copy()
+    np.subtract.at(shifted, src, moved)
+    np.add.at(shifted, dst, moved)
+    return shifted
+
+
+def _solve_days(days, flexible_fraction, max_shift_hours, capacity_kwh):
+    return [solve_day(kwh, rates, load_idx, hours, flexible_fraction, max_shift_hours, capacity_kwh)
+            for kwh, rates, load_idx, hours in days]
+
+
+# ========== 2. 전체 이력 ==========
+def optimize_load_shift(df, flexible_fraction=None, max_shift_hours=DEFAULT_MAX_SHIFT_HOURS, capacity_kw=None,
+                        tariff=None, workers=1):
+    """날짜별 부하 이전 최적화 (날짜 단위로 프로세스 병렬)
+
+    flexible_fraction: 시간별 이전 가능 비율 (길이 24, 기본 hourly_fraction())
+    capacity_kw: 이전 후 구간 수요전력 상한 (기본: 날짜별 기존 최대수요)
+    반환: {"intervals": 구간별 이전 전/후 표, "daily": 날짜별 요약, "summary": 전체 요약}
+    """
+    tariff = tariff or TARIFF_PLANS[DEFAULT_PLAN]
+    flexible_fraction = hourly_fraction() if flexible_fraction is None else np.asarray(flexible_fraction, dtype=float)
+    capacity_kwh = None if capacity_kw is None else capacity_kw / INTERVALS_PER_HOUR
+
+    data = df.sort_values("측정일시")
+    timestamps = data["측정일시"]
+    load_idx = pd.Categorical(data["작업유형"], categories=WORKTYPES).codes
+    rates = energy_rate_matrix(tariff)[SEASON_OF_MONTH[timestamps.dt.month.to_numpy()], load_idx]
+    kwh = data["전력사용량(kWh)"].to_numpy(dtype=float)
+    hours = timestamps.dt.hour.to_numpy()
+    dates = timestamps.dt.date.to_numpy()
+
+    bounds = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1], True])
+    days = [(kwh[a:b], rates[a:b], load_idx[a:b], hours[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(days) > 1:
+        size = -(-len(days) // workers)
+        chunks = [days[i:i + size] for i in range(0, len(days), size)]
+        # 스트림릿처럼 스레드가 살아 있는 프로세스에서 호출될 수 있으므로 fork 대신 spawn
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(_solve_days, chunk, flexible_fraction, max_shift_hours, capacity_kwh)
+                       for chunk in chunks]
+            shifted_days = [day for future in futures for day in future.result()]
+    else:
+        shifted_days = _solve_days(days, flexible_fraction, max_shift_hours, capacity_kwh)
+    shifted = np.concatenate(shifted_days) if shifted_days else np.empty(0)
+
+    intervals = pd.DataFrame({
+        "측정일시": timestamps.to_numpy(),
+        "날짜": dates,
+        "시간": hours,
+        "작업유형": data["작업유형"].to_numpy(),
+        "이전 전 사용량(kWh)": kwh,
+        "이전 후 사용량(kWh)": shifted,
+        "이전 전 전력량요금(원)": kwh * rates,
+        "이전 후 전력량요금(원)": shifted * rates,
+    })
+    intervals["이전량(kWh)"] = np.maximum(kwh - shifted, 0.0)
+
+    daily = intervals.groupby("날짜").agg({
+        "이전 전 사용량(kWh)": "sum",
+        "이전량(kWh)": "sum",
+        "이전 전 전력량요금(원)": "sum",
+        "이전 후 전력량요금(원)": "sum",
+    })
+    daily["절감액(원)"] = daily["이전 전 전력량요금(원)"] - daily["이전 후 전력량요금(원)"]
+
+    before_cost = daily["이전 전 전력량요금(원)"].sum()
+    summary = {
+        "days": len(daily),
+        "shifted_kwh": daily["이전량(kWh)"].sum(),
+        "before_cost": before_cost,
+        "after_cost": daily["이전 후 전력량요금(원)"].sum(),
+        "savings": daily["절감액(원)"].sum(),
+        "savings_pct": daily["절감액(원)"].sum() / before_cost * 100 if before_cost > 0 else 0.0,
+    }
+    return {"intervals": intervals, "daily": daily, "summary": summary}
+
+
+def hourly_stack(intervals, column):
+    """시간 x 작업유형 사용량 표 (이전 전/후 스택 차트용, 이전 후에도 시간대의 작업유형 기준)"""
+    table = intervals.groupby(["시간", "작업유형"])[column].sum().unstack(fill_value=0)
+    table = table.reindex(index=range(24), columns=[w for w in WORKTYPES if w in table.columns], fill_value=0)
+    return table
+
+
+# ========== 3. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="최대부하 사용량 이전 요금 절감 계산")
+    parser.add_argument("--data", default=TRAIN_PATH, help="15분 데이터 CSV")
+    parser.add_argument("--fraction", type=float, default=DEFAULT_FLEXIBLE_FRACTION,
+                        help="최대부하 구간 사용량 중 이전 가능 비율")
+    parser.add_argument("--max-shift-hours", type=float, default=DEFAULT_MAX_SHIFT_HOURS, help="최대 이동 시간")
+    parser.add_argument("--capacity-kw", type=float, help="이전 후 수요전력 상한 (기본: 날짜별 기존 최대수요)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 프로세스 수")
+    parser.add_argument("--out", default="./reports/load_shift", help="출력 폴더")
+    args = parser.parse_args(argv)
+
+    df = load_train_data(args.data)
+    started = time.perf_counter()
+    result = optimize_load_shift(df, hourly_fraction(args.fraction), args.max_shift_hours, args.capacity_kw,
+                                 workers=args.workers)
+    seconds = time.perf_counter() - started
+
+    os.makedirs(args.out, exist_ok=True)
+    result["daily"].to_csv(os.path.join(args.out, "daily.csv"), encoding="utf-8-sig")
+    result["intervals"].to_csv(os.path.join(args.out, "intervals.csv"), index=False, encoding="utf-8-sig")
+    summary = result["summary"]
+    print(f"{summary['days']}일, 이전량 {summary['shifted_kwh']:,.1f}kWh, 전력량요금 {summary['before_cost']:,.0f}원 -> "
+          f"{summary['after_cost']:,.0f}원 (절감 {summary['savings']:,.0f}원, {summary['savings_pct']:.2f}%)")
+    print(f"완료: 프로세스 {args.workers}개 {seconds:.1f}초 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+import os
+import json
+import pickle
+import warnings
+
+import numpy as np
+
+import pandas as pd
+
+from utills.data import data_version
+from utills.features import FEATURE_COLUMNS, feature_matrix
+
+XGBOOST_PATH = "./models/xgboost.pkl"
+LSTM_PATH = "./models/lstm.h5"
+
+# LSTM 입력: 최근 48구간(12시간) x 측정값 5개 시퀀스 + 현재 구간의 나머지 특성 24개
+SEQUENCE_LENGTH = 48
+SEQUENCE_COLUMNS = FEATURE_COLUMNS[:5]
+STATIC_COLUMNS = FEATURE_COLUMNS[5:]
+
+# 배치 정규화 epsilon (Keras 기본값)
+BN_EPSILON = 1e-3
+
+# LSTM 가중치 정밀도 (float16/int8 은 2차원 가중치 행렬만 줄이고, 편향/배치 정규화 값은 float32 유지)
+LSTM_PRECISIONS = ["float32", "float16", "int8"]
+
+# 모델 옆에 저장된 예측 CSV (특성 표, 예측값) -> 불러올 때 같은 값이 나오는지 확인
+LSTM_CHECK_FILES = ("target_pred_feature_lstm.csv", "lstm_target.csv")
+# 저장된 예측과의 허용 오차 (MAE / 평균 예측값)
+LSTM_CHECK_TOLERANCE = 0.005
+
+# LSTM 층 역할 -> h5 층 이름 (기존 lstm.h5 이름, 새로 학습할 때도 같은 이름 사용)
+LSTM_LAYER_NAMES = {
+    "sequence_lstm": "lstm_8",
+    "sequence_norm": "batch_normalization_8",
+    "summary_lstm": "lstm_9",
+    "summary_norm": "batch_normalization_9",
+    "static_dense": "dense_12",
+    "hidden_dense": "dense_13",
+    "output": "dense_14",
+}
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+# ========== 1. XGBoost ==========
+class XGBoostCostModel:
+    """xgboost.pkl (XGBRegressor) 로 구간별 전기요금 예측"""
+
+    name = "xgboost"
+    # 첫 예측 구간 앞에 필요한 이력 구간 수 (전력사용량_lag_6)
+    context = 6
+    # 한 행 예측에 쓰는 특성 표 행 수 (시차 특성은 같은 행에 들어 있음)
+    input_window = 1
+
+    def __init__(self, path=XGBOOST_PATH):
+        self.path = path
+        with open(path, "rb") as f, warnings.catch_warnings():
+            # 이전 버전 xgboost 로 저장한 pickle 경고 (예측 결과에는 영향 없음)
+            warnings.simplefilter("ignore", UserWarning)
+            self.model = pickle.load(f)
+
+    @property
+    def version(self):
+        return data_version(self.path)
+
+    def predict(self, features, rows=None):
+        """특성 표 -> 예측 전기요금 (rows 를 주면 해당 행만)"""
+        return self.model.predict(feature_matrix(features, rows)).astype(float)
+
+
+# ========== 2. LSTM ==========
+class LSTMCostModel:
+    """lstm.h5 가중치를 읽어 NumPy 로 추론 (TensorFlow 없이 실행)
+
+    구조: 시퀀스 -> LSTM(64) -> BN -> LSTM(32) -> BN, 정적 특성 -> Dense(32, relu)
+          -> 결합 -> Dense(64, relu) -> Dense(1)
+    입력/출력 스케일은 학습 때 저장한 scaler_path(JSON: 특성별 mean/scale, 목표값 mean/scale)를 쓴다.
+    파일이 없으면 열지 않는다 (train.csv 로 다시 계산한 값은 학습 때 값과 달라 models/lstm.h5 의 저장된 예측을
+    재현하지 못함, MAE 약 1,370). 모델 옆에 예측 CSV(LSTM_CHECK_FILES)가 있으면 불러올 때 같은 예측이
+    나오는지 확인하고, 다르면 ValueError.
+    precision 이 float16/int8 이면 가중치 행렬을 줄여서 들고 있다가 층을 계산할 때만 float32 로 되돌린다.
+    """
+
+    name = "lstm"
+    context = SEQUENCE_LENGTH - 1
+    precision = "float32"
+    # int8 가중치 행렬의 열별 스케일 (가중치 이름 -> (열 수,) 배열)
+    weight_scales = {}
+
+    def __init__(self, path=LSTM_PATH, scaler_path=None, precision="float32"):
+        import h5py
+
+        self.path = path
+        self.scaler_path = scaler_path or os.path.splitext(path)[0] + "_scaler.json"
+        with h5py.File(path, "r") as f:
+            weights = f["model_weights"]
+            self.weights = {
+                f"{layer}/{name}": np.asarray(dataset[()], dtype=np.float32)
+                for layer in weights
+                for name, dataset in _datasets(weights[layer])
+            }
+            # 시퀀스 길이는 저장된 입력 크기를 따름 (탐색으로 바뀐 모델도 그대로 추론)
+            self.sequence_length = _sequence_length(f.attrs.get("model_config"))
+        if precision != "float32":
+            self.weights, self.weight_scales = quantize_weights(self.weights, precision)
+            self.precision = precision
+        self.context = self.sequence_length - 1
+        self.scaler = self._load_scaler()
+        self.check_stored_predictions()
+
+    @property
+    def version(self):
+        # 정밀도가 다르면 예측값도 다르므로 예측 캐시 키가 겹치지 않게 구분
+        version = data_version(self.path)
+        return version if self.precision == "float32" else f"{version}-{self.precision}"
+
+    def weight_bytes(self):
+        """들고 있는 가중치 바이트 수 (int8 스케일 포함)"""
+        return int(sum(array.nbytes for array in self.weights.values())
+                   + sum(scale.nbytes for scale in self.weight_scales.values()))
+
+    @property
+    def input_window(self):
+        return self.sequence_length
+
+    def _load_scaler(self):
+        if not os.path.exists(self.scaler_path):
+            raise FileNotFoundError(
+                f"{self.scaler_path} 가 없어 {self.path} 를 쓸 수 없습니다: 학습 때 표준화 값 없이는 저장된 예측을 "
+                "재현하지 못합니다 (utills.train 으로 다시 학습하면 함께 저장됨)")
+        with open(self.scaler_path, encoding="utf-8") as f:
+            return scaler_arrays(json.load(f))
+
+    def check_stored_predictions(self, tolerance=LSTM_CHECK_TOLERANCE):
+        """모델 옆 예측 CSV 가 있으면 같은 특성 표로 다시 예측해 비교 (다르면 ValueError). MAE 또는 None 반환"""
+        folder = os.path.dirname(self.path)
+        paths = [os.path.join(folder, filename) for filename in LSTM_CHECK_FILES]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        features = pd.read_csv(paths[0])
+        stored = pd.read_csv(paths[1])["target"].to_numpy(dtype=float)
+        rows = np.flatnonzero(~np.isnan(stored))
+        rows = rows[rows >= self.context]
+        error = float(np.mean(np.abs(self.predict(features, rows) - stored[rows])))
+        if error > tolerance * float(np.mean(np.abs(stored[rows]))):
+            raise ValueError(f"{self.path}: 저장된 예측({paths[1]})과 다릅니다 (MAE {error:,.1f}) - "
+                             f"가중치와 표준화 값({self.scaler_path})이 함께 학습된 것인지 확인하세요")
+        return error
+
+    def _layer(self, role, name):
+        key = f"{LSTM_LAYER_NAMES[role]}/{name}"
+        return dequantize(self.weights[key], self.weight_scales.get(key))
+
+    def _lstm(self, x, role, return_sequences):
+        kernel = self._layer(role, "kernel")
+        recurrent = self._layer(role, "recurrent_kernel")
+        bias = self._layer(role, "bias")
+        units = recurrent.shape[0]
+        # 입력 투영은 시점 전체를 한 번에 계산
+        projected = x @ kernel + bias
+        h = np.zeros((x.shape[0], units), dtype=x.dtype)
+        c = np.zeros_like(h)
+        outputs = []
+        for step in range(x.shape[1]):
+            z = projected[:, step] + h @ recurrent
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                outputs.append(h)
+        return np.stack(outputs, axis=1) if return_sequences else h
+
+    def _batch_norm(self, x, role):
+        scale = self._layer(role, "gamma") / np.sqrt(self._layer(role, "moving_variance") + BN_EPSILON)
+        return (x - self._layer(role, "moving_mean")) * scale + self._layer(role, "beta")
+
+    def _dense(self, x, role, relu=False):
+        y = x @ self._layer(role, "kernel") + self._layer(role, "bias")
+        return np.maximum(y, 0) if relu else y
+
+    def forward(self, sequence, static):
+        """스케일된 입력 (n, 48, 5), (n, 24) -> 스케일된 출력 (n,)"""
+        h = self._batch_norm(self._lstm(sequence, "sequence_lstm", True), "sequence_norm")
+        h = self._batch_norm(self._lstm(h, "summary_lstm", False), "summary_norm")
+        s = self._dense(static, "static_dense", relu=True)
+        h = self._dense(np.concatenate([h, s], axis=1), "hidden_dense", relu=True)
+        return self._dense(h, "output")[:, 0]
+
+    def predict(self, features, rows=None):
+        """특성 표 -> 예측 전기요금 (각 행은 자기 포함 직전 sequence_length 구간 사용, 앞쪽 context 행은 NaN)"""
+        rows = np.arange(len(features)) if rows is None else np.asarray(rows)
+        result = np.full(len(rows), np.nan)
+        valid = rows >= self.context
+        if valid.any():
+            sequence, static = lstm_inputs(features, rows[valid], self.scaler, self.sequence_length)
+            output = self.forward(sequence, static)
+            result[valid] = output * self.scaler["target_scale"] + self.scaler["target_mean"]
+        return result
+
+
+def quantize_weights(weights, precision):
+    """float32 가중치 dict -> (정밀도를 줄인 가중치 dict, int8 열별 스케일 dict)
+
+    int8 은 열(출력 유닛)마다 절댓값 최대를 127 에 맞추는 대칭 양자화.
+    """
+    if precision not in LSTM_PRECISIONS:
+        raise ValueError(f"알 수 없는 정밀도: {precision} (가능: {', '.join(LSTM_PRECISIONS)})")
+    quantized, scales = {}, {}
+    for key, array in weights.items():
+        array = np.asarray(array, dtype=np.float32)
+        if array.ndim != 2 or precision == "float32":
+            quantized[key] = array
+        elif precision == "float16":
+            quantized[key] = array.astype(np.float16)
+        else:
+            scale = np.abs(array).max(axis=0) / 127
+            scale[scale == 0] = 1.0
+            quantized[key] = np.clip(np.round(array / scale), -127, 127).astype(np.int8)
+            scales[key] = scale.astype(np.float32)
+    return quantized, scales
+
+
+def dequantize(array, scale=None):
+    """quantize_weights 결과 텐서 1개 -> float32"""
+    if array.dtype == np.float32:
+        return array
+    array = array.astype(np.float32)
+    return array if scale is None else array * scale
+
+
+def fit_lstm_scaler(features, target):
+    """LSTM 입력/목표값 표준화 값 (JSON 으로 저장 가능한 dict)"""
+    # 통계는 float64 로 누적
+    columns = features[FEATURE_COLUMNS].astype(float)
+    scale = columns.std(ddof=0)
+    return {
+        "mean": columns.mean().to_dict(),
+        "scale": scale.where(scale > 0, 1.0).to_dict(),
+        "target_mean": float(np.mean(target)),
+        "target_scale": float(np.std(target)),
+    }
+
+
+def scaler_arrays(scaler):
+    """표준화 dict -> 특성 순서 배열"""
+    return {
+        "mean": np.array([scaler["mean"][c] for c in FEATURE_COLUMNS], dtype=np.float32),
+        "scale": np.array([scaler["scale"][c] for c in FEATURE_COLUMNS], dtype=np.float32),
+        "target_mean": scaler["target_mean"],
+        "target_scale": scaler["target_scale"],
+    }
+
+
+def scaler_dict(arrays):
+    """scaler_arrays 결과 -> JSON 으로 저장 가능한 dict (fit_lstm_scaler 형식)"""
+    return {
+        "mean": dict(zip(FEATURE_COLUMNS, arrays["mean"].astype(float).tolist())),
+        "scale": dict(zip(FEATURE_COLUMNS, arrays["scale"].astype(float).tolist())),
+        "target_mean": float(arrays["target_mean"]),
+        "target_scale": float(arrays["target_scale"]),
+    }
+
+
+def lstm_inputs(features, rows, scaler, sequence_length=SEQUENCE_LENGTH):
+    """특성 표 + 행 위치(각각 sequence_length - 1 이상) -> 스케일된 (시퀀스 (n, 48, 5), 정적 특성 (n, 24))"""
+    scaled = (feature_matrix(features) - scaler["mean"]) / scaler["scale"]
+    n_seq = len(SEQUENCE_COLUMNS)
+    windows = np.lib.stride_tricks.sliding_window_view(scaled[:, :n_seq], sequence_length, axis=0)
+    sequence = windows[np.asarray(rows) - (sequence_length - 1)].transpose(0, 2, 1)
+    return np.ascontiguousarray(sequence), scaled[rows, n_seq:]
+
+
+def _sequence_length(model_config):
+    """h5 model_config 의 sequence_input 길이 (없으면 SEQUENCE_LENGTH)"""
+    if model_config is None:
+        return SEQUENCE_LENGTH
+    for layer in json.loads(model_config)["config"]["layers"]:
+        if layer["class_name"] == "InputLayer" and layer["name"] == "sequence_input":
+            return int(layer["config"]["batch_shape"][1])
+    return SEQUENCE_LENGTH
+
+
+def _datasets(group):
+    """h5 그룹 아래 (마지막 이름, 데이터셋) 목록 (lstm_cell 같은 중간 그룹은 건너뜀)"""
+    for key, item in group.items():
+        if hasattr(item, "shape"):
+            yield key, item
+        else:
+            yield from _datasets(item)
+
+
+COST_MODELS = {"xgboost": XGBoostCostModel, "lstm": LSTMCostModel}
+MODEL_PATHS = {"xgboost": XGBOOST_PATH, "lstm": LSTM_PATH}
+# requirements.txt 만으로 다시 학습할 수 있는 모델 (학습/백테스트 기본값, LSTM 학습은 requirements-train.txt 필요)
+DEFAULT_TRAIN_MODELS = ["xgboost"]
+
+# 모든 요금 모델에 쓸 수 있도록 특성 표 앞에 붙이는 최대 이력 구간 수
+MAX_CONTEXT = max(model.context for model in COST_MODELS.values())
+
+
+def load_cost_model(name, version=None, compiled=False, **kwargs):
+    """이름(xgboost/lstm)으로 요금 예측 모델 로드
+
+    version 을 주면('current' 또는 버전 이름) models/ 파일 대신 모델 레지스트리(utills.registry)에서 연다.
+    compiled=True 이면 xgboost 는 NumPy 로 컴파일한 트리(utills.tree_model)로 예측한다 (작은 배치용).
+    lstm 은 precision="float16"/"int8" 로 정밀도를 줄인 가중치를 쓸 수 있다.
+    """
+    if name not in COST_MODELS:
+        raise ValueError(f"알 수 없는 모델: {name} (가능: {', '.join(COST_MODELS)})")
+    if compiled and name == "xgboost" and version is None:
+        from utills.tree_model import CompiledXGBoostModel
+
+        return CompiledXGBoostModel(**kwargs)
+    if version is not None:
+        from utills.registry import load_registered
+
+        return load_registered(name, version, **kwargs)
+    return COST_MODELS[name](**kwargs)
@@ -0,0 +1,286 @@
+from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.platypus import (BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer, Table, TableStyle,
+                                Image, PageBreak)
+
+from utills.charts import DEFAULT_PRESET, matplotlib_spec, render_charts
+from utills.docx_template import DEFAULT_HEADER_ROWS
+from utills.report import (compute_report_rollups, INTERVAL_APPENDIX_COLUMNS, iter_interval_rows,
+                           collect_load_shift_chart_specs, load_shift_summary_lines, load_shift_top_days,
+                           LOAD_SHIFT_TABLE_COLUMNS)
+from utills.load_shift import DEFAULT_MAX_SHIFT_HOURS, optimize_load_shift
+
+# reportlab 내장 한글 CID 폰트 (별도 폰트 파일 불필요)
+PDF_FONT = "HYGothic-Medium"
+pdfmetrics.registerFont(UnicodeCIDFont(PDF_FONT))
+
+# 표를 이 행 수 단위로 잘라 배치 (큰 표 하나를 페이지마다 다시 분할하는 비용을 피함)
+TABLE_CHUNK_ROWS = 40
+
+STYLES = {
+    "title": ParagraphStyle("title", fontName=PDF_FONT, fontSize=20, leading=26, alignment=TA_CENTER),
+    "h1": ParagraphStyle("h1", fontName=PDF_FONT, fontSize=15, leading=20, alignment=TA_CENTER, spaceBefore=8, spaceAfter=6),
+    "h2": ParagraphStyle("h2", fontName=PDF_FONT, fontSize=12, leading=16, spaceBefore=10, spaceAfter=4),
+    "body": ParagraphStyle("body", fontName=PDF_FONT, fontSize=9.5, leading=14),
+}
+
+TABLE_STYLE = TableStyle([
+    ("FONTNAME", (0, 0), (-1, -1), PDF_FONT),
+    ("FONTSIZE", (0, 0), (-1, -1), 8.5),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e9ecef")),
+    ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+])
+
+
+# ========== 1. 페이지 구성 ==========
+def _draw_page_border(canv, doc):
+    """DOCX 보고서와 같은 페이지 테두리 + 쪽 번호"""
+    width, height = doc.pagesize
+    canv.saveState()
+    canv.setLineWidth(1.5)
+    canv.rect(1 * cm, 1 * cm, width - 2 * cm, height - 2 * cm)
+    canv.setFont(PDF_FONT, 8)
+    canv.drawCentredString(width / 2, 1.3 * cm, f"- {canv.getPageNumber()} -")
+    canv.restoreState()
+
+
+def _make_doc_template(output):
+    doc = BaseDocTemplate(output, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm,
+                          topMargin=2 * cm, bottomMargin=2 * cm, title="전력 분석 보고서", pageCompression=1)
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="body")
+    doc.addPageTemplates([PageTemplate(id="report", frames=[frame], onPage=_draw_page_border)])
+    return doc
+
+
+def _paragraph(text, style="body"):
+    # Paragraph 는 마크업을 해석하므로 데이터/예외 메시지의 <, >, & 를 이스케이프
+    return Paragraph(escape(str(text)), STYLES[style])
+
+
+def _chart_image(spec_name, spec, chart_preset, failure_label, width=16 * cm, height=8 * cm):
+    """차트 스펙 하나 렌더링 -> Image (실패하면 안내 문단)"""
+    chart_img = render_charts({spec_name: spec}, chart_preset)[spec_name]
+    if isinstance(chart_img, Exception):
+        return _paragraph(f"※ {failure_label} 생성 실패: {str(chart_img)}")
+    return Image(BytesIO(chart_img), width=width, height=height, kind="proportional")
+
+
+def _table_chunks(header, rows, col_widths):
+    """행 iterator를 TABLE_CHUNK_ROWS 단위 표로 잘라 순서대로 반환 (각 표에 헤더 반복)"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == TABLE_CHUNK_ROWS:
+            yield Table([header] + chunk, colWidths=col_widths, style=TABLE_STYLE)
+            chunk = []
+    if chunk:
+        yield Table([header] + chunk, colWidths=col_widths, style=TABLE_STYLE)
+
+
+# ========== 2. 섹션별 flowable 생성 ==========
+def _header_section(period_label):
+    yield _paragraph("보 고 서", "title")
+    yield Spacer(1, 0.3 * cm)
+    # DOCX 템플릿과 같은 헤더 행 (자리값만 채움)
+    values = {"period_label": period_label, "created_date": datetime.now().strftime("%Y년 %m월 %d일")}
+    header_data = [[cell.format(**values) for cell in row] for row in DEFAULT_HEADER_ROWS]
+    header_style = [
+        ("FONTNAME", (0, 0), (-1, -1), PDF_FONT),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#f1f3f5")),
+    ]
+    for i, (_, _, label, value) in enumerate(header_data):
+        if label or value:
+            header_style.append(("BACKGROUND", (2, i), (2, i), colors.HexColor("#f1f3f5")))
+        else:
+            # 오른쪽 두 칸이 빈 행은 값 칸을 끝까지 병합
+            header_style.append(("SPAN", (1, i), (3, i)))
+    yield Table(header_data, colWidths=[2.5 * cm, 5.5 * cm, 2.5 * cm, 6.5 * cm], style=TableStyle(header_style))
+    yield Spacer(1, 0.5 * cm)
+    yield _paragraph("보고내용", "h1")
+
+
+def _summary_section(number, current_data, view_type, selected_month, period_label, rollups, chart_preset):
+    prefix = f"{selected_month}월" if view_type == "월별" else "기간"
+    title = f"{selected_month}월 전력 사용 분석" if view_type == "월별" else f"{period_label} 전력 사용 분석"
+    yield _paragraph(f"{number}. {title}", "h2")
+    if current_data.empty:
+        yield _paragraph("※ 선택한 기간의 데이터가 없습니다.")
+        return
+
+    total_kwh = current_data["전력사용량(kWh)"].sum()
+    total_cost = current_data["전기요금(원)"].sum()
+    avg_pf = current_data["지상역률(%)"].mean()
+    total_carbon = current_data["탄소배출량(tCO2)"].sum()
+    avg_price = total_cost / total_kwh if total_kwh > 0 else 0
+
+    yield _paragraph(f"□ {prefix} 총 전력사용량: {total_kwh:,.1f} kWh")
+    yield _paragraph(f"□ {prefix} 총 전기요금: {total_cost:,.0f} 원")
+    yield _paragraph(f"□ {prefix} 평균 단가: {avg_price:.1f} 원/kWh")
+    yield _paragraph(f"□ {prefix} 평균 역률: {avg_pf:.1f}%")
+    yield _paragraph(f"□ {prefix} 탄소배출량: {total_carbon:.2f} tCO2")
+
+    # DOCX 보고서처럼 월별 보기에서만 월별 추이 차트 (최근 6개월)
+    if view_type == "월별":
+        yield _paragraph("【월별 전력사용량 추이 그래프】")
+        chart_data = rollups["monthly"][["년월_str", "전력사용량(kWh)"]].tail(6)
+        spec = matplotlib_spec(chart_data, chart_type="line", title="월별 전력사용량 추이 (최근 6개월)",
+                               xlabel="월", ylabel="전력사용량 (kWh)", figsize=(10, 5))
+        yield _chart_image("monthly_line", spec, chart_preset, "월별 차트")
+
+
+def _hourly_section(number, daily_data, selected_date, chart_preset):
+    yield _paragraph(f"{number}. {selected_date} 시간별 분석", "h2")
+    hourly_summary = daily_data.groupby("시간").agg({
+        "전력사용량(kWh)": "sum",
+        "전기요금(원)": "sum",
+    }).reset_index()
+    peak_hour = hourly_summary.loc[hourly_summary["전력사용량(kWh)"].idxmax()]
+    yield _paragraph(f"□ 최대 사용시간: {int(peak_hour['시간'])}시 ({peak_hour['전력사용량(kWh)']:.1f} kWh)")
+    yield _paragraph(f"□ 해당 시간 전기요금: {peak_hour['전기요금(원)']:,.0f} 원")
+    spec = matplotlib_spec(hourly_summary[["시간", "전력사용량(kWh)"]], chart_type="bar", title="시간별 전력사용량",
+                           xlabel="시간", ylabel="전력사용량 (kWh)", figsize=(10, 5))
+    yield _chart_image("hourly_bar", spec, chart_preset, "시간별 차트")
+
+
+def _summary_table_section(number, current_data):
+    yield _paragraph(f"{number}. 일별 요약표", "h2")
+    if current_data.empty:
+        return
+    daily_summary = current_data.groupby("날짜").agg({
+        "전력사용량(kWh)": "sum",
+        "전기요금(원)": "sum",
+        "지상역률(%)": "mean",
+        "탄소배출량(tCO2)": "sum",
+    })
+    header = ["날짜", "전력사용량(kWh)", "전기요금(원)", "지상역률(%)", "탄소배출량(tCO2)"]
+    rows = ([str(day), f"{kwh:,.1f}", f"{cost:,.0f}", f"{pf:.1f}", f"{carbon:.3f}"]
+            for day, kwh, cost, pf, carbon in daily_summary.itertuples(name=None))
+    yield from _table_chunks(header, rows, [3.4 * cm, 3.4 * cm, 3.4 * cm, 3.0 * cm, 3.4 * cm])
+
+    yield _paragraph("【작업유형별 상세 현황표】")
+    worktype_detailed = current_data.groupby("작업유형").agg({
+        "전력사용량(kWh)": "sum",
+        "전기요금(원)": "sum",
+        "지상역률(%)": "mean",
+        "탄소배출량(tCO2)": "sum",
+    })
+    type_map = {"Light_Load": "경부하", "Medium_Load": "중간부하", "Maximum_Load": "최대부하"}
+    header = ["작업유형", "전력사용량(kWh)", "전기요금(원)", "평균역률(%)", "탄소배출량(tCO2)"]
+    rows = ([type_map.get(work_type, work_type), f"{kwh:,.1f}", f"{cost:,.0f}", f"{pf:.1f}", f"{carbon:.2f}"]
+            for work_type, kwh, cost, pf, carbon in worktype_detailed.itertuples(name=None))
+    yield from _table_chunks(header, rows, [3.4 * cm, 3.4 * cm, 3.4 * cm, 3.0 * cm, 3.4 * cm])
+
+
+def _load_shift_section(number, current_data, load_shift, chart_preset):
+    yield _paragraph(f"{number}. 부하 이전 최적화 (최대부하 → 경·중간부하)", "h2")
+    shift_result = optimize_load_shift(current_data, **load_shift)
+    for line in load_shift_summary_lines(shift_result, load_shift.get("max_shift_hours", DEFAULT_MAX_SHIFT_HOURS)):
+        yield _paragraph(line)
+    chart_images = render_charts(collect_load_shift_chart_specs(shift_result), chart_preset)
+    for name in ("load_shift_before", "load_shift_after"):
+        chart_img = chart_images[name]
+        if isinstance(chart_img, Exception):
+            yield _paragraph(f"※ 부하 이전 차트 생성 실패: {str(chart_img)}")
+            continue
+        yield Image(BytesIO(chart_img), width=15 * cm, height=7.5 * cm, kind="proportional")
+    yield _paragraph("【절감액 상위 일자】")
+    yield from _table_chunks(LOAD_SHIFT_TABLE_COLUMNS, load_shift_top_days(shift_result),
+                             [4.0 * cm, 4.0 * cm, 4.0 * cm, 4.0 * cm])
+
+
+def _recommendation_section(rollups):
+    yield PageBreak()
+    yield _paragraph("보고서 결론", "h1")
+    total_kwh = rollups["total_kwh"]
+    total_cost = rollups["total_cost"]
+    avg_pf = rollups["avg_pf"]
+
+    yield _paragraph("【종합 분석 결과】")
+    yield _paragraph(f"□ 전체 분석기간 전력사용량: {total_kwh:,.1f} kWh")
+    yield _paragraph(f"□ 전체 분석기간 전기요금: {total_cost:,.0f} 원")
+    yield _paragraph(f"□ 평균 역률: {avg_pf:.1f}%")
+    if avg_pf < 90:
+        yield _paragraph(f"□ 역률 개선 필요: 현재 {avg_pf:.1f}%로 90% 미만")
+        monthly_avg_cost = total_cost / rollups["n_months"] if rollups["n_months"] > 0 else total_cost
+        yield _paragraph(f"□ 역률 개선을 통한 예상 절약효과: 월 약 {monthly_avg_cost * 0.05:,.0f} 원")
+    else:
+        yield _paragraph(f"□ 역률 상태 양호: 현재 {avg_pf:.1f}%로 기준치 이상 유지")
+
+    yield Spacer(1, 0.4 * cm)
+    yield _paragraph("【향후 계획】")
+    yield _paragraph("□ 지속적인 전력 사용 패턴 모니터링")
+    yield _paragraph("□ 역률 개선을 통한 전기요금 절감 방안 검토")
+    yield _paragraph("□ 부하 분산을 통한 최대부하 시간대 사용량 최적화")
+    yield _paragraph("□ 월별 정기 분석을 통한 에너지 효율 관리 강화")
+    yield Spacer(1, 0.4 * cm)
+    yield _paragraph("이상으로 전력 분석 보고를 마치겠습니다.")
+
+
+def _interval_appendix_section(current_data, period_label):
+    yield PageBreak()
+    yield _paragraph(f"부록 - 15분 단위 상세 데이터 ({period_label})", "h1")
+    yield from _table_chunks(INTERVAL_APPENDIX_COLUMNS, iter_interval_rows(current_data),
+                             [2.9 * cm, 1.9 * cm, 2.0 * cm, 2.0 * cm, 1.7 * cm, 1.7 * cm, 1.7 * cm, 1.9 * cm])
+
+
+# ========== 3. PDF 보고서 생성 ==========
+def write_pdf_report(output, df, current_data, daily_data, selected_date, view_type="월별", selected_month=1,
+                     period_label="전체", progress=None, chart_preset=DEFAULT_PRESET, rollups=None,
+                     include_interval_appendix=False, load_shift=None):
+    """DOCX 보고서와 같은 구성의 PDF를 output(파일 경로 또는 버퍼)에 기록
+
+    섹션별 flowable 을 모두 모은 뒤 doc.build 로 한 번에 배치한다 (페이지 단위 스트리밍 아님).
+    reportlab 공개 API 의 build 는 전체 story 를 받으므로 메모리는 보고서 크기(특히 15분 부록 행 수)에 비례한다.
+    행이 수백~수천 개인 표는 TABLE_CHUNK_ROWS 단위 표로 잘라 두어 큰 표 하나를 반복 분할하는 비용을 피한다.
+    daily_data(selected_date 하루 데이터)가 있으면 DOCX 처럼 시간별 분석 섹션을 넣는다.
+    """
+    report_progress = progress or (lambda fraction, message: None)
+    if rollups is None:
+        rollups = compute_report_rollups(df)
+
+    numbers = iter(range(1, 10))
+    sections = [
+        (0.05, "헤더 작성", lambda: _header_section(period_label)),
+        (0.15, "요약 작성", lambda n=next(numbers): _summary_section(n, current_data, view_type, selected_month,
+                                                                   period_label, rollups, chart_preset)),
+    ]
+    if daily_data is not None and not daily_data.empty:
+        sections.append((0.3, "시간별 분석 작성",
+                         lambda n=next(numbers): _hourly_section(n, daily_data, selected_date, chart_preset)))
+    sections.append((0.45, "요약표 작성", lambda n=next(numbers): _summary_table_section(n, current_data)))
+    if load_shift is not None and not current_data.empty:
+        sections.append((0.6, "부하 이전 최적화",
+                         lambda n=next(numbers): _load_shift_section(n, current_data, load_shift, chart_preset)))
+    sections += [
+        (0.9, "결론 작성", lambda: _recommendation_section(rollups)),
+    ]
+    if include_interval_appendix and not current_data.empty:
+        sections.append((0.93, "15분 상세 부록 작성", lambda: _interval_appendix_section(current_data, period_label)))
+
+    story = []
+    for fraction, message, make_flowables in sections:
+        report_progress(fraction, message)
+        story.extend(make_flowables())
+    report_progress(0.97, "PDF 배치")
+    _make_doc_template(output).build(story)
+    report_progress(1.0, "완료")
+
+
+def build_pdf_report_bytes(*args, **kwargs):
+    """PDF 보고서를 바이트로 반환 (작업 풀/캐시 저장용)"""
+    buffer = BytesIO()
+    write_pdf_report(buffer, *args, **kwargs)
+    return buffer.getvalue()
@@ -0,0 +1,160 @@
+"""LSTM 가중치 정밀도(float32 / float16 / int8)별 정확도-속도 보고서
+
+백테스트(actual 모드)와 같은 월/주 폴드 구간을 정밀도마다 예측해
+    - 실측 대비 MAE / MAPE / RMSE (backtest.error_metrics)
+    - float32 예측 대비 차이 (최대/평균 절대 차이)
+    - 가중치 크기, 전체 구간 예측 시간(반복 중 최솟값), 초당 예측 구간 수
+를 표로 남긴다. 폴드 특성과 폴드별 모델은 백테스트 캐시(.cache/backtest)를 그대로 쓴다.
+    - actual(기본): 백테스트 actual 모드처럼 폴드 시작 전 이력으로 다시 학습한 LSTM(표준화 값 포함)을
+      정밀도마다 변환해 그 폴드를 예측 (out-of-sample, TensorFlow 필요: requirements-train.txt)
+    - insample: models/lstm.h5 (또는 레지스트리 버전) 하나로 모든 폴드를 예측. 학습 구간 안의 점수라
+      정밀도끼리의 차이를 보는 용도이며 실측 대비 지표는 일반화 성능이 아니다.
+
+사용 예:
+    python -m utills.precision_report
+    python -m utills.precision_report --mode insample --repeat 1
+    python -m utills.precision_report --mode insample --model-version current --out ./reports/precision_current
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, data_version
+from utills.features import TARGET_COLUMN
+from utills.model import LSTM_PRECISIONS, LSTMCostModel, load_cost_model
+from utills.backtest import (BACKTEST_CACHE_DIR, FOLD_FREQ, DEFAULT_MIN_TRAIN_DAYS, load_dataset, make_folds,
+                             fold_features, fit_fold_model, check_refit_models, error_metrics)
+
+# actual: 폴드별 재학습 모델 (out-of-sample), insample: 저장된 모델 하나
+PRECISION_MODES = ["actual", "insample"]
+
+
+# ========== 1. 평가 ==========
+def fold_inputs(dataset, by="month", min_train_days=DEFAULT_MIN_TRAIN_DAYS, cache_dir=BACKTEST_CACHE_DIR):
+    """폴드 목록, 폴드별 (평가 구간 표, 특성 표, 행 위치) 목록 + 실측 전기요금 배열"""
+    folds = make_folds(dataset["df"]["측정일시"], by, min_train_days)
+    if not folds:
+        raise ValueError("평가할 폴드가 없습니다 (이력이 min_train_days 보다 짧음)")
+    inputs = [fold_features(dataset, fold, "actual", {}, cache_dir)[0] for fold in folds]
+    actual = dataset["df"].set_index("측정일시")[TARGET_COLUMN]
+    frames = pd.concat([frame for frame, _, _ in inputs], ignore_index=True)
+    return folds, inputs, frames, actual.reindex(frames["측정일시"]).to_numpy()
+
+
+def fold_models(dataset, folds, mode, precision, model_version=None, threads=1, cache_dir=BACKTEST_CACHE_DIR):
+    """폴드마다 쓸 LSTM 목록 (actual: 폴드 이전 이력으로 다시 학습한 모델을 정밀도 변환, insample: 저장된 모델)"""
+    if mode == "insample":
+        return [load_cost_model("lstm", version=model_version, precision=precision)] * len(folds)
+    models = []
+    for fold in folds:
+        fitted = fit_fold_model("lstm", dataset, fold, threads, cache_dir=cache_dir)
+        models.append(fitted if precision == "float32"
+                      else LSTMCostModel(fitted.path, scaler_path=fitted.scaler_path, precision=precision))
+    return models
+
+
+def predict_folds(models, inputs):
+    return np.concatenate([model.predict(features, rows) for model, (_, features, rows) in zip(models, inputs)])
+
+
+def time_predict(models, inputs, repeat):
+    """전체 폴드 예측 시간 (반복 중 최솟값, 첫 호출은 가중치 로드/워밍업으로 제외)"""
+    predict_folds(models, inputs)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predict_folds(models, inputs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def precision_report(path=TRAIN_PATH, by="month", mode="actual", precisions=None, model_version=None, repeat=3,
+                     threads=1, cache_dir=BACKTEST_CACHE_DIR):
+    """정밀도별 정확도/속도 표 -> (보고서 표, 구간별 예측 표)"""
+    if mode not in PRECISION_MODES:
+        raise ValueError(f"알 수 없는 평가 방식: {mode} (가능: {', '.join(PRECISION_MODES)})")
+    if mode == "actual":
+        if model_version is not None:
+            raise ValueError("저장된 모델 버전은 insample 모드에서만 평가할 수 있습니다 (actual 은 폴드마다 다시 학습)")
+        check_refit_models(["lstm"])
+    precisions = list(precisions or LSTM_PRECISIONS)
+    if "float32" not in precisions:
+        # 기준 예측이 있어야 차이를 계산
+        precisions.insert(0, "float32")
+    dataset = load_dataset(path)
+    folds, inputs, frames, actual = fold_inputs(dataset, by, cache_dir=cache_dir)
+    predictions = frames.assign(전체="전체", **{"실측 전기요금(원)": actual})
+
+    rows = []
+    for precision in precisions:
+        models = fold_models(dataset, folds, mode, precision, model_version, threads, cache_dir)
+        seconds = time_predict(models, inputs, repeat)
+        predictions[precision] = predict_folds(models, inputs)
+        # 폴드별 모델은 구조가 같으므로 가중치 크기는 첫 모델 기준
+        rows.append({"정밀도": precision,
+                     "모델 버전": models[0].version if mode == "insample" else f"폴드별 재학습 {len(folds)}개",
+                     "가중치 바이트": models[0].weight_bytes(),
+                     "예측 시간(초)": seconds, "초당 구간 수": len(frames) / seconds})
+
+    metrics = error_metrics(predictions, precisions, ["전체"]).drop(columns="전체").rename(columns={"모델": "정밀도"})
+    report = pd.DataFrame(rows).merge(metrics, on="정밀도")
+    reference = predictions["float32"].to_numpy()
+    difference = [np.abs(predictions[precision].to_numpy() - reference) for precision in report["정밀도"]]
+    report["float32 대비 최대 차이"] = [np.nanmax(d) for d in difference]
+    report["float32 대비 평균 차이"] = [np.nanmean(d) for d in difference]
+    full = report.loc[report["정밀도"] == "float32"].iloc[0]
+    report["가중치 비율"] = report["가중치 바이트"] / full["가중치 바이트"]
+    report["속도 비율"] = full["예측 시간(초)"] / report["예측 시간(초)"]
+    return report, predictions.drop(columns="전체")
+
+
+# ========== 2. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LSTM 정밀도별 정확도-속도 보고서")
+    parser.add_argument("--data", default=TRAIN_PATH, help="15분 데이터 CSV")
+    parser.add_argument("--by", choices=list(FOLD_FREQ), default="month", help="폴드 단위")
+    parser.add_argument("--mode", choices=PRECISION_MODES, default="actual",
+                        help="actual: 폴드별 재학습 모델 (out-of-sample), insample: 저장된 모델")
+    parser.add_argument("--precisions", nargs="+", choices=LSTM_PRECISIONS, default=LSTM_PRECISIONS,
+                        help="비교할 정밀도")
+    parser.add_argument("--model-version",
+                        help="insample 모드에서 평가할 레지스트리 버전 ('current' 또는 버전 이름, 기본: models/lstm.h5)")
+    parser.add_argument("--repeat", type=int, default=3, help="속도 측정 반복 횟수 (최솟값 사용)")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="폴드별 재학습 스레드 수")
+    parser.add_argument("--out", default="./reports/precision", help="출력 폴더")
+    args = parser.parse_args(argv)
+
+    report, predictions = precision_report(args.data, by=args.by, mode=args.mode, precisions=args.precisions,
+                                           model_version=args.model_version, repeat=args.repeat, threads=args.threads)
+
+    os.makedirs(args.out, exist_ok=True)
+    report.to_csv(os.path.join(args.out, "precision_report.csv"), index=False, encoding="utf-8-sig")
+    predictions.to_csv(os.path.join(args.out, "predictions.csv"), index=False, encoding="utf-8-sig")
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "data": args.data,
+            "data_version": data_version(args.data),
+            "by": args.by,
+            "mode": args.mode,
+            "model_version": args.model_version,
+            "in_sample": args.mode == "insample",
+            "rows": len(predictions),
+            "repeat": args.repeat,
+        }, f, ensure_ascii=False, indent=2)
+
+    print(report.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+    if args.mode == "insample":
+        print("※ insample: 저장된 모델이 학습한 구간을 평가한 값이므로 일반화 성능이 아닙니다")
+    print(f"완료: {len(predictions):,} 구간 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""요금 예측 결과 2단 캐시 (메모리 LRU + 디스크 SQLite)
+
+키는 모델 버전 + 모델 입력 구간(XGBoost 는 해당 행, LSTM 은 시퀀스 길이만큼의 행) 특성값 해시이므로,
+재생/백테스트/보고서에서 이미 예측한 구간을 다시 요청하면 추론 없이 값을 돌려준다.
+    - 메모리: 프로세스별 OrderedDict LRU (memory_items 개 초과 시 오래 안 쓴 것부터 제거)
+    - 디스크: .cache/predictions/predictions.sqlite (여러 프로세스 공유, disk_max_bytes 초과 시 오래 안 쓴 것부터 제거)
+적중/미스/제거 수와 추론 시간은 stats() 로 확인한다.
+
+사용 예 (코드):
+    model = CachedCostModel(load_cost_model("xgboost"), PredictionCache())
+    model.predict(features, rows)
+    print(model.cache.stats())
+"""
+import os
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from utills.features import feature_matrix
+
+PREDICTION_CACHE_DIR = "./.cache/predictions"
+DEFAULT_MEMORY_ITEMS = 500_000
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+# 디스크 용량 초과 시 이 비율까지 줄임 (매번 조금씩 지우지 않도록 여유를 둠)
+DISK_TRIM_RATIO = 0.8
+# SQLite IN (...) 한 번에 묻는 키 수
+LOOKUP_CHUNK = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    key BLOB PRIMARY KEY, value REAL NOT NULL, version TEXT NOT NULL, accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_accessed ON predictions (accessed);
+"""
+
+
+# ========== 1. 키 ==========
+def row_keys(version, features, rows, window=1):
+    """행마다 (모델 버전, 입력 구간 특성값) 해시 키 (16바이트)"""
+    matrix = np.ascontiguousarray(feature_matrix(features))
+    rows = np.asarray(rows)
+    prefix = str(version).encode("utf-8") + b"|"
+    if window == 1:
+        return [hashlib.blake2b(prefix + matrix[row].tobytes(), digest_size=16).digest() for row in rows]
+    # 시퀀스 모델: 행별 해시를 먼저 구하고 구간의 행 해시를 이어 붙여 다시 해시 (구간 특성값 전체를 해시하지 않음)
+    lo = max(int(rows.min()) - window + 1, 0)
+    digests = [hashlib.blake2b(matrix[i].tobytes(), digest_size=16).digest() for i in range(lo, int(rows.max()) + 1)]
+    return [hashlib.blake2b(prefix + b"".join(digests[max(row - window + 1, 0) - lo:row + 1 - lo]),
+                            digest_size=16).digest() for row in rows]
+
+
+# ========== 2. 캐시 ==========
+class PredictionCache:
+    """메모리 LRU + 디스크 SQLite 예측 캐시 (disk_dir=None 이면 메모리만)"""
+
+    def __init__(self, memory_items=DEFAULT_MEMORY_ITEMS, disk_dir=PREDICTION_CACHE_DIR,
+                 disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+        self.memory_items = memory_items
+        self.disk_path = os.path.join(disk_dir, "predictions.sqlite") if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.memory = OrderedDict()
+        self._connection = None
+        self._pid = None
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0,
+                       "disk_evictions": 0, "predict_seconds": 0.0}
+
+    @property
+    def connection(self):
+        # 프로세스마다 따로 연결 (fork 로 넘어온 연결은 쓰지 않음)
+        if self.disk_path and self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.disk_path), exist_ok=True)
+            self._connection = sqlite3.connect(self.disk_path, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._connection
+
+    def get_many(self, keys):
+        """키 목록 -> (값 배열, 미스 여부 배열)"""
+        values = np.full(len(keys), np.nan)
+        missing = np.ones(len(keys), dtype=bool)
+        disk_positions = {}
+        for i, key in enumerate(keys):
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                values[i], missing[i] = value, False
+            else:
+                disk_positions.setdefault(key, []).append(i)
+        self.counts["memory_hits"] += int((~missing).sum())
+
+        if disk_positions and self.connection is not None:
+            found = self._disk_lookup(list(disk_positions))
+            for key, value in found.items():
+                for i in disk_positions[key]:
+                    values[i], missing[i] = value, False
+                self._remember(key, value)
+            self.counts["disk_hits"] += sum(len(disk_positions[key]) for key in found)
+        self.counts["misses"] += int(missing.sum())
+        return values, missing
+
+    def put_many(self, keys, values, version):
+        """새 예측 저장 (NaN 은 저장하지 않음)"""
+        items = [(key, float(value)) for key, value in zip(keys, values) if not np.isnan(value)]
+        for key, value in items:
+            self._remember(key, value)
+        if items and self.connection is not None:
+            now = time.time()
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                    [(key, value, str(version), now) for key, value in items])
+            self._trim_disk()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+            self.counts["memory_evictions"] += 1
+
+    def _disk_lookup(self, keys):
+        found = {}
+        now = time.time()
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.connection.execute(
+                f"SELECT key, value FROM predictions WHERE key IN ({placeholders})", chunk).fetchall())
+        if found:
+            # 최근 사용 시각 갱신 (디스크 제거 순서)
+            with self.connection:
+                self.connection.executemany("UPDATE predictions SET accessed = ? WHERE key = ?",
+                                            [(now, key) for key in found])
+        return found
+
+    def disk_bytes(self):
+        """디스크 캐시 사용 중인 바이트 (빈 페이지 제외)"""
+        if self.connection is None:
+            return 0
+        page_size, = self.connection.execute("PRAGMA page_size").fetchone()
+        page_count, = self.connection.execute("PRAGMA page_count").fetchone()
+        free_pages, = self.connection.execute("PRAGMA freelist_count").fetchone()
+        return (page_count - free_pages) * page_size
+
+    def _trim_disk(self):
+        used = self.disk_bytes()
+        if used <= self.disk_max_bytes:
+            return
+        total, = self.connection.execute("SELECT COUNT(*) FROM predictions").fetchone()
+        remove = int(total * (1 - DISK_TRIM_RATIO * self.disk_max_bytes / used)) + 1
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM predictions WHERE key IN "
+                "(SELECT key FROM predictions ORDER BY accessed LIMIT ?)", (remove,))
+        self.counts["disk_evictions"] += remove
+
+    def clear(self, disk=False):
+        self.memory.clear()
+        if disk and self.connection is not None:
+            with self.connection:
+                self.connection.execute("DELETE FROM predictions")
+
+    def stats(self):
+        """적중/미스/제거 수, 적중률, 메모리 항목 수, 디스크 사용량"""
+        lookups = self.counts["memory_hits"] + self.counts["disk_hits"] + self.counts["misses"]
+        hits = lookups - self.counts["misses"]
+        return {**self.counts, "predict_seconds": round(self.counts["predict_seconds"], 3), "lookups": lookups,
+                "hit_rate": hits / lookups if lookups else None, "memory_items": len(self.memory),
+                "disk_bytes": self.disk_bytes()}
+
+
+# ========== 3. 캐시를 거치는 요금 모델 ==========
+class CachedCostModel:
+    """요금 예측 모델과 같은 predict 인터페이스, 캐시에 없는 행만 실제 모델로 예측"""
+
+    def __init__(self, model, cache=None):
+        self.model = model
+        self.cache = cache if cache is not None else PredictionCache()
+
+    def __getattr__(self, name):
+        # name / context / version 등은 원래 모델 값 사용
+        return getattr(self.model, name)
+
+    def predict(self, features, rows=None):
+        rows = np.arange(len(features)) if rows is None else np.asarray(rows)
+        if len(rows) == 0:
+            return np.zeros(0)
+        version = self.model.version
+        keys = row_keys(version, features, rows, self.model.input_window)
+        values, missing = self.cache.get_many(keys)
+        if missing.any():
+            started = time.perf_counter()
+            predicted = self.model.predict(features, rows[missing])
+            self.cache.counts["predict_seconds"] += time.perf_counter() - started
+            values[missing] = predicted
+            self.cache.put_many([key for key, miss in zip(keys, missing) if miss], predicted, version)
+        return values
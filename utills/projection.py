@@ -0,0 +1,150 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from utills.data import data_version
+
+# 기본 예측 소스 (월 전체 구간의 모델 예측 전기요금)
+FORECAST_PATH = "./models/target_pred_feature_xgboost.csv"
+
+# 신뢰구간 z 값 (95%)
+DEFAULT_Z = 1.96
+
+# 신뢰구간 폭 계산에 쓰는 오차 자기상관 상한 (폭이 무한히 커지지 않도록)
+MAX_AUTOCORRELATION = 0.98
+
+
+# ========== 1. 예측 소스 ==========
+class PredictionFileForecaster:
+    """모델 예측 CSV(측정일시, target)에서 월 단위 예측을 한 번에 꺼내는 예측 소스
+
+    version 은 파일이 바뀌면 달라지므로, 예측을 재사용하는 쪽은 version 이 같으면 다시 묻지 않는다.
+    """
+
+    def __init__(self, path=FORECAST_PATH, value_column="target"):
+        self.path = path
+        self.value_column = value_column
+        self._frame = None
+        self._loaded_version = None
+
+    @property
+    def version(self):
+        return data_version(self.path)
+
+    def _load(self):
+        version = self.version
+        if self._frame is None or version != self._loaded_version:
+            frame = pd.read_csv(self.path, usecols=["측정일시", self.value_column], parse_dates=["측정일시"])
+            self._frame = frame.dropna().sort_values("측정일시").set_index("측정일시")[self.value_column]
+            self._loaded_version = version
+        return self._frame
+
+    def predict_month(self, month):
+        """month(Period) 전체 구간의 예측 전기요금 (측정일시 인덱스, 시간순)"""
+        series = self._load()
+        return series[(series.index >= month.start_time) & (series.index <= month.end_time)]
+
+
+# ========== 2. 월말 요금 추정 ==========
+class MonthEndProjector:
+    """실시간 구간이 들어올 때마다 월말 예상 요금과 신뢰구간 갱신 (구간당 분할상환 O(1))
+
+    월말 예상 = 누적 실적 + 남은 구간 예측 합 + 남은 구간 수 x 평균 예측 오차
+    신뢰구간 = z x 오차 표준편차 x sqrt(남은 구간 수 x (1 + ρ) / (1 - ρ))
+        (ρ: 오차의 1차 자기상관, 연속 구간 오차가 같은 방향으로 쏠리는 만큼 폭을 넓힘)
+    월 예측은 (월, 예측 소스 version) 이 바뀔 때만 한 번에 받아 누적합으로 보관한다.
+    """
+
+    def __init__(self, forecaster, z=DEFAULT_Z):
+        self.forecaster = forecaster
+        self.z = z
+        self.forecast_requests = 0
+        self._month = None
+        self._last = None
+        self._reset_month()
+
+    def _reset_month(self):
+        self._actual_sum = 0.0
+        self._actual_count = 0
+        # 예측 오차 온라인 평균/분산 (Welford)
+        self._resid_count = 0
+        self._resid_mean = 0.0
+        self._resid_m2 = 0.0
+        self._resid_prev = None
+        self._lag_pairs = 0
+        self._lag_sum = 0.0        # Σ r_t * r_(t-1)
+        self._times = np.array([], dtype="datetime64[ns]")
+        self._values = np.array([])
+        self._suffix = np.zeros(1)
+        self._version = None
+        self._pos = 0
+
+    def _refresh_forecast(self, month):
+        version = self.forecaster.version
+        if month == self._month and version == self._version:
+            return
+        forecast = self.forecaster.predict_month(month)
+        self.forecast_requests += 1
+        self._times = forecast.index.to_numpy(dtype="datetime64[ns]")
+        self._values = forecast.to_numpy(dtype=float)
+        # suffix[i] = i번째 이후 예측 합 -> 남은 예측 합 조회가 O(1)
+        self._suffix = np.r_[np.cumsum(self._values[::-1])[::-1], 0.0]
+        self._version = version
+        self._pos = int(np.searchsorted(self._times, np.datetime64(self._last, "ns"), side="right")) \
+            if month == self._month and self._actual_count else 0
+
+    def update(self, timestamp, actual_cost):
+        """실측 구간 1건 반영 후 추정 결과 반환"""
+        timestamp = pd.Timestamp(timestamp)
+        month = timestamp.to_period("M")
+        if month != self._month:
+            self._reset_month()
+        self._refresh_forecast(month)
+        self._month = month
+        self._last = timestamp
+
+        actual_cost = float(actual_cost)
+        self._actual_sum += actual_cost
+        self._actual_count += 1
+
+        # 예측 포인터를 현재 시각까지 전진 (월 전체에 걸쳐 총 이동량이 구간 수라 분할상환 O(1))
+        now = np.datetime64(timestamp, "ns")
+        while self._pos < len(self._times) and self._times[self._pos] < now:
+            self._pos += 1
+        if self._pos < len(self._times) and self._times[self._pos] == now:
+            self._add_residual(actual_cost - self._values[self._pos])
+            self._pos += 1
+        return self.state()
+
+    def _add_residual(self, residual):
+        if self._resid_prev is not None:
+            self._lag_pairs += 1
+            self._lag_sum += residual * self._resid_prev
+        self._resid_prev = residual
+        self._resid_count += 1
+        delta = residual - self._resid_mean
+        self._resid_mean += delta / self._resid_count
+        self._resid_m2 += delta * (residual - self._resid_mean)
+
+    def state(self):
+        remaining = len(self._times) - self._pos
+        remaining_forecast = self._suffix[self._pos]
+        bias = self._resid_mean if self._resid_count else 0.0
+        variance = self._resid_m2 / (self._resid_count - 1) if self._resid_count > 1 else 0.0
+        rho = 0.0
+        if self._lag_pairs > 1 and variance > 0:
+            rho = min(max((self._lag_sum / self._lag_pairs - bias * bias) / variance, 0.0), MAX_AUTOCORRELATION)
+        projected = self._actual_sum + remaining_forecast + bias * remaining
+        half_width = self.z * math.sqrt(variance * remaining * (1 + rho) / (1 - rho))
+        return {
+            "month": self._month,
+            "actual": self._actual_sum,
+            "remaining_intervals": remaining,
+            "remaining_forecast": remaining_forecast,
+            "bias": bias,
+            "autocorrelation": rho,
+            "projected": projected,
+            "lower": projected - half_width,
+            "upper": projected + half_width,
+        }
@@ -0,0 +1,417 @@
+"""로컬 모델 레지스트리 (버전 기록, 지연 로드, 메모리 매핑, 즉시 롤백)
+
+models/registry/<모델>/<버전>/ 에 산출물을 서빙용 형식으로 저장하고 registry.json 에 현재 버전을 기록한다.
+    - xgboost: model.ubj (xgboost 버전에 무관한 UBJSON, 첫 예측 때 로드)
+    - lstm: weights.f32 (가중치 전체를 한 파일에 이어 붙임) + scaler.json, 읽기 전용 np.memmap 으로 열어
+      여러 대시보드 프로세스가 같은 페이지 캐시를 공유한다.
+      quantize 로 float16/int8 가중치(weights-<정밀도>.bin)를 같은 버전에 추가해 정밀도를 골라 서빙할 수 있다
+각 버전의 meta.json 에는 특성 스키마, 지표, 학습 설정, 원본 파일 sha1 을 남긴다.
+promote 는 현재 버전 포인터만 바꾸고 이전 버전을 이력에 쌓으므로 rollback 은 포인터를 되돌리는 것으로 끝난다.
+
+사용 예:
+    python -m utills.registry register xgboost ./models/xgboost.pkl --promote
+    python -m utills.registry register-run ./models/versions/20241201-120000-1a2b3c4d --promote
+    python -m utills.registry list
+    python -m utills.registry promote lstm 20241201-120000-5e6f7a8b
+    python -m utills.registry rollback xgboost
+    python -m utills.registry quantize current --precisions float16 int8
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from utills.features import FEATURE_COLUMNS, feature_matrix
+from utills.model import (COST_MODELS, LSTM_PRECISIONS, XGBoostCostModel, LSTMCostModel, load_cost_model,
+                          quantize_weights, scaler_arrays, scaler_dict)
+from utills.train import ARTIFACT_FILES, file_digest
+
+REGISTRY_DIR = "./models/registry"
+# 가중치 배열 시작 위치 정렬 (바이트)
+WEIGHT_ALIGNMENT = 64
+
+# 프로세스 안에서 이미 연 모델 (모델, 버전) -> 모델
+_LOADED = {}
+
+
+# ========== 1. 서빙용 모델 (지연 로드) ==========
+class RegistryXGBoostModel(XGBoostCostModel):
+    """레지스트리 XGBoost 버전 (부스터는 첫 예측 때 model.ubj 에서 로드)"""
+
+    def __init__(self, version_dir, meta):
+        self.path = version_dir
+        self.meta = meta
+        self._booster = None
+
+    @property
+    def version(self):
+        return self.meta["version"]
+
+    @property
+    def model(self):
+        if self._booster is None:
+            import xgboost as xgb
+
+            booster = xgb.Booster()
+            booster.load_model(os.path.join(self.path, "model.ubj"))
+            self._booster = booster
+        return self._booster
+
+    def predict(self, features, rows=None):
+        return self.model.inplace_predict(feature_matrix(features, rows)).astype(float)
+
+
+class RegistryLSTMModel(LSTMCostModel):
+    """레지스트리 LSTM 버전 (가중치는 weights.f32 / weights-<정밀도>.bin 읽기 전용 메모리 매핑, 첫 예측 때 열림)"""
+
+    def __init__(self, version_dir, meta, precision="float32"):
+        if precision != "float32" and precision not in meta.get("precisions", {}):
+            raise KeyError(f"lstm/{meta['version']}: {precision} 가중치가 없습니다 (quantize 필요)")
+        self.path = version_dir
+        self.meta = meta
+        self.precision = precision
+        self.sequence_length = meta["sequence_length"]
+        self.context = self.sequence_length - 1
+        self._weights = None
+        self._weight_scales = None
+        self._scaler = None
+
+    @property
+    def version(self):
+        version = self.meta["version"]
+        return version if self.precision == "float32" else f"{version}-{self.precision}"
+
+    @property
+    def weights(self):
+        if self._weights is None:
+            if self.precision == "float32":
+                mapped = np.memmap(os.path.join(self.path, "weights.f32"), dtype=np.float32, mode="r")
+                self._weights = {
+                    key: mapped[spec["offset"]:spec["offset"] + int(np.prod(spec["shape"]))].reshape(spec["shape"])
+                    for key, spec in self.meta["tensors"].items()
+                }
+            else:
+                # 자료형이 섞인 파일이므로 바이트로 매핑한 뒤 텐서마다 자료형을 입힘 (offset 은 바이트 단위)
+                variant = self.meta["precisions"][self.precision]
+                mapped = np.memmap(os.path.join(self.path, variant["file"]), dtype=np.uint8, mode="r")
+                self._weights = {}
+                for key, spec in variant["tensors"].items():
+                    dtype = np.dtype(spec["dtype"])
+                    size = int(np.prod(spec["shape"])) * dtype.itemsize
+                    self._weights[key] = mapped[spec["offset"]:spec["offset"] + size].view(dtype).reshape(spec["shape"])
+        return self._weights
+
+    @property
+    def weight_scales(self):
+        if self._weight_scales is None:
+            tensors = self.meta.get("precisions", {}).get(self.precision, {}).get("tensors", {})
+            self._weight_scales = {key: np.array(spec["scale"], dtype=np.float32)
+                                   for key, spec in tensors.items() if "scale" in spec}
+        return self._weight_scales
+
+    @property
+    def scaler(self):
+        if self._scaler is None:
+            with open(os.path.join(self.path, "scaler.json"), encoding="utf-8") as f:
+                self._scaler = scaler_arrays(json.load(f))
+        return self._scaler
+
+
+REGISTRY_MODELS = {"xgboost": RegistryXGBoostModel, "lstm": RegistryLSTMModel}
+
+
+# ========== 2. 산출물 변환 ==========
+def export_xgboost(path, version_dir):
+    """xgboost.pkl -> model.ubj, 추가 메타 정보"""
+    model = load_cost_model("xgboost", path=path).model
+    model.get_booster().save_model(os.path.join(version_dir, "model.ubj"))
+    return {"params": {key: value for key, value in model.get_params().items() if value is not None},
+            "trees": model.get_booster().num_boosted_rounds()}
+
+
+def export_lstm(path, version_dir, scaler_path=None):
+    """lstm.h5 (+ 표준화 JSON) -> weights.f32 + scaler.json, 추가 메타 정보"""
+    model = load_cost_model("lstm", path=path, scaler_path=scaler_path)
+    tensors, offset = {}, 0
+    align = WEIGHT_ALIGNMENT // np.dtype(np.float32).itemsize
+    with open(os.path.join(version_dir, "weights.f32"), "wb") as f:
+        for key, array in sorted(model.weights.items()):
+            padding = -offset % align
+            f.write(np.zeros(padding, dtype=np.float32).tobytes())
+            offset += padding
+            f.write(np.ascontiguousarray(array, dtype=np.float32).tobytes())
+            # offset 은 float32 원소 단위
+            tensors[key] = {"offset": offset, "shape": list(array.shape)}
+            offset += array.size
+    with open(os.path.join(version_dir, "scaler.json"), "w", encoding="utf-8") as f:
+        json.dump(scaler_dict(model.scaler), f, ensure_ascii=False, indent=2)
+    return {"sequence_length": model.sequence_length, "tensors": tensors}
+
+
+def export_lstm_precision(weights, version_dir, precision):
+    """float32 LSTM 가중치 dict -> weights-<정밀도>.bin, 메타 정보 (텐서별 바이트 offset, 자료형, int8 스케일)"""
+    quantized, scales = quantize_weights(weights, precision)
+    file_name = f"weights-{precision}.bin"
+    path = os.path.join(version_dir, file_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    tensors, offset = {}, 0
+    with open(tmp_path, "wb") as f:
+        for key, array in sorted(quantized.items()):
+            padding = -offset % WEIGHT_ALIGNMENT
+            f.write(b"\0" * padding)
+            offset += padding
+            f.write(np.ascontiguousarray(array).tobytes())
+            tensors[key] = {"offset": offset, "shape": list(array.shape), "dtype": array.dtype.name}
+            if key in scales:
+                tensors[key]["scale"] = scales[key].astype(float).tolist()
+            offset += array.nbytes
+    os.replace(tmp_path, path)
+    return {"file": file_name, "tensors": tensors, "bytes": offset}
+
+
+# ========== 3. 레지스트리 ==========
+class ModelRegistry:
+    """models/registry 폴더 (registry.json: 모델별 현재 버전 + 이전 버전 이력)"""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "registry.json")
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _check_name(self, name):
+        if name not in COST_MODELS:
+            raise ValueError(f"알 수 없는 모델: {name} (가능: {', '.join(COST_MODELS)})")
+
+    def meta(self, name, version):
+        path = os.path.join(self.root, name, version, "meta.json")
+        if not os.path.exists(path):
+            raise KeyError(f"레지스트리에 없는 버전: {name}/{version}")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def versions(self, name):
+        """등록된 버전 메타 목록 (등록 순)"""
+        folder = os.path.join(self.root, name)
+        if not os.path.isdir(folder):
+            return []
+        metas = [self.meta(name, version) for version in os.listdir(folder)
+                 if os.path.exists(os.path.join(folder, version, "meta.json"))]
+        return sorted(metas, key=lambda meta: meta["created_at"])
+
+    def current(self, name):
+        return self._read_index().get(name, {}).get("current")
+
+    def resolve(self, name, version="current"):
+        """'current' 또는 버전 이름 -> 버전 이름"""
+        if version == "current":
+            version = self.current(name)
+            if version is None:
+                raise KeyError(f"레지스트리에 {name} 현재 버전이 없습니다 (register --promote 필요)")
+        return version
+
+    def register(self, name, path, scaler_path=None, metrics=None, params=None, source=None):
+        """산출물 파일 등록 -> 버전 이름 (같은 파일을 다시 등록하면 기존 버전 반환)"""
+        self._check_name(name)
+        digest = file_digest(path)
+        for meta in self.versions(name):
+            if meta["sha1"] == digest:
+                return meta["version"]
+
+        version = f"{datetime.now():%Y%m%d-%H%M%S}-{digest[:8]}"
+        version_dir = os.path.join(self.root, name, version)
+        tmp_dir = f"{version_dir}.{os.getpid()}.tmp"
+        os.makedirs(tmp_dir)
+        try:
+            extra = export_xgboost(path, tmp_dir) if name == "xgboost" else export_lstm(path, tmp_dir, scaler_path)
+            meta = {
+                "name": name,
+                "version": version,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "source": source or path,
+                "sha1": digest,
+                "features": FEATURE_COLUMNS,
+                "metrics": metrics,
+                **extra,
+                "params": {**extra.get("params", {}), **(params or {})},
+            }
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+        except BaseException:
+            # 변환 실패 시 반쯤 만든 임시 폴더를 남기지 않음
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        # 폴더 통째로 교체해 반쯤 써진 버전이 보이지 않게 함
+        os.replace(tmp_dir, version_dir)
+        return version
+
+    def promote(self, name, version):
+        """현재 버전 변경 (이전 현재 버전은 이력에 쌓음)"""
+        self.meta(name, version)
+        index = self._read_index()
+        entry = index.setdefault(name, {"current": None, "history": []})
+        if entry["current"] == version:
+            return
+        if entry["current"] is not None:
+            entry["history"].append(entry["current"])
+        entry["current"] = version
+        entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self._write_index(index)
+
+    def rollback(self, name):
+        """직전 현재 버전으로 되돌림 -> 되돌린 버전"""
+        index = self._read_index()
+        entry = index.get(name)
+        if not entry or not entry["history"]:
+            raise KeyError(f"{name}: 되돌릴 이전 버전이 없습니다")
+        entry["current"] = entry["history"].pop()
+        entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self._write_index(index)
+        return entry["current"]
+
+    def load(self, name, version="current", precision="float32"):
+        """버전 모델 (프로세스 안에서 재사용, 실제 가중치/트리는 첫 예측 때 읽음)"""
+        self._check_name(name)
+        if precision != "float32" and name != "lstm":
+            raise ValueError(f"{name}: 정밀도를 고를 수 있는 모델은 lstm 뿐입니다")
+        version = self.resolve(name, version)
+        key = (os.path.abspath(self.root), name, version, precision)
+        if key not in _LOADED:
+            meta = self.meta(name, version)
+            if meta["features"] != FEATURE_COLUMNS:
+                raise ValueError(f"{name}/{version}: 특성 스키마가 현재 코드와 다릅니다")
+            version_dir = os.path.join(self.root, name, version)
+            _LOADED[key] = (RegistryLSTMModel(version_dir, meta, precision) if name == "lstm"
+                            else REGISTRY_MODELS[name](version_dir, meta))
+        return _LOADED[key]
+
+    def quantize(self, version, precision):
+        """LSTM 버전에 정밀도를 줄인 가중치 추가 (이미 있으면 그대로) -> 가중치 바이트 수"""
+        version = self.resolve("lstm", version)
+        meta = self.meta("lstm", version)
+        if precision == "float32":
+            return sum(int(np.prod(spec["shape"])) * 4 for spec in meta["tensors"].values())
+        if precision in meta.get("precisions", {}):
+            return meta["precisions"][precision]["bytes"]
+        version_dir = os.path.join(self.root, "lstm", version)
+        variant = export_lstm_precision(RegistryLSTMModel(version_dir, meta).weights, version_dir, precision)
+        meta.setdefault("precisions", {})[precision] = variant
+        meta_path = os.path.join(version_dir, "meta.json")
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
+        return variant["bytes"]
+
+    def register_run(self, version_dir, promote=False):
+        """utills.train / utills.retrain 버전 폴더의 산출물을 지표와 함께 등록 -> {모델: 버전}"""
+        with open(os.path.join(version_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        registered = {}
+        for name in manifest["models"]:
+            files = ARTIFACT_FILES[name]
+            metrics = manifest["metrics"].get(name)
+            if manifest.get("kind") == "incremental":
+                # 이어 학습에서 반영되지 않은 후보는 등록하지 않음
+                if name not in manifest["promoted"]:
+                    continue
+                metrics = metrics["candidate"]
+            scaler_path = os.path.join(version_dir, files[1]) if len(files) > 1 else None
+            registered[name] = self.register(
+                name, os.path.join(version_dir, files[0]), scaler_path=scaler_path, metrics=metrics,
+                params=manifest["params"].get(name), source=version_dir)
+            if promote:
+                self.promote(name, registered[name])
+        return registered
+
+
+def load_registered(name, version="current", root=REGISTRY_DIR, precision="float32"):
+    return ModelRegistry(root).load(name, version, precision)
+
+
+# ========== 4. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 모델 레지스트리")
+    parser.add_argument("--root", default=REGISTRY_DIR, help="레지스트리 폴더")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    register = commands.add_parser("register", help="산출물 파일 등록")
+    register.add_argument("model", choices=list(COST_MODELS))
+    register.add_argument("path", help="xgboost.pkl 또는 lstm.h5")
+    register.add_argument("--scaler", help="LSTM 표준화 JSON (기본: <h5 이름>_scaler.json, 학습 때 저장한 파일이 있어야 함)")
+    register.add_argument("--promote", action="store_true", help="등록 후 현재 버전으로 지정")
+    register.add_argument("--precisions", nargs="+", choices=LSTM_PRECISIONS[1:], default=[],
+                          help="lstm: 함께 만들 정밀도 축소 가중치")
+
+    register_run = commands.add_parser("register-run", help="학습 버전 폴더(models/versions/...) 등록")
+    register_run.add_argument("version_dir")
+    register_run.add_argument("--promote", action="store_true", help="등록 후 현재 버전으로 지정")
+
+    listing = commands.add_parser("list", help="버전 목록")
+    listing.add_argument("model", nargs="?", choices=list(COST_MODELS))
+
+    promote = commands.add_parser("promote", help="현재 버전 지정")
+    promote.add_argument("model", choices=list(COST_MODELS))
+    promote.add_argument("version")
+
+    rollback = commands.add_parser("rollback", help="직전 버전으로 되돌림")
+    rollback.add_argument("model", choices=list(COST_MODELS))
+
+    quantize = commands.add_parser("quantize", help="lstm 버전에 float16/int8 가중치 추가")
+    quantize.add_argument("version", nargs="?", default="current")
+    quantize.add_argument("--precisions", nargs="+", choices=LSTM_PRECISIONS[1:], default=LSTM_PRECISIONS[1:])
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == "register":
+        if args.precisions and args.model != "lstm":
+            parser.error("--precisions 는 lstm 에만 쓸 수 있습니다")
+        version = registry.register(args.model, args.path, scaler_path=args.scaler)
+        for precision in args.precisions:
+            registry.quantize(version, precision)
+        if args.promote:
+            registry.promote(args.model, version)
+        print(f"{args.model}: {version}" + (" (현재 버전)" if args.promote else ""))
+    elif args.command == "register-run":
+        for name, version in registry.register_run(args.version_dir, promote=args.promote).items():
+            print(f"{name}: {version}" + (" (현재 버전)" if args.promote else ""))
+    elif args.command == "list":
+        for name in [args.model] if args.model else list(COST_MODELS):
+            current = registry.current(name)
+            for meta in registry.versions(name):
+                marker = "*" if meta["version"] == current else " "
+                mae = (meta.get("metrics") or {}).get("MAE")
+                score = f"MAE {mae:,.1f}  " if mae is not None else ""
+                precisions = "".join(f" +{precision}" for precision in meta.get("precisions", {}))
+                print(f"{marker} {name:<8} {meta['version']}  {score}{meta['source']}{precisions}")
+    elif args.command == "promote":
+        registry.promote(args.model, args.version)
+        print(f"{args.model}: 현재 버전 {args.version}")
+    elif args.command == "rollback":
+        print(f"{args.model}: 현재 버전 {registry.rollback(args.model)} (롤백)")
+    else:
+        full = registry.quantize(args.version, "float32")
+        for precision in args.precisions:
+            size = registry.quantize(args.version, precision)
+            print(f"lstm/{registry.resolve('lstm', args.version)} {precision}: {size:,} 바이트 "
+                  f"(float32 {full:,} 바이트의 {size / full:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+from io import BytesIO
+
+from docx.shared import Inches
+
+from utills.data import WORKTYPES, WORKTYPE_NAMES
+from utills.tariff import lagging_pf_adjustment, leading_pf_adjustment
+from utills.docx_template import new_report_document, add_bulk_table
+from utills.load_shift import DEFAULT_MAX_SHIFT_HOURS, optimize_load_shift, hourly_stack
+from utills.charts import (DEFAULT_PRESET, create_dual_axis_chart, create_hourly_stack_chart,
+                           create_concentric_donut_chart, matplotlib_spec, plotly_spec, render_charts)
+
+
+# 15분 상세 부록 표 컬럼
+INTERVAL_APPENDIX_COLUMNS = ['측정일시', '전력사용량(kWh)', '지상무효전력량(kVarh)', '진상무효전력량(kVarh)',
+                             '지상역률(%)', '진상역률(%)', '작업유형', '전기요금(원)']
+
+
+def iter_interval_rows(data):
+    """15분 단위 원자료를 표 행 문자열로 변환 (한 번에 한 행씩)"""
+    columns = data[['측정일시', '전력사용량(kWh)', '지상무효전력량(kVarh)', '진상무효전력량(kVarh)',
+                    '지상역률(%)', '진상역률(%)', '작업유형', '전기요금(원)']]
+    for ts, kwh, lag_kvarh, lead_kvarh, lag_pf, lead_pf, work_type, cost in columns.itertuples(index=False, name=None):
+        yield (ts.strftime("%Y-%m-%d %H:%M"), f"{kwh:,.2f}", f"{lag_kvarh:,.2f}", f"{lead_kvarh:,.2f}",
+               f"{lag_pf:.1f}", f"{lead_pf:.1f}", WORKTYPE_NAMES.get(work_type, work_type), f"{cost:,.0f}")
+
+
+# ========== 1. 보고서 차트 구성 ==========
+def compute_report_rollups(df):
+    """전체 데이터 기준 집계 (여러 보고서가 공유할 수 있도록 분리)"""
+    monthly_summary = df.groupby('년월').agg({
+        '전력사용량(kWh)': 'sum',
+        '전기요금(원)': 'sum'
+    }).reset_index()
+    monthly_summary['년월_str'] = monthly_summary['년월'].astype(str)
+    return {
+        "monthly": monthly_summary,
+        "total_kwh": df["전력사용량(kWh)"].sum(),
+        "total_cost": df["전기요금(원)"].sum(),
+        "avg_pf": df["지상역률(%)"].mean(),
+        "n_months": df['년월'].nunique(),
+    }
+
+
+def collect_report_chart_specs(df, current_data, daily_data, view_type="월별", rollups=None):
+    """보고서에 들어갈 차트 스펙을 한 번에 수집 (병렬 렌더링용)"""
+    specs = {}
+    
+    if view_type == "월별" and not current_data.empty:
+        monthly_summary = (rollups or compute_report_rollups(df))["monthly"]
+        chart_data = monthly_summary[['년월_str', '전력사용량(kWh)']].tail(6)
+        specs["monthly_line"] = matplotlib_spec(
+            chart_data,
+            chart_type="line",
+            title="월별 전력사용량 추이 (최근 6개월)",
+            xlabel="월",
+            ylabel="전력사용량 (kWh)",
+            figsize=(10, 5)
+        )
+        specs["monthly_dual"] = plotly_spec(
+            create_dual_axis_chart(monthly_summary, "년월_str", "전력사용량(kWh)", "전기요금(원)",
+                                   "월별 전력사용량 vs 전기요금", "월", "전력사용량(kWh)", "전기요금(원)"),
+            figsize=(10, 5)
+        )
+    
+    if daily_data is not None and not daily_data.empty:
+        hourly_data = daily_data.groupby('시간').agg({
+            '전력사용량(kWh)': 'sum',
+            '전기요금(원)': 'sum'
+        }).reset_index()
+        hourly_fig = create_dual_axis_chart(hourly_data, "시간", "전력사용량(kWh)", "전기요금(원)",
+                                            "시간별 전력사용량 vs 전기요금", "시간", "전력사용량(kWh)", "전기요금(원)",
+                                            add_time_zones=True)
+        hourly_fig.update_xaxes(tickmode="linear", tick0=0, dtick=1)
+        specs["hourly_dual"] = plotly_spec(hourly_fig, figsize=(10, 5))
+    
+    analysis_data = daily_data if (daily_data is not None and not daily_data.empty) else df
+    specs["worktype_stack"] = plotly_spec(create_hourly_stack_chart(analysis_data), figsize=(12, 6))
+    specs["worktype_donut"] = plotly_spec(create_concentric_donut_chart(analysis_data), figsize=(8, 6))
+    return specs
+
+
+def collect_fallback_chart_specs(analysis_data):
+    """Plotly 정적 내보내기 실패 시 사용할 matplotlib 차트 스펙"""
+    hourly_worktype = analysis_data.groupby(['시간', '작업유형'])['전기요금(원)'].sum().unstack(fill_value=0)
+    stack_data = hourly_worktype.reindex(columns=[w for w in WORKTYPES if w in hourly_worktype.columns])
+    stack_data = stack_data.rename(columns=WORKTYPE_NAMES).reset_index()
+    
+    worktype_stats = analysis_data.groupby('작업유형')['전력사용량(kWh)'].sum().reset_index()
+    worktype_stats['작업유형_한글'] = worktype_stats['작업유형'].map(WORKTYPE_NAMES)
+    pie_data = worktype_stats[['작업유형_한글', '전력사용량(kWh)']]
+    
+    return {
+        "worktype_stack": matplotlib_spec(stack_data, chart_type="stack", title="시간대별 작업유형별 전기요금 현황",
+                                          xlabel="시간", ylabel="전기요금 (원)", figsize=(12, 6)),
+        "worktype_donut": matplotlib_spec(pie_data, chart_type="pie", title="작업유형별 전력사용량 분포",
+                                          figsize=(8, 6)),
+    }
+
+
+def collect_load_shift_chart_specs(shift_result):
+    """부하 이전 전/후 시간대별 스택 차트 스펙"""
+    intervals = shift_result["intervals"]
+    specs = {}
+    for name, column, title in (("load_shift_before", "이전 전 사용량(kWh)", "부하 이전 전 시간대별 사용량"),
+                                ("load_shift_after", "이전 후 사용량(kWh)", "부하 이전 후 시간대별 사용량")):
+        data = hourly_stack(intervals, column).rename(columns=WORKTYPE_NAMES).reset_index()
+        specs[name] = matplotlib_spec(data, chart_type="stack", title=title, xlabel="시간",
+                                      ylabel="전력사용량 (kWh)", figsize=(10, 5))
+    return specs
+
+
+def load_shift_summary_lines(shift_result, max_shift_hours):
+    """부하 이전 최적화 요약 문장 (DOCX/PDF 공용)"""
+    summary = shift_result["summary"]
+    return [
+        f"□ 분석 일수: {summary['days']}일 (최대부하 사용량 일부를 앞뒤 {max_shift_hours}시간 이내 저단가 시간대로 이동)",
+        f"□ 이전 전력량: {summary['shifted_kwh']:,.1f} kWh",
+        f"□ 전력량요금: {summary['before_cost']:,.0f} 원 → {summary['after_cost']:,.0f} 원",
+        f"□ 예상 절감액: {summary['savings']:,.0f} 원 ({summary['savings_pct']:.1f}%)",
+    ]
+
+
+LOAD_SHIFT_TABLE_COLUMNS = ['날짜', '사용량(kWh)', '이전량(kWh)', '절감액(원)']
+
+
+def load_shift_top_days(shift_result, n=10):
+    """절감액 상위 n일 표 행"""
+    daily = shift_result["daily"].sort_values("절감액(원)", ascending=False).head(n)
+    return [(str(day), f"{row['이전 전 사용량(kWh)']:,.1f}", f"{row['이전량(kWh)']:,.1f}", f"{row['절감액(원)']:,.0f}")
+            for day, row in daily.iterrows()]
+
+
+def add_chart(doc, chart_images, name, caption, width, failure_label):
+    """렌더링된 차트를 문서에 추가 (실패 시 안내 문구)"""
+    chart_img = chart_images.get(name)
+    if chart_img is None:
+        return
+    if isinstance(chart_img, Exception):
+        reason = next((line for line in str(chart_img).splitlines() if line.strip()), type(chart_img).__name__)
+        doc.add_paragraph(f"※ {failure_label} 생성 실패: {reason}")
+        return
+    doc.add_paragraph(caption)
+    doc.add_picture(BytesIO(chart_img), width=width)
+    doc.add_paragraph()
+
+
+# ========== 2. DOCX 보고서 생성 함수 ==========
+def create_comprehensive_docx_report_with_charts(df, current_data, daily_data, selected_date, view_type="월별", selected_month=1, period_label="전체", progress=None, chart_preset=DEFAULT_PRESET, rollups=None,
+                                                include_interval_appendix=False, load_shift=None):
+    """현재 화면 설정에 따른 동적 보고서 생성
+
+    progress: (진행률 0~1, 메시지)를 받는 콜백. 백그라운드 작업의 진행 상황 표시용
+    chart_preset: 차트 해상도 프리셋 (utills.charts.CHART_PRESETS)
+    rollups: compute_report_rollups(df) 결과. 배치 생성 시 미리 계산해 공유
+    include_interval_appendix: 현재 기간의 15분 단위 원자료를 부록 표로 첨부
+    load_shift: optimize_load_shift 옵션(dict). 주면 현재 기간의 부하 이전 최적화 절을 추가
+    """
+    report_progress = progress or (lambda fraction, message: None)
+    if rollups is None:
+        rollups = compute_report_rollups(df)
+    
+    # 보고서의 모든 차트를 렌더러 풀에서 병렬로 먼저 생성
+    report_progress(0.0, "차트 렌더링")
+    chart_specs = collect_report_chart_specs(df, current_data, daily_data, view_type, rollups)
+    shift_result = None
+    if load_shift is not None and not current_data.empty:
+        shift_result = optimize_load_shift(current_data, **load_shift)
+        chart_specs.update(collect_load_shift_chart_specs(shift_result))
+    chart_images = render_charts(chart_specs, chart_preset)
+    
+    report_progress(0.4, "문서 초기화")
+    # 테두리/헤더 표/본문 제목이 들어 있는 템플릿을 복제해 헤더 값만 채움
+    doc = new_report_document(period_label)
+    
+    # === 1. 기간별 분석 (화면 설정에 따라 동적) ===
+    report_progress(0.45, "기간별 분석 작성")
+    if view_type == "월별":
+        doc.add_heading(f'1. {selected_month}월 전력 사용 분석', level=2)
+        
+        if not current_data.empty:
+            total_kwh = current_data["전력사용량(kWh)"].sum()
+            total_cost = current_data["전기요금(원)"].sum()
+            avg_pf = current_data["지상역률(%)"].mean()
+            total_carbon = current_data["탄소배출량(tCO2)"].sum()
+            avg_price = total_cost / total_kwh if total_kwh > 0 else 0
+            
+            doc.add_paragraph(f"□ {selected_month}월 총 전력사용량: {total_kwh:,.1f} kWh")
+            doc.add_paragraph(f"□ {selected_month}월 총 전기요금: {total_cost:,.0f} 원")
+            doc.add_paragraph(f"□ {selected_month}월 평균 단가: {avg_price:.1f} 원/kWh")
+            doc.add_paragraph(f"□ {selected_month}월 평균 역률: {avg_pf:.1f}%")
+            doc.add_paragraph(f"□ {selected_month}월 탄소배출량: {total_carbon:.2f} tCO2")
+            
+            # 월별 트렌드 차트
+            doc.add_paragraph()
+            add_chart(doc, chart_images, "monthly_line", "【월별 전력사용량 추이 그래프】", Inches(6), "월별 차트")
+            add_chart(doc, chart_images, "monthly_dual", "【월별 전력사용량 vs 전기요금 그래프】", Inches(6), "월별 비교 차트")
+    
+    else:  # 일별 분석
+        doc.add_heading(f'1. {period_label} 전력 사용 분석', level=2)
+        
+        if not current_data.empty:
+            total_kwh = current_data["전력사용량(kWh)"].sum()
+            total_cost = current_data["전기요금(원)"].sum()
+            avg_pf = current_data["지상역률(%)"].mean()
+            total_carbon = current_data["탄소배출량(tCO2)"].sum()
+            avg_price = total_cost / total_kwh if total_kwh > 0 else 0
+            
+            doc.add_paragraph(f"□ 기간 총 전력사용량: {total_kwh:,.1f} kWh")
+            doc.add_paragraph(f"□ 기간 총 전기요금: {total_cost:,.0f} 원")
+            doc.add_paragraph(f"□ 기간 평균 단가: {avg_price:.1f} 원/kWh")
+            doc.add_paragraph(f"□ 기간 평균 역률: {avg_pf:.1f}%")
+            doc.add_paragraph(f"□ 기간 탄소배출량: {total_carbon:.2f} tCO2")
+    
+    # === 2. 특정일 시간별 분석 ===
+    report_progress(0.55, "시간별 분석 작성")
+    if daily_data is not None and not daily_data.empty:
+        doc.add_heading(f'2. {selected_date} 시간별 분석', level=2)
+        
+        # 최대 사용 시간 정보
+        hourly_summary = daily_data.groupby('시간').agg({
+            '전력사용량(kWh)': 'sum',
+            '전기요금(원)': 'sum'
+        }).reset_index()
+        peak_hour = hourly_summary.loc[hourly_summary['전력사용량(kWh)'].idxmax()]
+        doc.add_paragraph(f"□ 최대 사용시간: {int(peak_hour['시간'])}시 ({peak_hour['전력사용량(kWh)']:.1f} kWh)")
+        doc.add_paragraph(f"□ 해당 시간 전기요금: {peak_hour['전기요금(원)']:,.0f} 원")
+        add_chart(doc, chart_images, "hourly_dual", "【시간별 전력사용량 vs 전기요금 그래프】", Inches(6), "시간별 차트")
+    
+    # === 3. 전일 대비 역률 요금 분석 (텍스트) ===
+    doc.add_heading('3. 전일 대비 역률 요금 분석', level=2)
+    
+    if daily_data is not None and not daily_data.empty:
+        # 시간대별 역률 분석
+        daytime_data = daily_data[(daily_data['시간'] >= 9) & (daily_data['시간'] < 23)]
+        nighttime_data = daily_data[(daily_data['시간'] >= 23) | (daily_data['시간'] < 9)]
+        
+        if len(daytime_data) > 0:
+            daytime_pf = daytime_data['지상역률(%)'].mean()
+            doc.add_paragraph(f"□ 주간 평균 지상역률 (09-23시): {daytime_pf:.1f}%")
+            
+            rate_impact = float(lagging_pf_adjustment(daytime_pf))
+            if rate_impact <= 0:
+                impact_text = f"감액 {abs(rate_impact):.1f}%"
+            else:
+                impact_text = f"추가요금 {rate_impact:.1f}%"
+            doc.add_paragraph(f"  - 한전 요금 영향: {impact_text}")
+        
+        if len(nighttime_data) > 0:
+            nighttime_pf = nighttime_data['진상역률(%)'].mean()
+            if nighttime_pf > 0:
+                doc.add_paragraph(f"□ 야간 평균 진상역률 (23-09시): {nighttime_pf:.1f}%")
+                rate_impact = float(leading_pf_adjustment(nighttime_pf))
+                if rate_impact <= 0:
+                    impact_text = "추가요금 없음"
+                else:
+                    impact_text = f"추가요금 {rate_impact:.1f}%"
+                doc.add_paragraph(f"  - 한전 요금 영향: {impact_text}")
+            else:
+                doc.add_paragraph(f"□ 야간 지상역률 운전 (23-09시): 정상 운전")
+                doc.add_paragraph(f"  - 한전 요금 영향: 추가요금 없음")
+    
+    # === 4. 상세 비교 데이터 (표) ===
+    doc.add_heading('4. 상세 비교 데이터', level=2)
+    
+    if daily_data is not None and not daily_data.empty:
+        # 시간별 상세 테이블
+        doc.add_paragraph("【시간별 상세 현황표】")
+        hourly_summary = daily_data.groupby('시간').agg({
+            '전력사용량(kWh)': 'sum',
+            '전기요금(원)': 'sum',
+            '지상역률(%)': 'mean'
+        }).round(2)
+        
+        # 상위 12시간만 표시
+        top_hours = hourly_summary.sort_values('전력사용량(kWh)', ascending=False).head(12)
+        add_bulk_table(doc, ['시간', '전력사용량(kWh)', '전기요금(원)', '지상역률(%)'], (
+            (f"{hour}시", f"{kwh:,.1f}", f"{cost:,.0f}", f"{pf:.1f}")
+            for hour, kwh, cost, pf in top_hours.itertuples(name=None)
+        ))
+
+    # === 5. 시간대별 작업유형별 전기요금 현황 (차트) ===
+    report_progress(0.7, "차트 배치")
+    doc.add_heading('5. 시간대별 작업유형별 전기요금 현황', level=2)
+    
+    analysis_data = daily_data if (daily_data is not None and not daily_data.empty) else df
+    
+    # Plotly 정적 내보내기가 실패한 차트는 matplotlib로 대체
+    failed = [name for name in ("worktype_stack", "worktype_donut") if isinstance(chart_images.get(name), Exception)]
+    if failed:
+        fallback_specs = collect_fallback_chart_specs(analysis_data)
+        chart_images.update(render_charts({name: fallback_specs[name] for name in failed}, chart_preset))
+    
+    add_chart(doc, chart_images, "worktype_stack", "【시간대별 작업유형별 전기요금 막대그래프】", Inches(6.5), "막대그래프")
+    add_chart(doc, chart_images, "worktype_donut", "【작업유형별 전력사용량 파이차트】", Inches(5), "파이차트")
+    
+    # === 6. 작업유형별 상세 분석 (표) ===
+    report_progress(0.8, "작업유형별 분석 작성")
+    doc.add_heading('6. 작업유형별 상세 분석', level=2)
+    
+    worktype_detailed = analysis_data.groupby('작업유형').agg({
+        '전력사용량(kWh)': 'sum',
+        '전기요금(원)': 'sum',
+        '지상역률(%)': 'mean',
+        '탄소배출량(tCO2)': 'sum'
+    }).round(2)
+    
+    doc.add_paragraph("【작업유형별 상세 현황표】")
+    add_bulk_table(doc, ['작업유형', '전력사용량(kWh)', '전기요금(원)', '평균역률(%)', '탄소배출량(tCO2)'], (
+        (WORKTYPE_NAMES.get(work_type, work_type), f"{kwh:,.1f}", f"{cost:,.0f}", f"{pf:.1f}", f"{carbon:.2f}")
+        for work_type, kwh, cost, pf, carbon in worktype_detailed.itertuples(name=None)
+    ))
+    
+    # === 7. 부하 이전 최적화 (선택) ===
+    if shift_result is not None:
+        doc.add_heading('7. 부하 이전 최적화 (최대부하 → 경·중간부하)', level=2)
+        for line in load_shift_summary_lines(shift_result, load_shift.get("max_shift_hours", DEFAULT_MAX_SHIFT_HOURS)):
+            doc.add_paragraph(line)
+        add_chart(doc, chart_images, "load_shift_before", "【부하 이전 전 시간대별 사용량】", Inches(6), "이전 전 차트")
+        add_chart(doc, chart_images, "load_shift_after", "【부하 이전 후 시간대별 사용량】", Inches(6), "이전 후 차트")
+        doc.add_paragraph("【절감액 상위 일자】")
+        add_bulk_table(doc, LOAD_SHIFT_TABLE_COLUMNS, load_shift_top_days(shift_result))
+
+    # === 부록: 용어 설명 ===
+    report_progress(0.9, "부록 및 결론 작성")
+    doc.add_page_break()
+    doc.add_heading('부록 - 전력 관련 용어 설명', level=1)
+    
+    doc.add_paragraph("【전력 측정 지표 설명】")
+    
+    doc.add_paragraph("□ 전력사용량(kWh)")
+    doc.add_paragraph("  - 실제 소비한 전력량으로 전기요금 산정의 기본 단위")
+    doc.add_paragraph("  - 1kWh = 1000W의 전력을 1시간 사용한 양")
+    
+    doc.add_paragraph("□ 지상무효전력량(kVarh)")
+    doc.add_paragraph("  - 유도성 부하(모터, 변압기 등)에서 발생하는 무효전력")
+    doc.add_paragraph("  - 전압이 전류보다 앞서는 경우로, 역률 저하의 주요 원인")
+    
+    doc.add_paragraph("□ 진상무효전력량(kVarh)")
+    doc.add_paragraph("  - 용량성 부하(콘덴서 등)에서 발생하는 무효전력")
+    doc.add_paragraph("  - 전류가 전압보다 앞서는 경우")
+    
+    doc.add_paragraph("□ 지상역률(%)")
+    doc.add_paragraph("  - 유효전력과 피상전력의 비율로 전력 효율을 나타냄")
+    doc.add_paragraph("  - 한전 기준: 90% 이상 유지 시 요금 감액, 미만 시 할증")
+    
+    doc.add_paragraph("□ 진상역률(%)")
+    doc.add_paragraph("  - 진상 운전 시의 역률로 주로 야간 경부하 시간대에 발생")
+    doc.add_paragraph("  - 한전 기준: 95% 이상 유지 시 추가요금 없음")
+    
+    doc.add_paragraph("□ 작업유형 구분")
+    doc.add_paragraph("  - 경부하(Light_Load): 23:00~09:00, 전력사용량이 적은 시간대")
+    doc.add_paragraph("  - 중간부하(Medium_Load): 09:00~10:00, 12:00~13:00, 17:00~23:00")
+    doc.add_paragraph("  - 최대부하(Maximum_Load): 10:00~12:00, 13:00~17:00, 요금이 가장 높은 시간대")
+    
+    doc.add_paragraph("□ 탄소배출량(tCO2)")
+    doc.add_paragraph("  - 전력 사용으로 인한 이산화탄소 배출량")
+    doc.add_paragraph("  - 환경부 고시 배출계수 적용하여 산정")
+    
+    # === 마무리 ===
+    doc.add_paragraph()
+    doc.add_heading('보고서 결론', level=1)
+    
+    total_kwh = rollups["total_kwh"]
+    total_cost = rollups["total_cost"]
+    avg_pf = rollups["avg_pf"]
+    
+    doc.add_paragraph("【종합 분석 결과】")
+    doc.add_paragraph(f"□ 전체 분석기간 전력사용량: {total_kwh:,.1f} kWh")
+    doc.add_paragraph(f"□ 전체 분석기간 전기요금: {total_cost:,.0f} 원")
+    doc.add_paragraph(f"□ 평균 역률: {avg_pf:.1f}%")
+    
+    if avg_pf < 90:
+        doc.add_paragraph(f"□ 역률 개선 필요: 현재 {avg_pf:.1f}%로 90% 미만")
+        monthly_avg_cost = total_cost / rollups["n_months"] if rollups["n_months"] > 0 else total_cost
+        doc.add_paragraph(f"□ 역률 개선을 통한 예상 절약효과: 월 약 {monthly_avg_cost * 0.05:,.0f} 원")
+    else:
+        doc.add_paragraph(f"□ 역률 상태 양호: 현재 {avg_pf:.1f}%로 기준치 이상 유지")
+    
+    doc.add_paragraph()
+    doc.add_paragraph("【향후 계획】")
+    doc.add_paragraph("□ 지속적인 전력 사용 패턴 모니터링")
+    doc.add_paragraph("□ 역률 개선을 통한 전기요금 절감 방안 검토")
+    doc.add_paragraph("□ 부하 분산을 통한 최대부하 시간대 사용량 최적화")
+    doc.add_paragraph("□ 월별 정기 분석을 통한 에너지 효율 관리 강화")
+    
+    doc.add_paragraph()
+    doc.add_paragraph("이상으로 전력 분석 보고를 마치겠습니다.")
+    
+    # === 부록 2: 15분 단위 상세 데이터 (선택) ===
+    if include_interval_appendix and not current_data.empty:
+        report_progress(0.95, "15분 상세 부록 작성")
+        doc.add_page_break()
+        doc.add_heading(f'부록 2 - 15분 단위 상세 데이터 ({period_label})', level=1)
+        add_bulk_table(doc, INTERVAL_APPENDIX_COLUMNS, iter_interval_rows(current_data))
+    
+    report_progress(1.0, "완료")
+    return doc
+
+
+def build_docx_report_bytes(*args, **kwargs):
+    """보고서를 생성해 DOCX 바이트로 반환 (작업 풀/캐시 저장용)"""
+    doc = create_comprehensive_docx_report_with_charts(*args, **kwargs)
+    doc_buffer = BytesIO()
+    doc.save(doc_buffer)
+    return doc_buffer.getvalue()
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utills.report import build_docx_report_bytes
+from utills.pdf_report import build_pdf_report_bytes
+
+# 보고서 형식별 생성 함수 (모두 같은 인자를 받아 바이트를 반환)
+REPORT_BUILDERS = {
+    "docx": build_docx_report_bytes,
+    "pdf": build_pdf_report_bytes,
+}
+
+
+# ========== 보고서 작업 상태 ==========
+class ReportJob:
+    """백그라운드 보고서 작업 1건의 진행 상태"""
+
+    def __init__(self, key):
+        self.key = key
+        self.progress = 0.0
+        self.message = "대기 중"
+        self.result = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+
+    def update(self, fraction, message):
+        self.progress = float(fraction)
+        self.message = message
+
+    @property
+    def done(self):
+        return self.result is not None or self.error is not None
+
+    @property
+    def elapsed(self):
+        end = self.finished_at or time.time()
+        return end - self.started_at
+
+
+# ========== 보고서 작업 관리자 ==========
+class ReportJobManager:
+    """보고서 생성을 작업 풀에서 실행하고 완료된 문서를 캐시
+
+    캐시 키는 (view_type, 월 또는 기간, 데이터 버전, 형식, 옵션) 튜플이며,
+    같은 키로 진행 중인 작업이 있으면 새로 만들지 않고 그 작업을 돌려준다.
+    """
+
+    def __init__(self, max_workers=2, max_cached=32):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._cache = OrderedDict()
+        self._max_cached = max_cached
+
+    @staticmethod
+    def make_key(view_type, period, version, report_format="docx", **options):
+        """캐시 키 생성 (period: 선택 월 또는 (시작일, 종료일), options: 보고서 생성 옵션)"""
+        if isinstance(period, (list, tuple)):
+            period = tuple(str(p) for p in period)
+        return (view_type, period, version, report_format, tuple(sorted(options.items())))
+
+    def cached(self, key):
+        """완료된 보고서 바이트 반환 (없으면 None)"""
+        with self._lock:
+            return self._cached_locked(key)
+
+    def submit(self, key, *args, **kwargs):
+        """보고서 작업 등록 (키의 형식에 맞는 REPORT_BUILDERS 함수에 인자 그대로 전달)"""
+        with self._lock:
+            job = self._get_locked(key)
+            if job is not None and job.error is None:
+                return job
+
+            job = ReportJob(key)
+            self._jobs[key] = job
+            self._executor.submit(self._run, job, args, kwargs)
+            return job
+
+    def get(self, key):
+        """키에 해당하는 작업 (캐시된 결과는 완료 상태 작업으로 반환)"""
+        with self._lock:
+            return self._get_locked(key)
+
+    def _cached_locked(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        return None
+
+    def _get_locked(self, key):
+        result = self._cached_locked(key)
+        if result is not None:
+            job = ReportJob(key)
+            job.update(1.0, "완료 (캐시)")
+            job.result = result
+            job.finished_at = job.started_at
+            return job
+        return self._jobs.get(key)
+
+    def _run(self, job, args, kwargs):
+        try:
+            builder = REPORT_BUILDERS[job.key[3]]
+            result = builder(*args, progress=job.update, **kwargs)
+        except Exception as e:
+            job.message = f"오류: {e}"
+            job.error = e
+            return None
+        finally:
+            job.finished_at = time.time()
+
+        with self._lock:
+            self._cache[job.key] = result
+            self._cache.move_to_end(job.key)
+            while len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+            self._jobs.pop(job.key, None)
+        job.result = result
+        return result
@@ -0,0 +1,302 @@
+"""새로 들어온 데이터로 기존 모델 이어 학습 (warm start)
+
+models/ 의 현재 산출물에서 시작해
+    - XGBoost: 기존 트리는 그대로 두고 최근 데이터로 트리를 추가 (boosting 계속)
+    - LSTM: 기존 가중치에서 최근 구간 시퀀스로 작은 학습률 미세조정 (표준화 값은 기존 것 고정)
+새 데이터 마지막 holdout_days 일을 검증 구간으로 떼어 기존 모델과 MAE 를 비교하고, 더 나은 모델만 ./models 에
+반영(promote)한다. 학습에는 새 구간(--since 이후) + 직전 replay_days 일만 쓰므로 전체 재학습보다 훨씬 빠르다.
+검증 구간은 기존 모델이 학습한 구간 뒤여야 한다 (겹치면 기존 모델 점수가 in-sample 이 되어 비교가 기울어짐).
+기존 모델의 학습 끝 시각은 models/versions 의 manifest(trained_until) 에서 파일 해시로 찾고,
+찾지 못하면(예: 학습 기록 없이 받은 산출물) --base-trained-until 로 지정해야 한다. 겹치면 검증하지 않고 멈춘다.
+결과는 utills.train 과 같은 형식으로 models/versions/<버전>/ 에 남는다 (manifest 의 kind = "incremental").
+기본은 XGBoost 만 이어 학습한다. LSTM 미세조정에는 TensorFlow(Keras) 가 필요하다 (requirements-train.txt).
+
+사용 예:
+    python -m utills.retrain --models xgboost
+    python -m utills.retrain --models xgboost --base-trained-until 2024-10-31 --rounds 300 --holdout-days 7
+    python -m utills.retrain --models lstm --epochs 5 --dry-run
+"""
+import os
+import sys
+import json
+import glob
+import pickle
+import argparse
+import importlib.util
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, load_train_data, data_version
+from utills.features import FEATURE_COLUMNS, TARGET_COLUMN, build_features, feature_matrix
+from utills.model import COST_MODELS, DEFAULT_TRAIN_MODELS, load_cost_model, scaler_dict, lstm_inputs
+from utills.train import (TEST_PATH, MODELS_DIR, VERSIONS_DIR, TRAIN_CACHE_DIR, DEFAULT_SEED, ARTIFACT_FILES,
+                          StageTimer, cached, config_hash, file_digest, regression_metrics, load_test_frame,
+                          cached_test_features, load_artifact, predict_test, publish, package_versions)
+
+DEFAULT_HOLDOUT_DAYS = 7
+# 새 구간 앞 기존 데이터를 함께 학습해 예전 패턴을 잊지 않게 함
+DEFAULT_REPLAY_DAYS = 28
+# 후보 MAE 가 기존보다 이 비율 이상 낮아야 반영
+DEFAULT_MIN_IMPROVEMENT = 0.0
+
+# 이어 학습 설정 (기존 모델 설정에 덮어씀)
+XGBOOST_INCREMENTAL_PARAMS = {"n_estimators": 200, "learning_rate": 0.03}
+LSTM_INCREMENTAL_PARAMS = {"epochs": 5, "learning_rate": 5e-5, "batch_size": 256, "patience": 2,
+                           "validation_split": 0.1}
+
+
+# ========== 1. 구간 나누기 ==========
+def base_trained_until(name, base_path, versions_dir=VERSIONS_DIR):
+    """기존 산출물을 만든 학습 실행(파일 해시가 같은 manifest)의 학습 데이터 마지막 시각 (없으면 None)"""
+    filename = ARTIFACT_FILES[name][0]
+    digest = file_digest(base_path)
+    for path in glob.glob(os.path.join(versions_dir, "*", "manifest.json")):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        until = (manifest.get("trained_until") or {}).get(name)
+        if until and manifest.get("files", {}).get(filename) == digest:
+            return pd.Timestamp(until)
+    return None
+
+
+def new_data_start(timestamps, trained_until):
+    """기존 모델 학습 구간 다음 첫 시각 (새 데이터가 없으면 오류)"""
+    after = timestamps[timestamps > trained_until]
+    if after.empty:
+        raise ValueError(f"기존 모델 학습 구간(~{trained_until:%Y-%m-%d %H:%M}) 이후 새 데이터가 없습니다")
+    return after.iloc[0]
+
+
+def incremental_split(timestamps, since, holdout_days=DEFAULT_HOLDOUT_DAYS, replay_days=DEFAULT_REPLAY_DAYS):
+    """(이어 학습 구간, 검증 구간) bool 배열"""
+    holdout_start = timestamps.iloc[-1].normalize() - pd.Timedelta(days=holdout_days - 1)
+    if holdout_start <= since:
+        raise ValueError(f"새 구간({since:%Y-%m-%d} 이후)이 검증 {holdout_days}일보다 짧습니다")
+    fit = ((timestamps >= since - pd.Timedelta(days=replay_days)) & (timestamps < holdout_start)).to_numpy()
+    return fit, (timestamps >= holdout_start).to_numpy()
+
+
+# ========== 2. 이어 학습 ==========
+def continue_xgboost(base, features, y, fit, params, threads, seed):
+    """기존 XGBRegressor 트리 뒤에 params["n_estimators"] 개 트리 추가"""
+    from xgboost import XGBRegressor
+
+    booster = base.get_booster()
+    model = XGBRegressor(**{**base.get_params(), **params, "n_jobs": threads, "random_state": seed})
+    # 열 이름을 저장한 모델(기존 xgboost.pkl)은 같은 이름의 표로 학습해야 함
+    X = features[FEATURE_COLUMNS] if booster.feature_names else feature_matrix(features)
+    model.fit(X[fit], y[fit], xgb_model=booster)
+    return model
+
+
+def fine_tune_lstm(base, features, y, fit, params, threads, seed, model_path, scaler_path):
+    """기존 lstm.h5 가중치에서 최근 구간으로 미세조정 후 h5 + 표준화 JSON 저장"""
+    import tensorflow as tf
+    from tensorflow import keras
+
+    keras.utils.set_random_seed(seed)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+
+    model = keras.models.load_model(base.path, compile=False)
+    model.compile(optimizer=keras.optimizers.Adam(params["learning_rate"]), loss="mae")
+    scaler = base.scaler
+    rows = np.flatnonzero(fit)
+    rows = rows[rows >= base.context]
+    target = (y - scaler["target_mean"]) / scaler["target_scale"]
+    # 시간순 그대로 두면 validation_split 이 학습 구간의 마지막 부분을 검증으로 씀
+    model.fit(list(lstm_inputs(features, rows, scaler, base.sequence_length)), target[rows],
+              epochs=params["epochs"], batch_size=params["batch_size"], shuffle=True, verbose=2,
+              validation_split=params["validation_split"],
+              callbacks=[keras.callbacks.EarlyStopping(patience=params["patience"], restore_best_weights=True)])
+    model.save(model_path)
+    with open(scaler_path, "w", encoding="utf-8") as f:
+        json.dump(scaler_dict(scaler), f, ensure_ascii=False, indent=2)
+
+
+def holdout_metrics(model, features, y, holdout):
+    rows = np.flatnonzero(holdout)
+    return regression_metrics(y[rows], model.predict(features, rows))
+
+
+def latest_full_training(versions_dir=VERSIONS_DIR):
+    """가장 최근 전체 학습 manifest (소요 시간 비교용, 없으면 None)"""
+    manifests = []
+    for path in glob.glob(os.path.join(versions_dir, "*", "manifest.json")):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("kind", "full") == "full":
+            manifests.append(manifest)
+    return max(manifests, key=lambda m: m["created_at"]) if manifests else None
+
+
+# ========== 3. 파이프라인 ==========
+def run_incremental(data_path=TRAIN_PATH, test_path=TEST_PATH, models=None, since=None,
+                    holdout_days=DEFAULT_HOLDOUT_DAYS, replay_days=DEFAULT_REPLAY_DAYS, threads=None,
+                    seed=DEFAULT_SEED, xgboost_params=None, lstm_params=None,
+                    min_improvement=DEFAULT_MIN_IMPROVEMENT, base_dir=MODELS_DIR, versions_dir=VERSIONS_DIR,
+                    cache_dir=TRAIN_CACHE_DIR, promote=True, base_until=None):
+    """이어 학습 -> 검증 -> (더 나으면) 반영. (버전 폴더, manifest dict) 반환
+
+    base_until: 기존 모델 학습 데이터 마지막 시각 (기본: models/versions manifest 에서 찾음)
+    since: 새 데이터 시작 시각 (기본: 기존 모델 학습 구간 바로 다음)
+    """
+    models = list(models or DEFAULT_TRAIN_MODELS)
+    if "lstm" in models and importlib.util.find_spec("tensorflow") is None:
+        raise RuntimeError("LSTM 미세조정에는 tensorflow 가 필요합니다 (pip install -r requirements-train.txt)")
+    threads = threads or os.cpu_count() or 1
+    xgboost_params = {**XGBOOST_INCREMENTAL_PARAMS, **(xgboost_params or {})}
+    lstm_params = {**LSTM_INCREMENTAL_PARAMS, **(lstm_params or {})}
+    base_paths = {name: os.path.join(base_dir, ARTIFACT_FILES[name][0]) for name in models}
+    timer = StageTimer()
+    cache_hits = {}
+
+    with timer.stage("load"):
+        train = load_train_data(data_path).sort_values("측정일시").reset_index(drop=True)
+        versions = {"data": data_version(data_path), "test": data_version(test_path) if test_path else None}
+        base_trained = {name: pd.Timestamp(base_until) if base_until is not None
+                        else base_trained_until(name, path, versions_dir) for name, path in base_paths.items()}
+        unknown = [name for name, until in base_trained.items() if until is None]
+        if unknown:
+            raise ValueError(f"{', '.join(unknown)}: 기존 모델의 학습 구간을 알 수 없어 공정하게 비교할 수 없습니다 "
+                             f"({versions_dir} 에 같은 파일의 manifest 가 없음, --base-trained-until 로 지정)")
+        base_end = max(base_trained.values())
+        since = pd.Timestamp(since) if since is not None else new_data_start(train["측정일시"], base_end)
+        fit, holdout = incremental_split(train["측정일시"], since, holdout_days, replay_days)
+        holdout_start = train.loc[holdout, "측정일시"].iloc[0]
+        if holdout_start <= base_end:
+            raise ValueError(f"검증 구간({holdout_start:%Y-%m-%d} 부터)이 기존 모델 학습 구간(~{base_end:%Y-%m-%d %H:%M})과 "
+                             "겹쳐 기존 모델 점수가 in-sample 이 됩니다. 학습 이후 데이터가 더 쌓인 뒤 실행하세요")
+        base_models = {name: load_cost_model(name, path=base_paths[name]) for name in models}
+
+    config = {"versions": versions, "base": {name: file_digest(path) for name, path in base_paths.items()},
+              "since": since, "holdout_days": holdout_days, "replay_days": replay_days, "seed": seed,
+              "xgboost": xgboost_params if "xgboost" in models else None,
+              "lstm": lstm_params if "lstm" in models else None}
+    version = f"{datetime.now():%Y%m%d-%H%M%S}-{config_hash(config)[:8]}"
+    version_dir = os.path.join(versions_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    with timer.stage("features"):
+        features, cache_hits["train_features"] = cached(
+            cache_dir, {"stage": "train_features", "data": versions["data"], "features": FEATURE_COLUMNS},
+            lambda: build_features(train))
+        y = train[TARGET_COLUMN].to_numpy(dtype=float)
+
+    metrics = {}
+    for name in models:
+        with timer.stage(name):
+            if name == "xgboost":
+                model = continue_xgboost(base_models[name].model, features, y, fit, xgboost_params, threads, seed)
+                with open(os.path.join(version_dir, "xgboost.pkl"), "wb") as f:
+                    pickle.dump(model, f)
+            else:
+                fine_tune_lstm(base_models[name], features, y, fit, lstm_params, threads, seed,
+                               os.path.join(version_dir, "lstm.h5"), os.path.join(version_dir, "lstm_scaler.json"))
+        baseline = holdout_metrics(base_models[name], features, y, holdout)
+        candidate = holdout_metrics(load_artifact(version_dir, name), features, y, holdout)
+        metrics[name] = {"baseline": baseline, "candidate": candidate,
+                         "promoted": candidate["MAE"] < baseline["MAE"] * (1 - min_improvement)}
+
+    promoted = [name for name in models if metrics[name]["promoted"]]
+    files = [filename for name in models for filename in ARTIFACT_FILES[name]]
+    promoted_files = [filename for name in promoted for filename in ARTIFACT_FILES[name]]
+    if test_path and promoted:
+        with timer.stage("test_features"):
+            test = load_test_frame(test_path)
+            (future, rows), cache_hits["test_features"] = cached_test_features(train, test, versions, threads,
+                                                                               seed, cache_dir)
+        with timer.stage("predict"):
+            predictions = predict_test(version_dir, promoted, test, future, rows)
+        files += predictions
+        promoted_files += predictions
+    if promote and promoted_files:
+        with timer.stage("promote"):
+            publish(version_dir, promoted_files, base_dir)
+
+    full = latest_full_training(versions_dir)
+    manifest = {
+        "version": version,
+        "kind": "incremental",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "data": data_path,
+        "test": test_path,
+        "data_versions": versions,
+        "models": models,
+        "base": {name: {"path": path, "sha1": config["base"][name]} for name, path in base_paths.items()},
+        "base_trained_until": {name: until.isoformat() for name, until in base_trained.items()},
+        "since": since.isoformat(),
+        "fit_rows": int(fit.sum()),
+        "trained_until": {name: train.loc[fit, "측정일시"].iloc[-1].isoformat() for name in models},
+        "holdout": {"start": train.loc[holdout, "측정일시"].iloc[0].isoformat(), "rows": int(holdout.sum())},
+        "seed": seed,
+        "threads": threads,
+        "params": {"xgboost": xgboost_params, "lstm": lstm_params},
+        "min_improvement": min_improvement,
+        "metrics": metrics,
+        "promoted": promoted if promote else [],
+        "stages": timer.seconds,
+        "full_training": {"version": full["version"], "seconds": sum(full["stages"].values())} if full else None,
+        "cache_hits": cache_hits,
+        "packages": package_versions(),
+        "files": {filename: file_digest(os.path.join(version_dir, filename)) for filename in files},
+    }
+    with open(os.path.join(version_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return version_dir, manifest
+
+
+# ========== 4. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="요금 예측 모델 이어 학습 (warm start)")
+    parser.add_argument("--data", default=TRAIN_PATH, help="학습 15분 데이터 CSV (새 달 포함)")
+    parser.add_argument("--test", default=TEST_PATH, help="반영 시 예측 CSV 를 다시 만들 시험 구간 CSV (빈 값이면 생략)")
+    parser.add_argument("--models", nargs="+", choices=list(COST_MODELS), default=list(DEFAULT_TRAIN_MODELS),
+                        help="이어 학습할 모델 (lstm 은 requirements-train.txt 필요)")
+    parser.add_argument("--since", help="새 데이터 시작일 (기본: 기존 모델 학습 구간 바로 다음)")
+    parser.add_argument("--base-trained-until",
+                        help="기존 모델 학습 데이터 마지막 시각 (기본: models/versions manifest 에서 찾음)")
+    parser.add_argument("--holdout-days", type=int, default=DEFAULT_HOLDOUT_DAYS, help="검증 구간 일수 (마지막 N일)")
+    parser.add_argument("--replay-days", type=int, default=DEFAULT_REPLAY_DAYS, help="함께 학습할 직전 기존 데이터 일수")
+    parser.add_argument("--rounds", type=int, default=XGBOOST_INCREMENTAL_PARAMS["n_estimators"],
+                        help="XGBoost 추가 트리 수")
+    parser.add_argument("--epochs", type=int, default=LSTM_INCREMENTAL_PARAMS["epochs"], help="LSTM 미세조정 epoch")
+    parser.add_argument("--min-improvement", type=float, default=DEFAULT_MIN_IMPROVEMENT,
+                        help="반영 기준: 검증 MAE 가 기존보다 이 비율 이상 낮을 때")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="학습 스레드 수")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="난수 시드")
+    parser.add_argument("--base", default=MODELS_DIR, help="기존 산출물 폴더 (반영 대상)")
+    parser.add_argument("--out", default=VERSIONS_DIR, help="버전 폴더 상위 경로")
+    parser.add_argument("--no-cache", action="store_true", help="특성 캐시 사용 안 함")
+    parser.add_argument("--dry-run", action="store_true", help="검증만 하고 반영하지 않음")
+    parser.add_argument("--register", action="store_true", help="반영한 모델을 모델 레지스트리에도 등록하고 현재 버전으로 지정")
+    args = parser.parse_args(argv)
+
+    version_dir, manifest = run_incremental(
+        args.data, args.test or None, models=args.models, since=args.since, holdout_days=args.holdout_days,
+        replay_days=args.replay_days, threads=args.threads, seed=args.seed,
+        xgboost_params={"n_estimators": args.rounds}, lstm_params={"epochs": args.epochs},
+        min_improvement=args.min_improvement, base_dir=args.base, versions_dir=args.out,
+        cache_dir=None if args.no_cache else TRAIN_CACHE_DIR, promote=not args.dry_run,
+        base_until=args.base_trained_until)
+
+    for name, values in manifest["metrics"].items():
+        decision = "반영" if name in manifest["promoted"] else ("더 나음 (dry-run)" if values["promoted"] else "유지")
+        print(f"{name}: 검증 MAE 기존 {values['baseline']['MAE']:,.1f} -> 후보 {values['candidate']['MAE']:,.1f} "
+              f"[{decision}]")
+    if args.register and manifest["promoted"]:
+        from utills.registry import ModelRegistry
+
+        for name, version in ModelRegistry().register_run(version_dir, promote=True).items():
+            print(f"레지스트리: {name} {version}")
+    seconds = sum(manifest["stages"].values())
+    if manifest["full_training"]:
+        ratio = seconds / manifest["full_training"]["seconds"] * 100
+        print(f"전체 학습({manifest['full_training']['version']}) 대비 소요 시간 {ratio:.0f}%")
+    print(f"완료: {seconds:.1f}초 -> {version_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
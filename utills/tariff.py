@@ -0,0 +1,242 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from utills.data import WORKTYPES, WORKTYPE_NAMES
+from utills.demand import INTERVALS_PER_HOUR, ratchet_demand
+
+# ========== 공통 상수 ==========
+SEASONS = ["여름철", "봄·가을철", "겨울철"]
+# 월(1~12) -> SEASONS 인덱스 (0번은 사용하지 않음)
+SEASON_OF_MONTH = np.array([2, 2, 2, 1, 1, 1, 0, 0, 0, 1, 1, 2, 2])
+
+# 주간(지상역률 적용) 시간대: 09~23시, 나머지는 야간(진상역률 적용)
+DAYTIME_HOURS = (9, 23)
+
+# 요금제 정의 (단가는 2024년 산업용(을) 고압A 선택II 근사값, 실제 계약 단가로 교체해서 사용)
+TARIFF_PLANS = {
+    "산업용(을) 고압A 선택II": {
+        "base_rate": 8320.0,                 # 기본요금 (원/kW)
+        "energy_rates": {                    # 전력량요금 (원/kWh), 계절 x 부하
+            "여름철": {"Light_Load": 99.5, "Medium_Load": 152.4, "Maximum_Load": 234.5},
+            "봄·가을철": {"Light_Load": 99.5, "Medium_Load": 122.0, "Maximum_Load": 152.7},
+            "겨울철": {"Light_Load": 106.5, "Medium_Load": 152.6, "Maximum_Load": 210.1},
+        },
+        "climate_rate": 9.0,                 # 기후환경요금 (원/kWh)
+        "fuel_adjust_rate": 5.0,             # 연료비조정요금 (원/kWh)
+        "contract_kw": None,                 # 계약전력 (None이면 최대수요전력만 사용)
+        "min_demand_ratio": 0.3,             # 요금적용전력 하한 (계약전력 대비)
+        "lag_pf_ref": 90.0,                  # 주간 지상역률 기준
+        "lag_pf_cap": 95.0,                  # 주간 지상역률 감액 상한
+        "lead_pf_ref": 95.0,                 # 야간 진상역률 기준
+        "pf_floor": 60.0,                    # 역률 하한
+        "pf_step": 0.5,                      # 역률 1%당 기본요금 조정률 (%)
+        "vat_rate": 0.10,                    # 부가가치세
+        "fund_rate": 0.037,                  # 전력산업기반기금
+    },
+}
+DEFAULT_PLAN = "산업용(을) 고압A 선택II"
+
+
+def make_tariff(plan=DEFAULT_PLAN, **overrides):
+    """요금제 정의 복사본 (overrides로 일부 항목 변경, energy_rates는 계절/부하 단위로 병합)"""
+    tariff = copy.deepcopy(TARIFF_PLANS[plan])
+    energy_overrides = overrides.pop("energy_rates", None) or {}
+    for season, rates in energy_overrides.items():
+        tariff["energy_rates"][season].update(rates)
+    tariff.update(overrides)
+    return tariff
+
+
+def energy_rate_matrix(tariff):
+    """전력량요금 단가를 (계절, 부하) 배열로 변환"""
+    return np.array([[tariff["energy_rates"][season][work_type] for work_type in WORKTYPES]
+                     for season in SEASONS], dtype=float)
+
+
+# ========== 1. 역률 조정 ==========
+def lagging_pf_adjustment(pf, ref=90.0, cap=95.0, floor=60.0, step=0.5):
+    """주간 지상역률 기본요금 조정률(%) (+ 추가, - 감액), 스칼라/배열 모두 가능"""
+    adjusted = np.clip(pf, floor, cap)
+    return (ref - adjusted) * step
+
+
+def leading_pf_adjustment(pf, ref=95.0, floor=60.0, step=0.5):
+    """야간 진상역률 기본요금 추가율(%) (진상역률 0 이하는 진상 없음으로 보고 100%)"""
+    pf = np.asarray(pf, dtype=float)
+    adjusted = np.where(pf <= 0, 100.0, np.maximum(floor, pf))
+    return np.maximum(ref - adjusted, 0.0) * step
+
+
+def pf_adjustment_pct(lag_pf, lead_pf, tariff):
+    """주간 지상 + 야간 진상 역률 조정률 합계(%)"""
+    lag = lagging_pf_adjustment(lag_pf, tariff["lag_pf_ref"], tariff["lag_pf_cap"], tariff["pf_floor"],
+                                tariff["pf_step"])
+    lead = leading_pf_adjustment(lead_pf, tariff["lead_pf_ref"], tariff["pf_floor"], tariff["pf_step"])
+    return lag + lead
+
+
+# ========== 2. 구간 -> 월별 집계 ==========
+def load_arrays(df):
+    """15분 데이터에서 요금 계산에 필요한 배열만 추출"""
+    timestamps = df["측정일시"]
+    month_codes, months = pd.factorize(timestamps.dt.to_period("M"), sort=True)
+    load_codes = pd.Categorical(df["작업유형"], categories=WORKTYPES).codes
+    if (load_codes < 0).any():
+        unknown = sorted(set(df["작업유형"]) - set(WORKTYPES))
+        raise ValueError(f"알 수 없는 작업유형: {unknown}")
+    hours = timestamps.dt.hour.to_numpy()
+    return {
+        "months": pd.PeriodIndex(months, name="년월"),
+        "month_idx": month_codes,
+        "load_idx": load_codes.astype(np.int64),
+        "kwh": df["전력사용량(kWh)"].to_numpy(dtype=float),
+        "lag_pf": df["지상역률(%)"].to_numpy(dtype=float),
+        "lead_pf": df["진상역률(%)"].to_numpy(dtype=float),
+        "daytime": (hours >= DAYTIME_HOURS[0]) & (hours < DAYTIME_HOURS[1]),
+        "actual_cost": df["전기요금(원)"].to_numpy(dtype=float) if "전기요금(원)" in df else None,
+    }
+
+
+def monthly_statistics(arrays):
+    """월별 요금 계산 입력 (부하별 kWh, 최대수요전력, 12개월 반영전력, 주간/야간 평균 역률)
+
+    요금제와 무관한 값만 모으므로 요금제를 바꿔 가며 계산할 때 한 번만 만들면 된다.
+    """
+    n_months = len(arrays["months"])
+    month_idx = arrays["month_idx"]
+    kwh = arrays["kwh"]
+    day = arrays["daytime"]
+
+    kwh_by_load = np.bincount(month_idx * len(WORKTYPES) + arrays["load_idx"], weights=kwh,
+                              minlength=n_months * len(WORKTYPES)).reshape(n_months, len(WORKTYPES))
+
+    peak_kw = np.zeros(n_months)
+    np.maximum.at(peak_kw, month_idx, kwh * INTERVALS_PER_HOUR)
+
+    def _masked_mean(values, mask, default):
+        total = np.bincount(month_idx[mask], weights=values[mask], minlength=n_months)
+        count = np.bincount(month_idx[mask], minlength=n_months)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, default)
+
+    stats = {
+        "months": arrays["months"],
+        "season_idx": SEASON_OF_MONTH[arrays["months"].month],
+        "kwh_by_load": kwh_by_load,
+        "peak_kw": peak_kw,
+        "ratchet_kw": ratchet_demand(peak_kw, arrays["months"]),
+        "lag_pf": _masked_mean(arrays["lag_pf"], day, 90.0),
+        "lead_pf": _masked_mean(arrays["lead_pf"], ~day, 100.0),
+    }
+    if arrays.get("actual_cost") is not None:
+        stats["actual_cost"] = np.bincount(month_idx, weights=arrays["actual_cost"], minlength=n_months)
+    return stats
+
+
+# ========== 3. 요금 계산 ==========
+def _param_value(value, batch_shape):
+    """요금제 값을 (..., 1) 모양으로 맞춰 월 축과 브로드캐스트 (None은 NaN)"""
+    value = np.asarray(np.nan if value is None else value, dtype=float)
+    if value.ndim == 0:
+        return value
+    return value.reshape(batch_shape + (1,))
+
+
+def bill_components(stats, tariff):
+    """월별 요금 구성 요소 배열 계산
+
+    tariff 값은 스칼라 또는 같은 모양의 배열(여러 요금제 일괄 계산)일 수 있다.
+    배열로 줄 때는 "energy_rate_matrix" 에 (..., 계절, 부하) 단가를 넣고,
+    나머지 값은 앞쪽 (...) 모양을 맞춘다. 결과 배열은 (..., 월) 모양.
+    """
+    if "energy_rate_matrix" in tariff:
+        rates = np.asarray(tariff["energy_rate_matrix"], dtype=float)
+    else:
+        rates = energy_rate_matrix(tariff)
+    batch_shape = rates.shape[:-2]
+    param = {key: _param_value(tariff.get(key), batch_shape)
+             for key in ("base_rate", "climate_rate", "fuel_adjust_rate", "contract_kw", "min_demand_ratio",
+                         "lag_pf_ref", "lag_pf_cap", "lead_pf_ref", "pf_floor", "pf_step", "vat_rate", "fund_rate")}
+
+    # 월별 계절 단가 (..., 월, 부하) x 부하별 kWh
+    energy_by_load = rates[..., stats["season_idx"], :] * stats["kwh_by_load"]
+    energy_charge = energy_by_load.sum(axis=-1)
+    total_kwh = stats["kwh_by_load"].sum(axis=-1)
+
+    # 요금적용전력: 당월 최대수요, 12개월 반영전력, 계약전력 x 하한비율 중 큰 값
+    demand_floor = np.nan_to_num(param["contract_kw"] * param["min_demand_ratio"])
+    billing_kw = np.maximum(np.maximum(stats["peak_kw"], stats["ratchet_kw"]), demand_floor)
+
+    pf_pct = pf_adjustment_pct(stats["lag_pf"], stats["lead_pf"], param)
+    base_charge = param["base_rate"] * billing_kw
+    pf_charge = base_charge * pf_pct / 100
+    climate_charge = param["climate_rate"] * total_kwh
+    fuel_charge = param["fuel_adjust_rate"] * total_kwh
+
+    subtotal = base_charge + pf_charge + energy_charge + climate_charge + fuel_charge
+    vat = subtotal * param["vat_rate"]
+    fund = subtotal * param["fund_rate"]
+    return {
+        "billing_kw": billing_kw,
+        "pf_pct": pf_pct,
+        "base_charge": base_charge,
+        "pf_charge": pf_charge,
+        "energy_by_load": energy_by_load,
+        "energy_charge": energy_charge,
+        "climate_charge": climate_charge,
+        "fuel_charge": fuel_charge,
+        "subtotal": subtotal,
+        "vat": vat,
+        "fund": fund,
+        "total": subtotal + vat + fund,
+    }
+
+
+def bill_table(stats, components):
+    """요금제 1개의 월별 요금 명세표"""
+    table = pd.DataFrame(index=stats["months"])
+    table["계절"] = [SEASONS[i] for i in stats["season_idx"]]
+    table["전력사용량(kWh)"] = stats["kwh_by_load"].sum(axis=1)
+    for i, work_type in enumerate(WORKTYPES):
+        table[f"{WORKTYPE_NAMES[work_type]}(kWh)"] = stats["kwh_by_load"][:, i]
+    table["최대수요전력(kW)"] = stats["peak_kw"]
+    table["12개월 반영전력(kW)"] = stats["ratchet_kw"]
+    table["요금적용전력(kW)"] = components["billing_kw"]
+    table["주간 지상역률(%)"] = stats["lag_pf"]
+    table["야간 진상역률(%)"] = stats["lead_pf"]
+    table["역률조정률(%)"] = components["pf_pct"]
+    table["기본요금(원)"] = components["base_charge"]
+    table["역률요금(원)"] = components["pf_charge"]
+    for i, work_type in enumerate(WORKTYPES):
+        table[f"{WORKTYPE_NAMES[work_type]} 전력량요금(원)"] = components["energy_by_load"][:, i]
+    table["전력량요금(원)"] = components["energy_charge"]
+    table["기후환경요금(원)"] = components["climate_charge"]
+    table["연료비조정요금(원)"] = components["fuel_charge"]
+    table["전기요금계(원)"] = components["subtotal"]
+    table["부가가치세(원)"] = components["vat"]
+    table["전력산업기반기금(원)"] = components["fund"]
+    table["청구금액(원)"] = components["total"]
+    if "actual_cost" in stats:
+        table["실측 전기요금(원)"] = stats["actual_cost"]
+    return table
+
+
+def calculate_bill(df, tariff=None):
+    """15분 데이터로 월별 요금 명세 재계산 (tariff 생략 시 기본 요금제)"""
+    tariff = tariff or TARIFF_PLANS[DEFAULT_PLAN]
+    stats = monthly_statistics(load_arrays(df))
+    return bill_table(stats, bill_components(stats, tariff))
+
+
+def interval_energy_charges(df, tariff=None):
+    """15분 구간별 전력량요금 (계절 x 작업유형 단가 조회 한 번)"""
+    tariff = tariff or TARIFF_PLANS[DEFAULT_PLAN]
+    rates = energy_rate_matrix(tariff)
+    season_idx = SEASON_OF_MONTH[df["측정일시"].dt.month.to_numpy()]
+    load_idx = pd.Categorical(df["작업유형"], categories=WORKTYPES).codes
+    if (load_idx < 0).any():
+        unknown = sorted(map(str, set(df["작업유형"]) - set(WORKTYPES)))
+        raise ValueError(f"알 수 없는 작업유형: {unknown}")
+    return rates[season_idx, load_idx] * df["전력사용량(kWh)"].to_numpy(dtype=float)
@@ -0,0 +1,193 @@
+"""요금제 후보(파라미터 격자)를 실제 부하 이력에 일괄 적용해 총 요금 순위 계산
+
+사용 예:
+    python -m utills.tariff_sweep --grid grid.json --top 20
+    python -m utills.tariff_sweep --grid grid.json --workers 8 --out ./reports/tariff_sweep
+
+grid.json 예시 (키는 요금제 항목, 값은 후보 목록):
+    {
+        "contract_kw": [600, 700, 800],
+        "lag_pf_ref": [88, 90],
+        "energy_scale.여름철": [0.95, 1.0, 1.05],
+        "energy_rates.겨울철.Maximum_Load": [200, 210.1, 220]
+    }
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, WORKTYPES, load_train_data, data_version
+from utills.tariff import (SEASONS, TARIFF_PLANS, DEFAULT_PLAN, energy_rate_matrix, load_arrays,
+                           monthly_statistics, bill_components)
+
+# 시나리오를 이 개수 단위로 잘라 계산 (배열 메모리: 청크 x 월 x 부하)
+DEFAULT_CHUNK_SIZE = 20000
+
+# 배열로 바꿀 수 있는 스칼라 요금 항목
+SCALAR_PARAMS = ("base_rate", "climate_rate", "fuel_adjust_rate", "contract_kw", "min_demand_ratio",
+                 "lag_pf_ref", "lag_pf_cap", "lead_pf_ref", "pf_floor", "pf_step", "vat_rate", "fund_rate")
+
+
+# ========== 1. 격자 -> 요금제 배열 ==========
+def validate_grid(grid):
+    """격자 키 검사 후 (이름, 후보 배열) 목록 반환"""
+    items = []
+    for name, values in grid.items():
+        parts = name.split(".")
+        if parts[0] == "energy_rates":
+            if len(parts) != 3 or parts[1] not in SEASONS or parts[2] not in WORKTYPES:
+                raise ValueError(f"energy_rates 키는 'energy_rates.<계절>.<작업유형>' 형식이어야 합니다: {name}")
+        elif parts[0] == "energy_scale":
+            if len(parts) != 2 or parts[1] not in SEASONS:
+                raise ValueError(f"energy_scale 키는 'energy_scale.<계절>' 형식이어야 합니다: {name}")
+        elif name not in SCALAR_PARAMS:
+            raise ValueError(f"알 수 없는 요금 항목: {name}")
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 1 or values.size == 0:
+            raise ValueError(f"후보 값은 비어 있지 않은 목록이어야 합니다: {name}")
+        items.append((name, values))
+    return items
+
+
+def grid_size(grid_items):
+    return int(np.prod([len(values) for _, values in grid_items], dtype=np.int64)) if grid_items else 1
+
+
+def scenario_values(grid_items, indices):
+    """시나리오 인덱스 목록의 항목별 값 (격자를 펼치지 않고 인덱스로 계산)"""
+    if not grid_items:
+        return {}
+    shape = tuple(len(values) for _, values in grid_items)
+    unravelled = np.unravel_index(indices, shape)
+    return {name: values[idx] for (name, values), idx in zip(grid_items, unravelled)}
+
+
+def batch_tariff(base_tariff, values, n):
+    """기본 요금제 + 시나리오별 값 -> bill_components 에 넣을 배열 요금제"""
+    batch = {key: np.full(n, np.nan if base_tariff.get(key) is None else base_tariff[key], dtype=float)
+             for key in SCALAR_PARAMS}
+    rates = np.broadcast_to(energy_rate_matrix(base_tariff), (n, len(SEASONS), len(WORKTYPES))).copy()
+    for name, column in values.items():
+        parts = name.split(".")
+        if parts[0] == "energy_rates":
+            rates[:, SEASONS.index(parts[1]), WORKTYPES.index(parts[2])] = column
+        elif parts[0] != "energy_scale":
+            batch[name] = column
+    # 계절 배율은 개별 단가 지정 후 적용
+    for name, column in values.items():
+        parts = name.split(".")
+        if parts[0] == "energy_scale":
+            rates[:, SEASONS.index(parts[1]), :] *= column[:, None]
+    batch["energy_rate_matrix"] = rates
+    return batch
+
+
+# ========== 2. 시나리오 계산 ==========
+def evaluate_chunk(stats, base_tariff, grid_items, start, stop, top=None):
+    """시나리오 start~stop 일괄 계산, 총 요금 하위 top 개(또는 전체)의 인덱스/총액/월별 청구액 반환"""
+    n = stop - start
+    values = scenario_values(grid_items, np.arange(start, stop))
+    monthly = bill_components(stats, batch_tariff(base_tariff, values, n))["total"]
+    totals = monthly.sum(axis=1)
+
+    keep = np.arange(n)
+    if top is not None and top < n:
+        keep = np.argpartition(totals, top - 1)[:top]
+    return start + keep, totals[keep], monthly[keep]
+
+
+def run_sweep(stats, grid, base_tariff=None, top=20, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """격자 전체를 청크로 나눠 (필요하면 프로세스 병렬) 계산 후 총 요금 순위표와 월별 명세 반환"""
+    base_tariff = base_tariff or TARIFF_PLANS[DEFAULT_PLAN]
+    grid_items = validate_grid(grid)
+    total = grid_size(grid_items)
+    bounds = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+    if workers > 1 and len(bounds) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(evaluate_chunk, stats, base_tariff, grid_items, start, stop, top)
+                       for start, stop in bounds]
+            parts = [future.result() for future in futures]
+    else:
+        parts = [evaluate_chunk(stats, base_tariff, grid_items, start, stop, top) for start, stop in bounds]
+
+    indices = np.concatenate([p[0] for p in parts])
+    totals = np.concatenate([p[1] for p in parts])
+    monthly = np.concatenate([p[2] for p in parts])
+
+    order = np.argsort(totals, kind="stable")
+    if top is not None:
+        order = order[:top]
+    indices, totals, monthly = indices[order], totals[order], monthly[order]
+
+    ranking = pd.DataFrame(scenario_values(grid_items, indices), index=range(len(indices)))
+    ranking.insert(0, "시나리오", indices)
+    ranking.insert(0, "순위", np.arange(1, len(indices) + 1))
+    ranking["총 청구금액(원)"] = totals
+    if "actual_cost" in stats:
+        ranking["실측 대비(원)"] = totals - stats["actual_cost"].sum()
+
+    months = stats["months"].astype(str)
+    breakdown = pd.DataFrame(monthly, columns=months, index=pd.Index(indices, name="시나리오"))
+    return ranking, breakdown
+
+
+def sweep(df, grid, base_tariff=None, top=20, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """15분 데이터에 요금제 격자 적용 (월별 통계는 한 번만 계산)"""
+    stats = monthly_statistics(load_arrays(df))
+    return run_sweep(stats, grid, base_tariff, top=top, workers=workers, chunk_size=chunk_size)
+
+
+# ========== 3. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="요금제 시나리오 일괄 비교")
+    parser.add_argument("--data", default=TRAIN_PATH, help="15분 데이터 CSV")
+    parser.add_argument("--grid", required=True, help="요금 항목별 후보 목록 JSON 파일")
+    parser.add_argument("--plan", choices=list(TARIFF_PLANS), default=DEFAULT_PLAN, help="기준 요금제")
+    parser.add_argument("--top", type=int, default=20, help="저장할 상위 시나리오 수 (0이면 전체)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 프로세스 수")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="청크당 시나리오 수")
+    parser.add_argument("--out", default="./reports/tariff_sweep", help="출력 폴더")
+    args = parser.parse_args(argv)
+
+    with open(args.grid, encoding="utf-8") as f:
+        grid = json.load(f)
+
+    started = time.perf_counter()
+    stats = monthly_statistics(load_arrays(load_train_data(args.data)))
+    load_seconds = time.perf_counter() - started
+
+    grid_items = validate_grid(grid)
+    print(f"시나리오 {grid_size(grid_items):,}개 계산 시작 (워커 {args.workers}개)")
+    sweep_started = time.perf_counter()
+    ranking, breakdown = run_sweep(stats, grid, TARIFF_PLANS[args.plan], top=args.top or None,
+                                   workers=args.workers, chunk_size=args.chunk_size)
+    sweep_seconds = time.perf_counter() - sweep_started
+
+    os.makedirs(args.out, exist_ok=True)
+    ranking.to_csv(os.path.join(args.out, "ranking.csv"), index=False, encoding="utf-8-sig")
+    breakdown.to_csv(os.path.join(args.out, "monthly.csv"), encoding="utf-8-sig")
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "data": args.data,
+            "data_version": data_version(args.data),
+            "plan": args.plan,
+            "grid": grid,
+            "scenarios": grid_size(grid_items),
+            "load_seconds": round(load_seconds, 3),
+            "sweep_seconds": round(sweep_seconds, 3),
+        }, f, ensure_ascii=False, indent=2)
+
+    print(ranking.head(10).to_string(index=False))
+    print(f"완료: {sweep_seconds:.2f}초 -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
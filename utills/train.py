@@ -0,0 +1,424 @@
+"""요금 예측 모델 학습 파이프라인 (models/ 산출물 재생성)
+
+단계: 데이터 로드 -> 특성(캐시) -> XGBoost(hist, 멀티스레드) -> LSTM -> 시험 구간 측정값 예측 -> 예측 CSV
+산출물은 models/versions/<버전>/ 에 저장하고 manifest.json 에 설정, 데이터 버전, 단계별 소요 시간,
+검증 구간(마지막 valid_days 일) 지표를 기록한다. --publish 를 주면 대시보드가 읽는 ./models/ 로 복사한다.
+기본 학습 모델은 XGBoost 이다. LSTM 학습에는 TensorFlow(Keras) 가 필요하다
+(pip install -r requirements-train.txt, 추론은 utills.model 의 NumPy 구현 사용).
+
+사용 예:
+    python -m utills.train
+    python -m utills.train --models xgboost lstm   # LSTM 포함 (requirements-train.txt)
+    python -m utills.train --models xgboost --threads 8 --publish
+    python -m utills.train --data ./data/train.csv --test ./data/test.csv --valid-days 30
+    python -m utills.train --models xgboost --params ./reports/tuning/xgboost-bayes/best_params.json
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import argparse
+import importlib
+import importlib.util
+from datetime import datetime
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, load_train_data, data_version
+from utills.features import FEATURE_COLUMNS, TARGET_COLUMN, build_features, feature_matrix
+from utills.forecast import MeasurementForecaster, forecast_features
+from utills.model import (COST_MODELS, DEFAULT_TRAIN_MODELS, MAX_CONTEXT, SEQUENCE_LENGTH, SEQUENCE_COLUMNS,
+                          STATIC_COLUMNS, LSTM_LAYER_NAMES, XGBoostCostModel, LSTMCostModel, fit_lstm_scaler,
+                          scaler_arrays, lstm_inputs)
+
+TEST_PATH = "./data/test.csv"
+MODELS_DIR = "./models"
+VERSIONS_DIR = "./models/versions"
+TRAIN_CACHE_DIR = "./.cache/train"
+
+DEFAULT_SEED = 42
+DEFAULT_VALID_DAYS = 30
+
+# 기존 xgboost.pkl 과 같은 설정 + 히스토그램 방식
+XGBOOST_PARAMS = {
+    "n_estimators": 800,
+    "max_depth": 6,
+    "learning_rate": 0.05,
+    "subsample": 0.9,
+    "colsample_bytree": 0.9,
+    "objective": "reg:squarederror",
+    "tree_method": "hist",
+}
+
+# 기존 lstm.h5 학습 설정 (MAE 손실, Adam 2.5e-4)
+LSTM_PARAMS = {
+    "sequence_units": 64,
+    "summary_units": 32,
+    "static_units": 32,
+    "hidden_units": 64,
+    "dropout": 0.2,
+    "hidden_dropout": 0.3,
+    "learning_rate": 2.5e-4,
+    "epochs": 50,
+    "batch_size": 256,
+    "patience": 5,
+}
+
+# 시험 구간(test.csv) 측정값은 학습 이력에서 이어지는 recursive 예측으로 만든다
+TEST_FORECAST_STRATEGY = "recursive"
+
+# 예측 CSV 파일명 (대시보드가 읽는 이름)
+PREDICTION_FILES = {
+    "xgboost": {"features": "target_pred_feature_xgboost.csv", "target": "xgb_target.csv"},
+    "lstm": {"features": "target_pred_feature_lstm.csv", "target": "lstm_target.csv",
+             "target_with_time": "final_lstm_target.csv"},
+}
+ARTIFACT_FILES = {"xgboost": ["xgboost.pkl"], "lstm": ["lstm.h5", "lstm_scaler.json"]}
+
+
+# ========== 1. 단계 기록 / 캐시 ==========
+class StageTimer:
+    """단계별 소요 시간 기록"""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        print(f"[{name}] 시작")
+        yield
+        self.seconds[name] = round(time.perf_counter() - started, 3)
+        print(f"[{name}] 완료 {self.seconds[name]:.1f}초")
+
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def cached(cache_dir, key_config, compute):
+    """key_config 해시로 pickle 캐시 (없으면 compute() 결과 저장). (값, 적중 여부) 반환"""
+    if not cache_dir:
+        return compute(), False
+    path = os.path.join(cache_dir, f"{config_hash(key_config)}.pkl")
+    if os.path.exists(path):
+        return pd.read_pickle(path), True
+    value = compute()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle(value, tmp_path)
+    os.replace(tmp_path, path)
+    return value, False
+
+
+def file_digest(path):
+    """파일 내용 sha1 (산출물 재현 여부 확인용)"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def regression_metrics(actual, predicted):
+    """MAE / MAPE(실측 0 제외) / RMSE"""
+    actual = np.asarray(actual, dtype=float)
+    error = np.asarray(predicted, dtype=float) - actual
+    nonzero = actual > 0
+    return {
+        "MAE": float(np.mean(np.abs(error))),
+        "MAPE(%)": float(np.mean(np.abs(error[nonzero]) / actual[nonzero]) * 100) if nonzero.any() else None,
+        "RMSE": float(np.sqrt(np.mean(error ** 2))),
+        "구간 수": int(len(actual)),
+    }
+
+
+def load_test_frame(path=TEST_PATH):
+    """시험 구간(id, 측정일시, 작업유형), 시간순"""
+    test = pd.read_csv(path, parse_dates=["측정일시"]).sort_values("측정일시").reset_index(drop=True)
+    expected = pd.date_range(test["측정일시"].iloc[0], periods=len(test), freq="15min")
+    if not (test["측정일시"].to_numpy() == expected.to_numpy()).all():
+        raise ValueError(f"{path}: 측정일시가 15분 간격으로 연속되지 않습니다")
+    return test
+
+
+# ========== 2. 모델 학습 ==========
+def train_xgboost(X, y, valid, params, threads, seed, refit=True):
+    """검증 구간 지표를 기록한 뒤 (refit 이면) 전체 데이터로 다시 학습 (검증 구간이 없으면 한 번만 학습, 지표 None)"""
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor(**params, n_jobs=threads, random_state=seed)
+    model.fit(X[~valid], y[~valid])
+    if not valid.any():
+        return model, None
+    metrics = regression_metrics(y[valid], model.predict(X[valid]))
+    if refit:
+        model = XGBRegressor(**params, n_jobs=threads, random_state=seed)
+        model.fit(X, y)
+    return model, metrics
+
+
+def build_lstm(params):
+    """lstm.h5 와 같은 구조의 Keras 모델 (층 이름도 NumPy 추론이 읽는 이름 그대로)"""
+    from tensorflow import keras
+
+    names = LSTM_LAYER_NAMES
+    # 시퀀스 길이는 utills.tune 결과로 바꿀 수 있음 (NumPy 추론은 저장된 입력 크기를 읽음)
+    sequence_length = params.get("sequence_length", SEQUENCE_LENGTH)
+    sequence_input = keras.Input((sequence_length, len(SEQUENCE_COLUMNS)), name="sequence_input")
+    static_input = keras.Input((len(STATIC_COLUMNS),), name="static_input")
+    h = keras.layers.LSTM(params["sequence_units"], return_sequences=True, dropout=params["dropout"],
+                          name=names["sequence_lstm"])(sequence_input)
+    h = keras.layers.BatchNormalization(name=names["sequence_norm"])(h)
+    h = keras.layers.LSTM(params["summary_units"], dropout=params["dropout"], name=names["summary_lstm"])(h)
+    h = keras.layers.BatchNormalization(name=names["summary_norm"])(h)
+    s = keras.layers.Dense(params["static_units"], activation="relu", name=names["static_dense"])(static_input)
+    s = keras.layers.Dropout(params["dropout"])(s)
+    x = keras.layers.Concatenate()([h, s])
+    x = keras.layers.Dense(params["hidden_units"], activation="relu", name=names["hidden_dense"])(x)
+    x = keras.layers.Dropout(params["hidden_dropout"])(x)
+    output = keras.layers.Dense(1, name=names["output"])(x)
+    model = keras.Model([sequence_input, static_input], output)
+    model.compile(optimizer=keras.optimizers.Adam(params["learning_rate"]), loss="mae", metrics=["mse"])
+    return model
+
+
+def train_lstm(features, y, valid, params, threads, seed, model_path, scaler_path):
+    """LSTM 학습 후 h5 + 표준화 JSON 저장, 검증 지표는 저장한 산출물(NumPy 추론)로 계산"""
+    import tensorflow as tf
+    from tensorflow import keras
+
+    keras.utils.set_random_seed(seed)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(max(1, threads // 2))
+
+    # 표준화는 학습 구간으로만 계산
+    train_part = ~valid
+    scaler = fit_lstm_scaler(features[train_part], y[train_part])
+    arrays = scaler_arrays(scaler)
+    sequence_length = params.get("sequence_length", SEQUENCE_LENGTH)
+    rows = np.arange(sequence_length - 1, len(features))
+    train_rows, valid_rows = rows[train_part[rows]], rows[valid[rows]]
+    target = (y - scaler["target_mean"]) / scaler["target_scale"]
+
+    model = build_lstm(params)
+    model.fit(
+        list(lstm_inputs(features, train_rows, arrays, sequence_length)), target[train_rows],
+        validation_data=(list(lstm_inputs(features, valid_rows, arrays, sequence_length)), target[valid_rows]),
+        epochs=params["epochs"], batch_size=params["batch_size"], shuffle=True, verbose=2,
+        callbacks=[keras.callbacks.EarlyStopping(patience=params["patience"], restore_best_weights=True)],
+    )
+    model.save(model_path)
+    with open(scaler_path, "w", encoding="utf-8") as f:
+        json.dump(scaler, f, ensure_ascii=False, indent=2)
+
+    saved = LSTMCostModel(model_path, scaler_path=scaler_path)
+    return regression_metrics(y[valid_rows], saved.predict(features, valid_rows))
+
+
+# ========== 3. 예측 CSV ==========
+def test_features(train, test, params, seed):
+    """test.csv 구간 측정값을 학습 이력에서 이어 예측 -> (특성 표, 예측 구간 행 위치)"""
+    forecaster = MeasurementForecaster(TEST_FORECAST_STRATEGY, horizon=len(test),
+                                       params={"random_state": seed, **params})
+    forecaster.fit(train)
+    _, features, rows = forecast_features(train, [test["측정일시"].iloc[0]], forecaster, horizon=len(test),
+                                          context=MAX_CONTEXT, worktypes=test[["측정일시", "작업유형"]])
+    return features, rows
+
+
+def cached_test_features(train, test, versions, threads, seed, cache_dir=TRAIN_CACHE_DIR):
+    """test_features 결과 캐시 (학습/시험 데이터 버전 기준). ((특성 표, 행 위치), 적중 여부) 반환"""
+    forecast_params = {"n_jobs": threads}
+    key = {"stage": "test_features", **versions, "strategy": TEST_FORECAST_STRATEGY, "context": MAX_CONTEXT,
+           "params": forecast_params, "seed": seed}
+    return cached(cache_dir, key, lambda: test_features(train, test, forecast_params, seed))
+
+
+def load_artifact(version_dir, name):
+    """버전 폴더의 모델 산출물 -> 요금 예측 모델"""
+    if name == "xgboost":
+        return XGBoostCostModel(os.path.join(version_dir, "xgboost.pkl"))
+    return LSTMCostModel(os.path.join(version_dir, "lstm.h5"),
+                         scaler_path=os.path.join(version_dir, "lstm_scaler.json"))
+
+
+def predict_test(version_dir, models, test, features, rows):
+    """버전 폴더 모델로 시험 구간 예측 CSV 작성 -> 파일 목록"""
+    files = []
+    for name in models:
+        predicted = load_artifact(version_dir, name).predict(features, rows)
+        files += write_predictions(version_dir, name, test, features, rows, predicted)
+    return files
+
+
+def write_predictions(out_dir, name, test, features, rows, predicted):
+    """대시보드용 예측 CSV (기존 models/ 파일과 같은 열 구성)"""
+    files = PREDICTION_FILES[name]
+    table = features.iloc[rows][FEATURE_COLUMNS].reset_index(drop=True)
+    table["측정일시"] = test["측정일시"].to_numpy()
+    table["id"] = test["id"].to_numpy()
+    table["target"] = predicted
+    table.to_csv(os.path.join(out_dir, files["features"]), index=False)
+    table[["id", "target"]].to_csv(os.path.join(out_dir, files["target"]), index=False)
+    if "target_with_time" in files:
+        table[["id", "target", "측정일시"]].to_csv(os.path.join(out_dir, files["target_with_time"]), index=False)
+    return list(files.values())
+
+
+def trained_until(timestamps, valid, models, refit=True):
+    """모델별 학습 데이터 마지막 시각 (LSTM 은 검증 구간을 조기 종료에 쓰므로 끝까지 본 것으로 봄)"""
+    last = timestamps.iloc[-1].isoformat()
+    fit_last = timestamps[~valid].iloc[-1].isoformat() if (~valid).any() else last
+    return {name: fit_last if name == "xgboost" and not refit else last for name in models}
+
+
+def publish(version_dir, files, models_dir=MODELS_DIR):
+    """버전 폴더 산출물을 대시보드가 읽는 폴더로 복사 (파일마다 임시 파일 -> 교체)"""
+    for filename in files:
+        target = os.path.join(models_dir, filename)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        shutil.copy2(os.path.join(version_dir, filename), tmp_path)
+        os.replace(tmp_path, target)
+
+
+def package_versions(names=("numpy", "pandas", "xgboost", "tensorflow")):
+    versions = {}
+    for name in names:
+        try:
+            versions[name] = importlib.import_module(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+# ========== 4. 파이프라인 ==========
+def run_pipeline(data_path=TRAIN_PATH, test_path=TEST_PATH, models=None, valid_days=DEFAULT_VALID_DAYS,
+                 threads=None, seed=DEFAULT_SEED, xgboost_params=None, lstm_params=None,
+                 versions_dir=VERSIONS_DIR, cache_dir=TRAIN_CACHE_DIR, refit=True):
+    """전체 학습 실행 -> (버전 폴더, manifest dict)"""
+    models = list(models or DEFAULT_TRAIN_MODELS)
+    if "lstm" in models and importlib.util.find_spec("tensorflow") is None:
+        raise RuntimeError("LSTM 학습에는 tensorflow 가 필요합니다 (pip install -r requirements-train.txt)")
+    threads = threads or os.cpu_count() or 1
+    xgboost_params = {**XGBOOST_PARAMS, **(xgboost_params or {})}
+    lstm_params = {**LSTM_PARAMS, **(lstm_params or {})}
+    np.random.seed(seed)
+    timer = StageTimer()
+    cache_hits = {}
+
+    with timer.stage("load"):
+        train = load_train_data(data_path).sort_values("측정일시").reset_index(drop=True)
+        test = load_test_frame(test_path) if test_path else None
+        versions = {"data": data_version(data_path), "test": data_version(test_path) if test_path else None}
+
+    config = {"versions": versions, "models": models, "valid_days": valid_days, "seed": seed, "refit": refit,
+              "xgboost": xgboost_params, "lstm": lstm_params if "lstm" in models else None,
+              "features": FEATURE_COLUMNS}
+    version = f"{datetime.now():%Y%m%d-%H%M%S}-{config_hash(config)[:8]}"
+    version_dir = os.path.join(versions_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    with timer.stage("features"):
+        features, cache_hits["train_features"] = cached(
+            cache_dir, {"stage": "train_features", "data": versions["data"], "features": FEATURE_COLUMNS},
+            lambda: build_features(train))
+        y = train[TARGET_COLUMN].to_numpy(dtype=float)
+        valid = (train["측정일시"] > train["측정일시"].iloc[-1] - pd.Timedelta(days=valid_days)).to_numpy()
+
+    metrics = {}
+    if "xgboost" in models:
+        with timer.stage("xgboost"):
+            model, metrics["xgboost"] = train_xgboost(feature_matrix(features), y, valid,
+                                                      xgboost_params, threads, seed, refit)
+            with open(os.path.join(version_dir, "xgboost.pkl"), "wb") as f:
+                pickle.dump(model, f)
+    if "lstm" in models:
+        with timer.stage("lstm"):
+            metrics["lstm"] = train_lstm(features, y, valid, lstm_params, threads, seed,
+                                         os.path.join(version_dir, "lstm.h5"),
+                                         os.path.join(version_dir, "lstm_scaler.json"))
+
+    files = [filename for name in models for filename in ARTIFACT_FILES[name]]
+    if test is not None:
+        with timer.stage("test_features"):
+            (future, rows), cache_hits["test_features"] = cached_test_features(train, test, versions, threads,
+                                                                               seed, cache_dir)
+        with timer.stage("predict"):
+            files += predict_test(version_dir, models, test, future, rows)
+
+    manifest = {
+        "version": version,
+        "kind": "full",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "data": data_path,
+        "test": test_path,
+        "data_versions": versions,
+        "models": models,
+        "seed": seed,
+        "threads": threads,
+        "valid_days": valid_days,
+        "refit": refit,
+        "params": {"xgboost": xgboost_params, "lstm": lstm_params},
+        "metrics": metrics,
+        # 모델별 학습에 쓴 마지막 구간 (utills.retrain 이 이후 데이터로만 검증하도록)
+        "trained_until": trained_until(train["측정일시"], valid, models, refit),
+        "stages": timer.seconds,
+        "cache_hits": cache_hits,
+        "packages": package_versions(),
+        "files": {filename: file_digest(os.path.join(version_dir, filename)) for filename in files},
+    }
+    with open(os.path.join(version_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return version_dir, manifest
+
+
+# ========== 5. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="요금 예측 모델 학습")
+    parser.add_argument("--data", default=TRAIN_PATH, help="학습 15분 데이터 CSV")
+    parser.add_argument("--test", default=TEST_PATH, help="예측 CSV 를 만들 시험 구간 CSV (빈 값이면 생략)")
+    parser.add_argument("--models", nargs="+", choices=list(COST_MODELS), default=list(DEFAULT_TRAIN_MODELS),
+                        help="학습할 모델 (lstm 은 requirements-train.txt 필요)")
+    parser.add_argument("--valid-days", type=int, default=DEFAULT_VALID_DAYS, help="검증 구간 일수 (마지막 N일)")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="학습 스레드 수")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="난수 시드")
+    parser.add_argument("--no-refit", action="store_true", help="XGBoost 를 검증 구간 제외 데이터로만 학습")
+    parser.add_argument("--params", help="모델별 하이퍼파라미터 JSON ({\"xgboost\": {...}, \"lstm\": {...}}, utills.tune 결과)")
+    parser.add_argument("--no-cache", action="store_true", help="특성 캐시 사용 안 함")
+    parser.add_argument("--out", default=VERSIONS_DIR, help="버전 폴더 상위 경로")
+    parser.add_argument("--publish", action="store_true", help="완료 후 ./models/ 산출물 교체")
+    parser.add_argument("--register", action="store_true", help="완료 후 모델 레지스트리에 등록하고 현재 버전으로 지정")
+    args = parser.parse_args(argv)
+
+    params = {}
+    if args.params:
+        with open(args.params, encoding="utf-8") as f:
+            params = json.load(f)
+
+    version_dir, manifest = run_pipeline(
+        args.data, args.test or None, models=args.models, valid_days=args.valid_days, threads=args.threads,
+        seed=args.seed, xgboost_params=params.get("xgboost"), lstm_params=params.get("lstm"), versions_dir=args.out,
+        cache_dir=None if args.no_cache else TRAIN_CACHE_DIR, refit=not args.no_refit)
+
+    for name, values in manifest["metrics"].items():
+        print(f"{name}: 검증 MAE {values['MAE']:,.1f} / RMSE {values['RMSE']:,.1f}")
+    if args.publish:
+        publish(version_dir, manifest["files"])
+        print(f"배포: {version_dir} -> {MODELS_DIR}")
+    if args.register:
+        from utills.registry import ModelRegistry
+
+        for name, version in ModelRegistry().register_run(version_dir, promote=True).items():
+            print(f"레지스트리: {name} {version}")
+    print(f"완료: {sum(manifest['stages'].values()):.1f}초 -> {version_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""XGBoost 트리를 NumPy 배열로 컴파일한 벡터화 평가기 (xgboost 없이 예측)
+
+xgboost.pkl 의 트리를 같은 깊이의 완전 이진 트리 배열로 펼친다 (분기 특성, 임계값, 결측 시 방향, 잎 값).
+자식 위치는 2i+1 / 2i+2 로 계산되므로, 배치의 모든 행 x 모든 트리를 깊이만큼 한꺼번에 내려가면 된다.
+xgboost 와 같이 특성값을 float32 로 비교하고(x < 임계값 이면 왼쪽, 결측이면 기본 방향) 잎 값 합 + base_score 를 낸다.
+컴파일 결과는 <pkl 이름>_trees.npz 로 저장하고, pkl 이 바뀌면 처음 로드할 때 다시 컴파일한다.
+대시보드처럼 몇 구간씩 자주 예측할 때 xgboost import / pickle 로드 / DMatrix 생성 비용이 없다.
+
+사용 예:
+    python -m utills.tree_model                      # models/xgboost.pkl 컴파일 + xgboost 결과와 비교 + 속도 측정
+    python -m utills.tree_model --model ./models/versions/<버전>/xgboost.pkl --batch-sizes 1 8 96
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from utills.data import data_version
+from utills.features import FEATURE_COLUMNS, feature_matrix
+from utills.model import XGBOOST_PATH
+
+# 한 번에 평가하는 행 수 (행 x 트리 위치 배열 크기 제한)
+PREDICT_CHUNK_ROWS = 1024
+# 완전 이진 트리로 펼치므로 깊이가 너무 깊으면 배열이 커짐
+MAX_DEPTH = 12
+TREE_ARRAYS = ["feature", "threshold", "default_left", "value"]
+
+
+# ========== 1. 컴파일 ==========
+def compile_booster(booster):
+    """xgboost Booster -> 완전 이진 트리 배열 dict (+ depth, base_score, features)
+
+    트리마다 깊이 depth 의 완전 이진 트리로 펼친다 (힙 순서: 노드 i 의 자식은 2i+1, 2i+2).
+    depth 보다 얕은 잎은 아래 잎 칸을 모두 같은 값으로 채우므로, 어느 쪽으로 내려가도 결과가 같다.
+    """
+    model = json.loads(booster.save_raw("json"))["learner"]
+    if model["objective"]["name"] != "reg:squarederror":
+        raise ValueError(f"지원하지 않는 objective: {model['objective']['name']}")
+    param = model["learner_model_param"]
+    if int(param.get("num_target", 1)) != 1 or int(param.get("num_class", 0)) != 0:
+        raise ValueError("단일 출력 회귀 모델만 컴파일할 수 있습니다")
+
+    trees = model["gradient_booster"]["model"]["trees"]
+    depth = max(_tree_depth(tree["left_children"], tree["right_children"]) for tree in trees)
+    if depth > MAX_DEPTH:
+        raise ValueError(f"트리 깊이 {depth} 는 지원하지 않습니다 (최대 {MAX_DEPTH})")
+    n_internal, n_leaves = 2 ** depth - 1, 2 ** depth
+    arrays = {
+        "feature": np.zeros((len(trees), n_internal), dtype=np.int32),
+        "threshold": np.zeros((len(trees), n_internal), dtype=np.float32),
+        "default_left": np.ones((len(trees), n_internal), dtype=bool),
+        "value": np.zeros((len(trees), n_leaves), dtype=np.float32),
+    }
+    for t, tree in enumerate(trees):
+        if any(tree["split_type"]):
+            raise ValueError("범주형 분기가 있는 트리는 지원하지 않습니다")
+        # (원래 노드, 힙 위치, 깊이)
+        stack = [(0, 0, 0)]
+        while stack:
+            node, position, level = stack.pop()
+            left, right = tree["left_children"][node], tree["right_children"][node]
+            if left == -1:
+                # 잎 노드의 split_conditions 는 학습률이 반영된 잎 값
+                first = (position - (2 ** level - 1)) * 2 ** (depth - level)
+                arrays["value"][t, first:first + 2 ** (depth - level)] = tree["split_conditions"][node]
+                continue
+            arrays["feature"][t, position] = tree["split_indices"][node]
+            arrays["threshold"][t, position] = tree["split_conditions"][node]
+            arrays["default_left"][t, position] = bool(tree["default_left"][node])
+            stack += [(left, 2 * position + 1, level + 1), (right, 2 * position + 2, level + 1)]
+
+    base_score = float(param["base_score"].strip("[]"))
+    names = model.get("feature_names") or FEATURE_COLUMNS
+    return {**arrays, "depth": depth, "base_score": base_score, "features": list(names)}
+
+
+def _tree_depth(left, right):
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [child for node in frontier for child in (left[node], right[node]) if child != -1]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def save_trees(path, trees, source_version=None):
+    """컴파일 결과 저장 (.npz 는 파일 하나, 폴더 경로면 배열별 .npy + meta.json 으로 메모리 매핑 가능)"""
+    meta = {"depth": trees["depth"], "base_score": trees["base_score"], "features": trees["features"],
+            "source_version": source_version}
+    if path.endswith(".npz"):
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                 **{name: trees[name] for name in TREE_ARRAYS})
+        os.replace(tmp_path, path)
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in TREE_ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), trees[name])
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def load_trees(path, mmap=False):
+    """save_trees 결과 -> (배열 dict, meta)"""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return {name: data[name] for name in TREE_ARRAYS}, meta
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in TREE_ARRAYS}, meta
+
+
+# ========== 2. 평가 ==========
+class TreeEnsemble:
+    """완전 이진 트리 배열 앙상블 (모든 행 x 모든 트리를 depth 단계에 내려감)"""
+
+    def __init__(self, arrays, depth, base_score, features=FEATURE_COLUMNS):
+        n_trees = len(arrays["value"])
+        # 트리별 배열을 평평하게 두고 트리 시작 위치를 더해 한 번에 꺼냄
+        self.feature = np.asarray(arrays["feature"]).reshape(-1)
+        self.threshold = np.asarray(arrays["threshold"]).reshape(-1)
+        self.default_left = np.asarray(arrays["default_left"]).reshape(-1)
+        self.value = np.asarray(arrays["value"]).reshape(-1)
+        self.internal_base = (np.arange(n_trees, dtype=np.int32) * (2 ** depth - 1))
+        self.leaf_base = np.arange(n_trees, dtype=np.int32) * 2 ** depth - (2 ** depth - 1)
+        self.n_trees = n_trees
+        self.depth = depth
+        self.base_score = base_score
+        self.features = list(features)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        arrays, meta = load_trees(path, mmap)
+        return cls(arrays, meta["depth"], meta["base_score"], meta["features"])
+
+    def predict(self, X):
+        """(n, 특성 수) 행렬 -> (n,) 예측"""
+        X = np.asarray(X, dtype=np.float32)
+        result = np.empty(len(X))
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            result[start:start + PREDICT_CHUNK_ROWS] = self._predict_chunk(X[start:start + PREDICT_CHUNK_ROWS])
+        return result
+
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        flat_x = X.reshape(-1)
+        row_base = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        has_missing = np.isnan(flat_x).any()
+        position = np.zeros((n_rows, self.n_trees), dtype=np.int32)
+        for _ in range(self.depth):
+            node = position + self.internal_base
+            x = flat_x.take(row_base + self.feature.take(node))
+            go_right = x >= self.threshold.take(node)
+            if has_missing:
+                # 결측값은 학습 때 정한 기본 방향 (x >= 임계값 비교는 NaN 이면 False)
+                go_right |= np.isnan(x) & ~self.default_left.take(node)
+            position = 2 * position + 1 + go_right
+        return self.value.take(position + self.leaf_base).sum(axis=1, dtype=np.float64) + self.base_score
+
+
+# ========== 3. 요금 모델 ==========
+def trees_path(pkl_path):
+    return os.path.splitext(pkl_path)[0] + "_trees.npz"
+
+
+def compile_pickle(pkl_path, out_path=None):
+    """xgboost.pkl -> 컴파일 파일 저장 -> 저장 경로 (xgboost 필요)"""
+    from utills.model import XGBoostCostModel
+
+    out_path = out_path or trees_path(pkl_path)
+    booster = XGBoostCostModel(pkl_path).model.get_booster()
+    save_trees(out_path, compile_booster(booster), source_version=data_version(pkl_path))
+    return out_path
+
+
+class CompiledXGBoostModel:
+    """xgboost.pkl 을 컴파일한 트리로 예측하는 요금 모델 (XGBoostCostModel 과 같은 인터페이스)"""
+
+    name = "xgboost"
+    context = 6
+    input_window = 1
+
+    def __init__(self, path=XGBOOST_PATH):
+        self.path = path
+        self.trees_path = trees_path(path)
+        source_version = data_version(path) if os.path.exists(path) else None
+        if not os.path.exists(self.trees_path) or (
+                source_version and load_trees(self.trees_path)[1]["source_version"] != source_version):
+            # pkl 이 새로 배포되면 한 번만 다시 컴파일
+            compile_pickle(path, self.trees_path)
+        self.ensemble = TreeEnsemble.load(self.trees_path)
+        if self.ensemble.features != FEATURE_COLUMNS:
+            raise ValueError(f"{self.trees_path}: 특성 스키마가 현재 코드와 다릅니다")
+
+    @property
+    def version(self):
+        return data_version(self.path)
+
+    def predict(self, features, rows=None):
+        return self.ensemble.predict(feature_matrix(features, rows))
+
+
+# ========== 4. 실행 (컴파일 + 검증 + 속도 비교) ==========
+def _best_seconds(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="XGBoost 트리 컴파일 + 검증")
+    parser.add_argument("--model", default=XGBOOST_PATH, help="xgboost.pkl 경로")
+    parser.add_argument("--data", default="./data/train.csv", help="검증용 15분 데이터 CSV")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 96, 2976], help="속도 비교 배치 크기")
+    parser.add_argument("--repeat", type=int, default=20, help="속도 측정 반복 횟수 (최솟값 사용)")
+    args = parser.parse_args(argv)
+
+    from utills.data import load_train_data
+    from utills.features import build_features
+    from utills.model import XGBoostCostModel
+
+    started = time.perf_counter()
+    out_path = compile_pickle(args.model)
+    print(f"컴파일: {time.perf_counter() - started:.2f}초 -> {out_path}")
+
+    started = time.perf_counter()
+    compiled = TreeEnsemble.load(out_path)
+    load_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    booster = XGBoostCostModel(args.model).model.get_booster()
+    xgb_load_seconds = time.perf_counter() - started
+    print(f"로드: 컴파일 {load_seconds * 1000:.1f}ms / xgboost.pkl {xgb_load_seconds * 1000:.1f}ms "
+          f"(트리 {compiled.n_trees}개, 깊이 {compiled.depth})")
+
+    X = feature_matrix(build_features(load_train_data(args.data)))
+    expected = booster.inplace_predict(X)
+    actual = compiled.predict(X)
+    error = np.abs(actual - expected)
+    print(f"xgboost 대비 오차: 최대 {error.max():.2e}, 상대 최대 {(error / np.maximum(np.abs(expected), 1)).max():.2e}")
+    if not np.allclose(actual, expected, rtol=1e-5, atol=1e-2):
+        print("경고: xgboost 결과와 허용 오차 이상 차이 납니다")
+        return 1
+
+    for size in args.batch_sizes:
+        batch = X[:size]
+        ours = _best_seconds(lambda: compiled.predict(batch), args.repeat)
+        theirs = _best_seconds(lambda: booster.inplace_predict(batch), args.repeat)
+        print(f"배치 {size:>5}: 컴파일 {ours * 1000:8.3f}ms / xgboost {theirs * 1000:8.3f}ms ({theirs / ours:.1f}배)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
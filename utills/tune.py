@@ -0,0 +1,570 @@
+"""요금 예측 모델 하이퍼파라미터 탐색 (random / bayes / halving)
+
+train.csv 를 월 단위 확장 창 폴드(마지막 n개월을 차례로 검증)로 나누고, 후보 설정을 프로세스 풀에서 병렬 평가한다.
+    - random: 탐색 공간에서 무작위 추출
+    - bayes: 앞선 시행으로 가우시안 과정 회귀를 학습해 기대 개선량(EI)이 가장 큰 후보 선택
+    - halving: 적은 예산(XGBoost 트리 수 / LSTM epoch)으로 많은 후보를 평가하고 상위 1/eta 만 예산을 늘려 다시 평가
+각 폴드는 학습 구간 마지막 EARLY_STOPPING_DAYS 일로 조기 종료하고, 폴드를 하나 마칠 때마다 누적 MAE 가
+같은 예산의 완료 시행 분위수보다 나쁘면 남은 폴드를 건너뛴다(pruned).
+특성 행렬/폴드 경계는 .cache/tune 에 저장하고 시행 결과는 SQLite(reports/tuning/trials.sqlite) 에 기록하므로,
+같은 --study 로 다시 실행하면 끝난 시행은 건너뛰고 이어서 탐색한다.
+LSTM 탐색(시퀀스 길이 포함)에는 TensorFlow(Keras) 가 필요하다 (requirements-train.txt).
+
+사용 예:
+    python -m utills.tune --model xgboost --search random --trials 40 --workers 4
+    python -m utills.tune --model xgboost --search bayes --trials 60
+    python -m utills.tune --model xgboost --search halving --trials 27 --eta 3
+    python -m utills.tune --model lstm --search random --trials 12 --study lstm-window
+"""
+import os
+import sys
+import json
+import math
+import time
+import sqlite3
+import argparse
+import warnings
+import importlib.util
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from utills.data import TRAIN_PATH, load_train_data, data_version
+from utills.features import FEATURE_COLUMNS, TARGET_COLUMN, build_features, feature_matrix
+from utills.backtest import make_folds
+from utills.model import fit_lstm_scaler, scaler_arrays, lstm_inputs
+from utills.train import DEFAULT_SEED, XGBOOST_PARAMS, LSTM_PARAMS, cached, build_lstm
+
+TUNE_CACHE_DIR = "./.cache/tune"
+TUNING_DIR = "./reports/tuning"
+TRIALS_DB = "./reports/tuning/trials.sqlite"
+SEARCH_METHODS = ["random", "bayes", "halving"]
+
+# 검증 폴드 수 (마지막 N개월) / 폴드마다 학습 구간 끝에서 떼어 조기 종료에 쓰는 일수
+DEFAULT_FOLDS = 3
+EARLY_STOPPING_DAYS = 7
+EARLY_STOPPING_ROUNDS = 50
+
+# 같은 예산의 완료 시행이 PRUNE_MIN_TRIALS 개 이상일 때부터, 누적 MAE 가 분위수보다 나쁘면 중단
+PRUNE_MIN_TRIALS = 5
+DEFAULT_PRUNE_QUANTILE = 0.5
+
+# bayes: 처음 몇 개는 무작위로 뽑고, 이후 무작위 후보 BAYES_CANDIDATES 개 중 EI 최대 선택
+BAYES_STARTUP_TRIALS = 8
+BAYES_CANDIDATES = 2000
+
+DEFAULT_ETA = 3
+
+# 탐색 공간: int/float/log 는 (종류, 하한, 상한), choice 는 (종류, 후보 목록)
+SEARCH_SPACES = {
+    "xgboost": {
+        "max_depth": ("int", 3, 10),
+        "learning_rate": ("log", 0.01, 0.3),
+        "subsample": ("float", 0.5, 1.0),
+        "colsample_bytree": ("float", 0.5, 1.0),
+        "min_child_weight": ("log", 1.0, 50.0),
+        "reg_lambda": ("log", 0.1, 20.0),
+        "gamma": ("float", 0.0, 5.0),
+    },
+    "lstm": {
+        "sequence_length": ("choice", [16, 24, 48, 96, 192]),
+        "sequence_units": ("choice", [32, 64, 128]),
+        "summary_units": ("choice", [16, 32, 64]),
+        "dropout": ("float", 0.0, 0.4),
+        "learning_rate": ("log", 1e-4, 3e-3),
+    },
+}
+
+# 예산 (파라미터 이름, halving 최소값, 최대값) - random/bayes 는 최대값 + 조기 종료
+BUDGETS = {"xgboost": ("n_estimators", 100, 2000), "lstm": ("epochs", 2, 50)}
+
+# 워커가 공유하는 데이터셋 (fork 시 부모 메모리를 그대로 공유) / 워커별 폴드 DMatrix
+_DATASET = {}
+_MATRICES = {}
+
+
+# ========== 1. 탐색 공간 ==========
+def decode(space, unit):
+    """[0, 1) 벡터 -> 파라미터 dict"""
+    params = {}
+    for u, (name, spec) in zip(unit, space.items()):
+        kind = spec[0]
+        if kind == "choice":
+            options = spec[1]
+            params[name] = options[min(int(u * len(options)), len(options) - 1)]
+        elif kind == "int":
+            params[name] = int(round(spec[1] + u * (spec[2] - spec[1])))
+        elif kind == "log":
+            params[name] = float(f"{math.exp(math.log(spec[1]) + u * math.log(spec[2] / spec[1])):.4g}")
+        else:
+            params[name] = float(f"{spec[1] + u * (spec[2] - spec[1]):.4g}")
+    return params
+
+
+def encode(space, params):
+    """파라미터 dict -> [0, 1] 벡터 (bayes 회귀 입력)"""
+    unit = []
+    for name, spec in space.items():
+        value, kind = params[name], spec[0]
+        if kind == "choice":
+            unit.append((spec[1].index(value) + 0.5) / len(spec[1]))
+        elif kind == "log":
+            unit.append(math.log(value / spec[1]) / math.log(spec[2] / spec[1]))
+        else:
+            unit.append((value - spec[1]) / (spec[2] - spec[1]))
+    return np.array(unit)
+
+
+def suggest_bayes(space, observed, pending, rng):
+    """가우시안 과정 + 기대 개선량으로 다음 후보 선택 (observed: [(params, MAE)], pending: 평가 중 params)"""
+    from scipy.stats import norm
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+
+    X = np.array([encode(space, params) for params, _ in observed])
+    y = np.log([score for _, score in observed])
+    best = y.min()
+    # 평가 중인 후보는 현재 평균 성능으로 가정해 같은 영역에 후보가 몰리지 않게 함
+    if pending:
+        X = np.vstack([X, [encode(space, params) for params in pending]])
+        y = np.concatenate([y, np.full(len(pending), y.mean())])
+    model = GaussianProcessRegressor(Matern(nu=2.5) + WhiteKernel(1e-3), normalize_y=True,
+                                     random_state=int(rng.integers(2 ** 31)))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model.fit(X, y)
+    candidates = rng.random((BAYES_CANDIDATES, len(space)))
+    mean, std = model.predict(candidates, return_std=True)
+    std = np.maximum(std, 1e-9)
+    z = (best - mean) / std
+    improvement = (best - mean) * norm.cdf(z) + std * norm.pdf(z)
+    return decode(space, candidates[np.argmax(improvement)])
+
+
+def budget_rungs(model, eta):
+    """halving 단계별 예산 (최소값부터 eta 배씩, 마지막은 최대값)"""
+    _, low, high = BUDGETS[model]
+    rungs = [low]
+    while rungs[-1] * eta < high:
+        rungs.append(rungs[-1] * eta)
+    return rungs + [high] if rungs[-1] < high else rungs
+
+
+# ========== 2. 폴드 (캐시) ==========
+def make_tuning_folds(timestamps, n_folds=DEFAULT_FOLDS, early_stopping_days=EARLY_STOPPING_DAYS):
+    """마지막 n_folds 개월을 차례로 검증하는 확장 창 폴드 (fit / stop / valid 행 범위)"""
+    folds = []
+    for fold in make_folds(timestamps, by="month")[-n_folds:]:
+        stop_start = int(timestamps.searchsorted(fold["start"] - pd.Timedelta(days=early_stopping_days)))
+        valid_start = int(timestamps.searchsorted(fold["start"]))
+        valid_end = int(timestamps.searchsorted(fold["end"], side="right"))
+        folds.append({"fold": len(folds) + 1, "label": fold["label"], "fit": (0, stop_start),
+                      "stop": (stop_start, valid_start), "valid": (valid_start, valid_end)})
+    return folds
+
+
+def load_dataset(path=TRAIN_PATH, n_folds=DEFAULT_FOLDS, cache_dir=TUNE_CACHE_DIR):
+    """탐색 데이터셋 (특성 표/행렬, 목표값, 폴드 경계). (데이터셋, 캐시 적중 여부) 반환"""
+    version = data_version(path)
+
+    def compute():
+        df = load_train_data(path).sort_values("측정일시").reset_index(drop=True)
+        features = build_features(df)
+        return {"features": features, "X": feature_matrix(features),
+                "y": df[TARGET_COLUMN].to_numpy(dtype=float), "folds": make_tuning_folds(df["측정일시"], n_folds)}
+
+    key = {"stage": "tune_dataset", "data": version, "folds": n_folds, "early_stopping_days": EARLY_STOPPING_DAYS,
+           "features": FEATURE_COLUMNS}
+    dataset, cache_hit = cached(cache_dir, key, compute)
+    return {"path": path, "version": version, "n_folds": n_folds, **dataset}, cache_hit
+
+
+def _init_worker(path, n_folds, cache_dir):
+    # spawn 환경이면 워커마다 한 번만 로드 (fork 면 부모 데이터셋 그대로 사용)
+    if _DATASET.get("path") != path or _DATASET.get("n_folds") != n_folds:
+        _DATASET.update(load_dataset(path, n_folds, cache_dir)[0])
+
+
+# ========== 3. 시행 평가 (워커) ==========
+def _fold_matrices(fold, threads):
+    """폴드별 XGBoost 행렬 (히스토그램 분할점을 워커 안에서 재사용)"""
+    import xgboost as xgb
+
+    if fold["fold"] not in _MATRICES:
+        X, y = _DATASET["X"], _DATASET["y"]
+        (fit_lo, fit_hi), (stop_lo, stop_hi), (valid_lo, valid_hi) = fold["fit"], fold["stop"], fold["valid"]
+        train = xgb.QuantileDMatrix(X[fit_lo:fit_hi], label=y[fit_lo:fit_hi], nthread=threads)
+        stop = xgb.QuantileDMatrix(X[stop_lo:stop_hi], label=y[stop_lo:stop_hi], ref=train, nthread=threads)
+        _MATRICES[fold["fold"]] = (train, stop, xgb.DMatrix(X[valid_lo:valid_hi], nthread=threads))
+    return _MATRICES[fold["fold"]]
+
+
+def evaluate_xgboost(fold, params, budget, threads, seed):
+    """폴드 1개 XGBoost 검증 MAE, 사용한 트리 수"""
+    import xgboost as xgb
+
+    train, stop, valid = _fold_matrices(fold, threads)
+    base = {key: value for key, value in XGBOOST_PARAMS.items() if key != "n_estimators"}
+    booster = xgb.train({**base, **params, "eval_metric": "mae", "nthread": threads, "seed": seed}, train,
+                        num_boost_round=budget, evals=[(stop, "stop")], early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                        verbose_eval=False)
+    rounds = booster.best_iteration + 1
+    predicted = booster.predict(valid, iteration_range=(0, rounds))
+    lo, hi = fold["valid"]
+    return float(np.mean(np.abs(predicted - _DATASET["y"][lo:hi]))), rounds
+
+
+def evaluate_lstm(fold, params, budget, threads, seed):
+    """폴드 1개 LSTM 검증 MAE, 학습한 epoch 수 (표준화는 폴드 학습 구간으로 계산)"""
+    import tensorflow as tf
+    from tensorflow import keras
+
+    keras.utils.set_random_seed(seed)
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+    except RuntimeError:
+        pass  # 같은 워커의 두 번째 시행부터는 이미 초기화됨
+
+    config = {**LSTM_PARAMS, **params, "epochs": budget}
+    sequence_length = config["sequence_length"]
+    features, y = _DATASET["features"], _DATASET["y"]
+    scaler = fit_lstm_scaler(features.iloc[:fold["stop"][1]], y[:fold["stop"][1]])
+    arrays = scaler_arrays(scaler)
+    target = (y - scaler["target_mean"]) / scaler["target_scale"]
+
+    def part(name):
+        lo, hi = fold[name]
+        rows = np.arange(max(lo, sequence_length - 1), hi)
+        return list(lstm_inputs(features, rows, arrays, sequence_length)), rows
+
+    (fit_x, fit_rows), (stop_x, stop_rows), (valid_x, valid_rows) = part("fit"), part("stop"), part("valid")
+    model = build_lstm(config)
+    history = model.fit(fit_x, target[fit_rows], validation_data=(stop_x, target[stop_rows]), epochs=budget,
+                        batch_size=config["batch_size"], shuffle=True, verbose=0,
+                        callbacks=[keras.callbacks.EarlyStopping(patience=config["patience"],
+                                                                 restore_best_weights=True)])
+    predicted = model.predict(valid_x, batch_size=4096, verbose=0)[:, 0]
+    predicted = predicted * scaler["target_scale"] + scaler["target_mean"]
+    keras.backend.clear_session()
+    return float(np.mean(np.abs(predicted - y[valid_rows]))), len(history.history["loss"])
+
+
+EVALUATORS = {"xgboost": evaluate_xgboost, "lstm": evaluate_lstm}
+
+
+def run_trial(trial, model, thresholds, threads, seed):
+    """시행 1개: 폴드를 차례로 평가하고 누적 MAE 가 기준보다 나쁘면 중단 -> 결과 dict"""
+    started = time.perf_counter()
+    scores, rounds = [], []
+    state = "complete"
+    for k, fold in enumerate(_DATASET["folds"]):
+        score, used = EVALUATORS[model](fold, trial["params"], trial["budget"], threads, seed)
+        scores.append(score)
+        rounds.append(int(used))
+        if k < len(_DATASET["folds"]) - 1 and thresholds[k] is not None and np.mean(scores) > thresholds[k]:
+            state = "pruned"
+            break
+    return {"state": state, "score": float(np.mean(scores)), "fold_scores": scores, "rounds": rounds,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def prune_thresholds(trials, n_folds, quantile):
+    """폴드별 누적 MAE 중단 기준 (완료 시행이 부족하거나 quantile 이 None 이면 None)"""
+    complete = [trial["fold_scores"] for trial in trials if trial["state"] == "complete"]
+    if quantile is None or len(complete) < PRUNE_MIN_TRIALS:
+        return [None] * n_folds
+    running = np.cumsum(complete, axis=1) / np.arange(1, n_folds + 1)
+    return [float(value) for value in np.quantile(running, quantile, axis=0)]
+
+
+# ========== 4. 시행 기록 (SQLite) ==========
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    study TEXT PRIMARY KEY, config TEXT NOT NULL, created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trials (
+    study TEXT NOT NULL, number INTEGER NOT NULL, rung INTEGER NOT NULL, budget INTEGER NOT NULL,
+    params TEXT NOT NULL, state TEXT NOT NULL, score REAL, fold_scores TEXT, rounds TEXT, seconds REAL,
+    error TEXT, created_at TEXT NOT NULL, finished_at TEXT,
+    PRIMARY KEY (study, number)
+);
+"""
+
+
+class TrialStore:
+    """스터디/시행 기록 (부모 프로세스만 씀)"""
+
+    def __init__(self, path=TRIALS_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def open_study(self, study, config):
+        """스터디 생성 또는 이어 쓰기 (설정이 다르면 오류)"""
+        config_json = json.dumps(config, sort_keys=True, ensure_ascii=False)
+        row = self.connection.execute("SELECT config FROM studies WHERE study = ?", (study,)).fetchone()
+        if row is None:
+            with self.connection:
+                self.connection.execute("INSERT INTO studies VALUES (?, ?, ?)",
+                                        (study, config_json, datetime.now().isoformat(timespec="seconds")))
+        elif row[0] != config_json:
+            raise ValueError(f"스터디 '{study}' 의 기존 설정(모델/방식/데이터/폴드/탐색 공간/시드)과 다릅니다. "
+                             f"다른 --study 이름을 쓰세요")
+
+    def trials(self, study):
+        """시행 목록 (번호 순)"""
+        cursor = self.connection.execute(
+            "SELECT number, rung, budget, params, state, score, fold_scores, rounds, seconds, error "
+            "FROM trials WHERE study = ? ORDER BY number", (study,))
+        columns = [c[0] for c in cursor.description]
+        trials = []
+        for row in cursor:
+            trial = dict(zip(columns, row))
+            for key in ("params", "fold_scores", "rounds"):
+                trial[key] = json.loads(trial[key]) if trial[key] else None
+            trials.append(trial)
+        return trials
+
+    def add(self, study, trial):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO trials (study, number, rung, budget, params, state, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (study, trial["number"], trial["rung"], trial["budget"], json.dumps(trial["params"], sort_keys=True),
+                 trial["state"], datetime.now().isoformat(timespec="seconds")))
+
+    def finish(self, study, trial):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE trials SET state = ?, score = ?, fold_scores = ?, rounds = ?, seconds = ?, error = ?, "
+                "finished_at = ? WHERE study = ? AND number = ?",
+                (trial["state"], trial.get("score"), json.dumps(trial.get("fold_scores")),
+                 json.dumps(trial.get("rounds")), trial.get("seconds"), trial.get("error"),
+                 datetime.now().isoformat(timespec="seconds"), study, trial["number"]))
+
+    def close(self):
+        self.connection.close()
+
+
+# ========== 5. 탐색 ==========
+class Search:
+    """스터디 1개 실행 (시행 생성 -> 풀에 제출 -> 결과 기록)"""
+
+    def __init__(self, store, study, model, method, executor, workers, threads, seed, prune_quantile, n_folds):
+        self.store = store
+        self.study = study
+        self.model = model
+        self.method = method
+        self.space = SEARCH_SPACES[model]
+        self.executor = executor
+        self.workers = workers
+        self.threads = threads
+        self.seed = seed
+        self.prune_quantile = prune_quantile
+        self.n_folds = n_folds
+        self.trials = store.trials(study)
+
+    def new_trial(self, params, budget, rung=0):
+        trial = {"number": len(self.trials), "rung": rung, "budget": budget, "params": params, "state": "running"}
+        self.store.add(self.study, trial)
+        self.trials.append(trial)
+        return trial
+
+    def sample(self, number, pending=()):
+        """number 번째 후보 (시드 + 번호로 정해지므로 이어 실행해도 같은 후보)"""
+        rng = np.random.default_rng([self.seed, number])
+        observed = [(t["params"], t["score"]) for t in self.trials
+                    if t["state"] in ("complete", "pruned") and t["rung"] == 0]
+        if self.method == "bayes" and len(observed) >= BAYES_STARTUP_TRIALS:
+            return suggest_bayes(self.space, observed, list(pending), rng)
+        return decode(self.space, rng.random(len(self.space)))
+
+    def evaluate(self, queue, generate=None):
+        """queue 의 시행(+ generate() 로 만든 새 시행)을 워커 수만큼 동시에 평가"""
+        queue = list(queue)
+        running = {}
+        while True:
+            while len(running) < self.workers:
+                trial = queue.pop(0) if queue else (generate(running.values()) if generate else None)
+                if trial is None:
+                    break
+                same_budget = [t for t in self.trials if t["budget"] == trial["budget"]]
+                thresholds = prune_thresholds(same_budget, self.n_folds, self.prune_quantile)
+                future = self.executor.submit(run_trial, trial, self.model, thresholds, self.threads, self.seed)
+                running[future] = trial
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial = running.pop(future)
+                try:
+                    trial.update(future.result())
+                except Exception as error:
+                    trial.update({"state": "failed", "error": f"{type(error).__name__}: {error}"})
+                self.store.finish(self.study, trial)
+                self.report(trial)
+
+    def report(self, trial):
+        score = f"MAE {trial['score']:,.1f}" if trial.get("score") is not None else trial.get("error", "")
+        print(f"[{trial['number']:>3}] {trial['state']:<8} 예산 {trial['budget']:>5} {score} "
+              f"({trial.get('seconds') or 0:.1f}초) {json.dumps(trial['params'])}")
+
+    def run_sampled(self, n_trials):
+        """random / bayes: n_trials 개가 될 때까지 후보 생성"""
+        budget = BUDGETS[self.model][2]
+
+        def generate(running):
+            if len(self.trials) >= n_trials:
+                return None
+            number = len(self.trials)
+            return self.new_trial(self.sample(number, [t["params"] for t in running]), budget)
+
+        # 이전 실행에서 끝나지 않은 시행부터 다시 평가
+        self.evaluate([t for t in self.trials if t["state"] == "running"], generate)
+
+    def run_halving(self, n_trials, eta):
+        """successive halving: 단계마다 상위 1/eta 후보만 다음 예산으로 (남은 후보는 항상 최대 예산까지 평가)"""
+        existing = {(t["rung"], json.dumps(t["params"], sort_keys=True)): t for t in self.trials}
+        candidates = [decode(self.space, np.random.default_rng([self.seed, i]).random(len(self.space)))
+                      for i in range(n_trials)]
+        rungs = budget_rungs(self.model, eta)
+        rung = 0
+        while True:
+            budget = rungs[rung]
+            rung_trials, queue = [], []
+            for params in candidates:
+                trial = existing.get((rung, json.dumps(params, sort_keys=True)))
+                if trial is None:
+                    trial = self.new_trial(params, budget, rung)
+                if trial["state"] == "running":
+                    queue.append(trial)
+                rung_trials.append(trial)
+            self.evaluate(queue)
+            ranked = sorted((t for t in rung_trials if t["state"] in ("complete", "pruned")),
+                            key=lambda t: (t["state"] != "complete", t["score"]))
+            candidates = [t["params"] for t in ranked[:max(1, math.ceil(len(rung_trials) / eta))]]
+            print(f"단계 {rung} (예산 {budget}) 완료: 다음 단계 후보 {len(candidates)}개")
+            if rung == len(rungs) - 1 or not candidates:
+                break
+            # 후보가 하나만 남으면 더 줄일 것이 없으므로 중간 단계를 건너뛰고 최대 예산으로 평가
+            rung = rung + 1 if len(candidates) > 1 else len(rungs) - 1
+
+
+def best_trial(trials):
+    """완료 시행 중 최고 (마지막 halving 단계처럼 예산이 큰 시행 우선)"""
+    complete = [t for t in trials if t["state"] == "complete"]
+    if not complete:
+        return None
+    top_budget = max(t["budget"] for t in complete)
+    return min((t for t in complete if t["budget"] == top_budget), key=lambda t: t["score"])
+
+
+def run_search(model="xgboost", method="random", n_trials=30, data_path=TRAIN_PATH, study=None,
+               n_folds=DEFAULT_FOLDS, workers=None, seed=DEFAULT_SEED, eta=DEFAULT_ETA,
+               prune_quantile=DEFAULT_PRUNE_QUANTILE, db_path=TRIALS_DB, cache_dir=TUNE_CACHE_DIR):
+    """탐색 실행 -> (스터디 이름, 시행 목록, 데이터셋 캐시 적중 여부)"""
+    if model not in SEARCH_SPACES:
+        raise ValueError(f"알 수 없는 모델: {model} (가능: {', '.join(SEARCH_SPACES)})")
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"알 수 없는 탐색 방식: {method} (가능: {', '.join(SEARCH_METHODS)})")
+    if model == "lstm" and importlib.util.find_spec("tensorflow") is None:
+        raise RuntimeError("LSTM 탐색에는 tensorflow 가 필요합니다 (pip install -r requirements-train.txt)")
+    workers = workers or os.cpu_count() or 1
+    # 프로세스 병렬일 때 시행별 학습 스레드를 워커 수로 나눔
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    study = study or f"{model}-{method}"
+
+    dataset, cache_hit = load_dataset(data_path, n_folds, cache_dir)
+    _DATASET.clear()
+    _DATASET.update(dataset)
+    if len(dataset["folds"]) < n_folds:
+        raise ValueError(f"검증 폴드가 {len(dataset['folds'])}개뿐입니다 (--folds 를 줄이세요)")
+
+    config = {"model": model, "method": method, "data": dataset["version"], "folds": n_folds,
+              "early_stopping_days": EARLY_STOPPING_DAYS, "space": SEARCH_SPACES[model],
+              "budget": BUDGETS[model], "seed": seed, "eta": eta if method == "halving" else None}
+    store = TrialStore(db_path)
+    try:
+        store.open_study(study, config)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(data_path, n_folds, cache_dir)) as executor:
+            search = Search(store, study, model, method, executor, workers, threads, seed, prune_quantile, n_folds)
+            if method == "halving":
+                search.run_halving(n_trials, eta)
+            else:
+                search.run_sampled(n_trials)
+        return study, search.trials, cache_hit
+    finally:
+        store.close()
+
+
+def write_results(out_dir, study, model, trials):
+    """시행 표 CSV + 최고 설정 JSON (python -m utills.train --params 로 그대로 사용)"""
+    os.makedirs(out_dir, exist_ok=True)
+    table = pd.DataFrame([{
+        "번호": t["number"], "단계": t["rung"], "예산": t["budget"], "상태": t["state"], "MAE": t.get("score"),
+        **{f"폴드{k + 1} MAE": score for k, score in enumerate(t.get("fold_scores") or [])},
+        "사용량": int(np.median(t["rounds"])) if t.get("rounds") else None,
+        "소요(초)": t.get("seconds"), **t["params"],
+    } for t in trials])
+    table.sort_values(["상태", "예산", "MAE"], ascending=[True, False, True]).to_csv(
+        os.path.join(out_dir, "trials.csv"), index=False, encoding="utf-8-sig")
+
+    best = best_trial(trials)
+    if best is None:
+        return None
+    # 조기 종료로 정해진 트리 수/epoch 를 학습 설정에 반영 (폴드 중앙값)
+    budget_name = BUDGETS[model][0]
+    params = {**best["params"], budget_name: int(np.median(best["rounds"]))}
+    with open(os.path.join(out_dir, "best_params.json"), "w", encoding="utf-8") as f:
+        json.dump({model: params, "study": study, "trial": best["number"], "MAE": best["score"],
+                   "fold_scores": best["fold_scores"]}, f, ensure_ascii=False, indent=2)
+    return best
+
+
+# ========== 6. 실행 ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="요금 예측 모델 하이퍼파라미터 탐색")
+    parser.add_argument("--data", default=TRAIN_PATH, help="학습 15분 데이터 CSV")
+    parser.add_argument("--model", choices=list(SEARCH_SPACES), default="xgboost", help="탐색할 모델")
+    parser.add_argument("--search", choices=SEARCH_METHODS, default="random", help="탐색 방식")
+    parser.add_argument("--trials", type=int, default=30, help="시행 수 (halving 은 첫 단계 후보 수)")
+    parser.add_argument("--study", help="스터디 이름 (같은 이름이면 이어서 탐색, 기본: <모델>-<방식>)")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS, help="검증 폴드 수 (마지막 N개월)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 프로세스 수")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="난수 시드")
+    parser.add_argument("--eta", type=int, default=DEFAULT_ETA, help="halving 단계별 감소 비율")
+    parser.add_argument("--prune-quantile", type=float, default=DEFAULT_PRUNE_QUANTILE,
+                        help="누적 MAE 가 이 분위수보다 나쁘면 시행 중단")
+    parser.add_argument("--no-prune", action="store_true", help="시행 중단(가지치기) 사용 안 함")
+    parser.add_argument("--db", default=TRIALS_DB, help="시행 기록 SQLite 경로")
+    parser.add_argument("--no-cache", action="store_true", help="특성/폴드 캐시 사용 안 함")
+    parser.add_argument("--out", default=TUNING_DIR, help="결과 상위 폴더 (<out>/<스터디>/)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    study, trials, cache_hit = run_search(
+        args.model, args.search, args.trials, args.data, study=args.study, n_folds=args.folds,
+        workers=args.workers, seed=args.seed, eta=args.eta,
+        prune_quantile=None if args.no_prune else args.prune_quantile, db_path=args.db,
+        cache_dir=None if args.no_cache else TUNE_CACHE_DIR)
+    out_dir = os.path.join(args.out, study)
+    best = write_results(out_dir, study, args.model, trials)
+
+    states = pd.Series([t["state"] for t in trials]).value_counts().to_dict()
+    print(f"시행 {len(trials)}개: " + ", ".join(f"{state} {count}" for state, count in states.items())
+          + (" (데이터셋 캐시 사용)" if cache_hit else ""))
+    if best is not None:
+        print(f"최고: [{best['number']}] MAE {best['score']:,.1f} {json.dumps(best['params'])}")
+    print(f"완료: {time.perf_counter() - started:.1f}초 -> {out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
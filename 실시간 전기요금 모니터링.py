@@ -6,6 +6,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 import warnings
 import math
+import copy
+
+from utills.data import load_train_data
+from utills.demand import DemandTracker
+from utills.accuracy import StreamingErrorTracker
+from utills.charts import add_interval_band
+from utills.ensemble import CODE_WORKTYPES, load_blended_targets
+from utills.intervals import attach_intervals, interval_meta
+from utills.projection import FORECAST_PATH, MonthEndProjector, PredictionFileForecaster
 
 warnings.filterwarnings("ignore")
 
@@ -144,12 +153,63 @@ def create_shap_chart():
     return fig
 
 
+# ─── 최대수요전력 추적 ─────────────────────────────────────
+@st.cache_resource
+def load_demand_history():
+    """과거 이력(train.csv)으로 채운 최대수요 추적기 (세션마다 복사해 사용)"""
+    return DemandTracker.from_history(load_train_data())
+
+
+def new_demand_tracker():
+    """이력 추적기 복사본 + 시작 지점 이전의 실시간 구간 반영"""
+    tracker = copy.deepcopy(load_demand_history())
+    feat = st.session_state.feat_data.iloc[: st.session_state.start_idx]
+    for ts, kwh in zip(feat["측정일시"], feat["전력사용량(kWh)"]):
+        tracker.update(ts, kwh)
+    return tracker
+
+
+# ─── 월말 요금 추정 ─────────────────────────────────────────
+# 시험 구간에는 계량 실적이 없어, 지나간 구간은 화면 예측(블렌딩) 값을 누적하고 남은 구간은 XGBoost 예측으로 채운다.
+# 보정/밴드는 두 예측의 차이에서 나오므로 실적 오차가 아니라 모델 간 차이로 표시한다.
+@st.cache_resource
+def load_forecaster():
+    """월 단위 예측 소스 (세션 간 공유, 예측 파일이 바뀔 때만 다시 읽음)"""
+    return PredictionFileForecaster()
+
+
+def new_projector():
+    """월말 추정기 + 시작 지점 이전 구간(화면 예측 요금) 반영"""
+    projector = MonthEndProjector(load_forecaster())
+    data = st.session_state.data.iloc[: st.session_state.start_idx].dropna(subset=["target"])
+    for ts, cost in zip(data["측정일시"], data["target"]):
+        projector.update(ts, cost)
+    return projector
+
+
+# ─── 예측 모델 간 차이 추적 ─────────────────────────────────
+# 시험 구간에는 계량 실적이 없어 정확도(오차)는 잴 수 없다. 화면 예측(블렌딩)을 기준으로
+# XGBoost 예측이 얼마나 다른지만 보여 주며, 오차가 아니므로 오차 기록(errors.sqlite)에는 남기지 않는다.
+def new_accuracy_tracker():
+    """모델 간 차이 추적기 + 시작 지점 이전 구간 반영"""
+    tracker = StreamingErrorTracker(model="xgboost")
+    start = st.session_state.start_idx
+    data, feat = st.session_state.data.iloc[:start], st.session_state.feat_data.iloc[:start]
+    for ts, code, predicted, actual in zip(data["측정일시"], feat["작업유형_encoded"], data["forecast"], data["target"]):
+        tracker.update(ts, CODE_WORKTYPES[code], predicted, actual)
+    return tracker
+
+
 # ─── 세션 상태 초기화 ────────────────────────────────────────
 def init_state():
     if "data" not in st.session_state:
-        st.session_state.data = pd.read_csv(
-            "./models/final_lstm_target.csv", parse_dates=["측정일시"]
-        )
+        # XGBoost/LSTM 예측 블렌딩 (models/ensemble_weights.json, 없으면 LSTM + 빈 구간은 XGBoost)
+        # + 예측 구간 (models/prediction_intervals.csv, utills.intervals 로 미리 계산)
+        data = attach_intervals(load_blended_targets())
+        # 모델 간 차이 비교용 XGBoost 예측 (월말 추정과 같은 예측 파일)
+        forecast = pd.read_csv(FORECAST_PATH, usecols=["id", "target"]).set_index("id")["target"]
+        data["forecast"] = forecast.reindex(data["id"]).to_numpy()
+        st.session_state.data = data
     if "feat_data" not in st.session_state:
         st.session_state.feat_data = pd.read_csv(
             "./models/target_pred_feature_lstm.csv", parse_dates=["측정일시"]
@@ -159,10 +219,19 @@ def init_state():
         matches = df.index[df["id"] == 32111].tolist()
         st.session_state.start_idx = matches[0] if matches else 0
         st.session_state.idx = st.session_state.start_idx
-    for key in ["time_list", "cost_list", "shap_history"]:
+    for key in ["time_list", "cost_list", "lower_list", "upper_list", "shap_history"]:
         st.session_state.setdefault(key, [])
     st.session_state.setdefault("running", False)
     st.session_state.setdefault("page", 0)
+    if "demand_tracker" not in st.session_state:
+        st.session_state.demand_tracker = new_demand_tracker()
+        st.session_state.demand_state = None
+    if "projector" not in st.session_state:
+        st.session_state.projector = new_projector()
+        st.session_state.projection = None
+    if "accuracy_tracker" not in st.session_state:
+        st.session_state.accuracy_tracker = new_accuracy_tracker()
+        st.session_state.accuracy = None
 
 
 init_state()
@@ -178,9 +247,17 @@ with st.sidebar:
         st.session_state.idx = st.session_state.start_idx
         st.session_state.time_list.clear()
         st.session_state.cost_list.clear()
+        st.session_state.lower_list.clear()
+        st.session_state.upper_list.clear()
         st.session_state.shap_history.clear()
         st.session_state.running = False
         st.session_state.page = 0
+        st.session_state.demand_tracker = new_demand_tracker()
+        st.session_state.demand_state = None
+        st.session_state.projector = new_projector()
+        st.session_state.projection = None
+        st.session_state.accuracy_tracker = new_accuracy_tracker()
+        st.session_state.accuracy = None
     st.markdown("---")
     status = "● 실행 중" if st.session_state.running else "● 정지됨"
     color = "#27ae60" if st.session_state.running else "#e74c3c"
@@ -310,6 +387,83 @@ def show_main():
             unsafe_allow_html=True,
         )
 
+    demand = st.session_state.demand_state
+    if demand is not None:
+        d1, d2, d3 = st.columns(3)
+        demand_cards = [
+            (d1, "당월 최대수요전력 (kW)", demand["당월 최대수요전력(kW)"], demand["당월 최대수요 발생시각"]),
+            (d2, "최근 30일 최대수요전력 (kW)", demand["최근 30일 최대수요전력(kW)"], demand["최근 30일 최대수요 발생시각"]),
+            (d3, "요금적용전력 (kW, 12개월 반영)", demand["요금적용전력(kW)"], None),
+        ]
+        for col, title, value, peak_time in demand_cards:
+            sub_text = f"발생 {peak_time:%m/%d %H:%M}" if peak_time is not None else "당월·직전 12개월 기준"
+            with col:
+                st.markdown(
+                    f"""
+                <div class="header-style1">
+                  <div class="title">{title}</div>
+                  <div class="value">{value:,.1f}</div>
+                  <div class="title">{sub_text}</div>
+                </div>
+                """,
+                    unsafe_allow_html=True,
+                )
+
+    projection = st.session_state.projection
+    if projection is not None:
+        p1, p2 = st.columns([2, 3])
+        with p1:
+            st.markdown(
+                f"""
+            <div class="header-style1">
+              <div class="title">{projection["month"].month}월 월말 예상 전기요금 (원)</div>
+              <div class="value">{projection["projected"]:,.0f}</div>
+              <div class="title">모델 간 차이 밴드 (95%) {projection["lower"]:,.0f} ~ {projection["upper"]:,.0f}</div>
+            </div>
+            """,
+                unsafe_allow_html=True,
+            )
+        with p2:
+            st.markdown(
+                f"""
+            <div class="header-style1">
+              <div class="title">월말 추정 구성</div>
+              <div class="title">예측 기반 누적 {projection["actual"]:,.0f}원 + 남은 {projection["remaining_intervals"]:,}구간 XGBoost 예측
+                {projection["remaining_forecast"]:,.0f}원 + 모델 간 차이 보정 {projection["bias"] * projection["remaining_intervals"]:+,.0f}원</div>
+            </div>
+            """,
+                unsafe_allow_html=True,
+            )
+
+    accuracy = st.session_state.accuracy
+    if accuracy is not None and accuracy["구간 수"]:
+        tracker = st.session_state.accuracy_tracker
+        a1, a2, a3, a4 = st.columns(4)
+        accuracy_cards = [
+            (a1, "모델 간 평균 차이 (원)", f"{accuracy['MAE']:,.1f}", f"{accuracy['구간 수']:,}구간 누적"),
+            (a2, "모델 간 차이율 (%)", f"{accuracy['MAPE(%)']:.2f}", "화면 예측 0원 구간 제외"),
+            (a3, "XGBoost 치우침 (원)", f"{accuracy['편향']:+,.1f}", "XGBoost - 화면 예측 평균"),
+            (a4, f"최근 {tracker.window}구간 차이 (원)", f"{accuracy['최근 MAE']:,.1f}",
+             f"치우침 {accuracy['최근 편향']:+,.1f}원"),
+        ]
+        for col, title, value, sub_text in accuracy_cards:
+            with col:
+                st.markdown(
+                    f"""
+                <div class="header-style1">
+                  <div class="title">{title}</div>
+                  <div class="value">{value}</div>
+                  <div class="title">{sub_text}</div>
+                </div>
+                """,
+                    unsafe_allow_html=True,
+                )
+        st.caption("계량 실적이 없는 예측 구간이라 정확도가 아니라 XGBoost 예측과 화면 예측(블렌딩)의 차이입니다.")
+        with st.expander("시간 / 작업유형별 예측 모델 간 차이"):
+            h_col, w_col = st.columns([3, 2])
+            h_col.dataframe(tracker.table("hour").round(2), use_container_width=True, hide_index=True)
+            w_col.dataframe(tracker.table("worktype").round(2), use_container_width=True, hide_index=True)
+
     col1, col2 = st.columns([3, 2])
     with col1:
         df_plot = pd.DataFrame(
@@ -325,6 +479,9 @@ def show_main():
             title="실시간 전기요금 모니터링",
             markers=True,
         )
+        coverage = interval_meta().get("coverage")
+        add_interval_band(fig, df_plot["측정일시"], st.session_state.lower_list, st.session_state.upper_list,
+                          name=f"{coverage:.0%} 예측 구간" if coverage else "예측 구간")
         fig.update_layout(xaxis_title="측정일시", yaxis_title="전기요금(원)")
         st.plotly_chart(fig, use_container_width=True, key="line_chart")
     with col2:
@@ -460,6 +617,18 @@ if st.session_state.running:
         row = df.iloc[st.session_state.idx]
         st.session_state.time_list.append(row["측정일시"])
         st.session_state.cost_list.append(row["target"])
+        # 예측 구간은 시작할 때 함께 읽어 둔 값 (구간마다 추가 추론 없음)
+        st.session_state.lower_list.append(row["lower"])
+        st.session_state.upper_list.append(row["upper"])
+        feat_row = st.session_state.feat_data.iloc[st.session_state.idx]
+        st.session_state.demand_state = st.session_state.demand_tracker.update(
+            feat_row["측정일시"], feat_row["전력사용량(kWh)"]
+        )
+        if not pd.isna(row["target"]):
+            st.session_state.projection = st.session_state.projector.update(row["측정일시"], row["target"])
+        st.session_state.accuracy = st.session_state.accuracy_tracker.update(
+            row["측정일시"], CODE_WORKTYPES[feat_row["작업유형_encoded"]], row["forecast"], row["target"]
+        )
         st.session_state.idx += 1
 
         new_shap = generate_dummy_shap_values()
@@ -7,6 +7,10 @@ import plotly.graph_objects as go
 import warnings
 import math
 
+from utills.charts import add_interval_band
+from utills.ensemble import load_blended_targets
+from utills.intervals import attach_intervals, interval_meta
+
 warnings.filterwarnings("ignore")
 
 # ─── (1) 페이지 설정 ────────────────────────────────────────
@@ -324,9 +328,8 @@ def create_shap_chart():
 # ─── 세션 상태 초기화 ────────────────────────────────────────
 def init_state():
     if "data" not in st.session_state:
-        st.session_state.data = pd.read_csv(
-            "./models/final_lstm_target.csv", parse_dates=["측정일시"]
-        )
+        # 블렌딩 점 예측 + 미리 계산한 예측 구간 (utills.ensemble / utills.intervals)
+        st.session_state.data = attach_intervals(load_blended_targets())
     if "feat_data" not in st.session_state:
         st.session_state.feat_data = pd.read_csv(
             "./models/target_pred_feature_lstm.csv", parse_dates=["측정일시"]
@@ -336,7 +339,7 @@ def init_state():
         matches = df.index[df["id"] == 32111].tolist()
         st.session_state.start_idx = matches[0] if matches else 0
         st.session_state.idx = st.session_state.start_idx
-    for key in ["time_list", "cost_list", "shap_history"]:
+    for key in ["time_list", "cost_list", "lower_list", "upper_list", "shap_history"]:
         st.session_state.setdefault(key, [])
     st.session_state.setdefault("running", False)
     st.session_state.setdefault("page", 0)
@@ -363,6 +366,8 @@ with st.sidebar:
         st.session_state.idx = st.session_state.start_idx
         st.session_state.time_list.clear()
         st.session_state.cost_list.clear()
+        st.session_state.lower_list.clear()
+        st.session_state.upper_list.clear()
         st.session_state.shap_history.clear()
         st.session_state.running = False
         st.session_state.page = 0
@@ -494,6 +499,14 @@ def show_main():
                 marker_size=6,
                 line_width=3
             )
+            coverage = interval_meta().get("coverage")
+            add_interval_band(
+                fig,
+                df_plot["측정일시"],
+                st.session_state.lower_list,
+                st.session_state.upper_list,
+                name=f"{coverage:.0%} 예측 구간" if coverage else "예측 구간",
+            )
             fig.update_layout(
                 template="plotly_white",
                 height=400,
@@ -652,6 +665,9 @@ if st.session_state.running:
         row = df.iloc[st.session_state.idx]
         st.session_state.time_list.append(row["측정일시"])
         st.session_state.cost_list.append(row["target"])
+        # 예측 구간은 시작할 때 함께 읽어 둔 값 (구간마다 추가 추론 없음)
+        st.session_state.lower_list.append(row["lower"])
+        st.session_state.upper_list.append(row["upper"])
         st.session_state.idx += 1
 
         new_shap = generate_dummy_shap_values()